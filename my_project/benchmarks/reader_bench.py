@@ -0,0 +1,94 @@
+"""Compare a full taxi table read with a pruned, pushed-down read_taxis() scan.
+
+    python benchmarks/reader_bench.py --columns fare_amount,trip_distance --max-fare 30 \
+        --pickup-from 2016-02-01 --pickup-until 2016-02-08
+
+Runs each read to completion with Spark's ``noop`` sink (every row is read
+and materialized, nothing is written) and reports the median wall time and,
+on a classic local SparkSession, the bytes the scan read from storage. The
+three reads are:
+
+* ``full table``: ``get_taxis()`` - every column of every trip
+* ``filter after read``: ``get_taxis()`` followed by the same filter and
+  projection (Catalyst may still push these down; the plan shows whether it did)
+* ``read_taxis``: the predicates and columns given to ``read_taxis()``
+
+The physical plan of the pushed-down scan is printed at the end.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from pyspark.sql import functions as F
+
+from my_project.main import TAXIS_TABLE, get_spark, read_taxis, scan_plan
+
+
+def input_bytes(spark):
+    """Total bytes read by all stages so far (classic SparkSession only, else None)."""
+    try:
+        stages = spark.sparkContext._jsc.sc().statusStore().stageList(None)
+    except Exception:
+        return None
+    return sum(stages.get(i).inputBytes() for i in range(stages.size()))
+
+
+def run(spark, df, repeats):
+    """Median seconds and bytes read per run of ``df`` into the noop sink."""
+    samples, read = [], []
+    for _ in range(repeats):
+        before = input_bytes(spark)
+        start = time.perf_counter()
+        df.write.format("noop").mode("overwrite").save()
+        samples.append(time.perf_counter() - start)
+        after = input_bytes(spark)
+        read.append(None if before is None else after - before)
+    return statistics.median(samples), read[-1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--table", default=TAXIS_TABLE)
+    parser.add_argument("--columns", default="fare_amount,trip_distance",
+                        help="Comma-separated columns to read")
+    parser.add_argument("--pickup-from")
+    parser.add_argument("--pickup-until")
+    parser.add_argument("--min-fare", type=float)
+    parser.add_argument("--max-fare", type=float, default=30.0)
+    parser.add_argument("--min-distance", type=float)
+    parser.add_argument("--max-distance", type=float)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    spark = get_spark()
+    columns = args.columns.split(",")
+    bounds = dict(pickup_from=args.pickup_from, pickup_until=args.pickup_until,
+                  min_fare=args.min_fare, max_fare=args.max_fare,
+                  min_distance=args.min_distance, max_distance=args.max_distance)
+    pushed = read_taxis(spark, columns, table=args.table, **bounds)
+    full = read_taxis(spark, table=args.table)
+    # The same predicates, applied to an already loaded DataFrame
+    after = full
+    for column, lower, upper in (("tpep_pickup_datetime", args.pickup_from, args.pickup_until),
+                                 ("fare_amount", args.min_fare, args.max_fare),
+                                 ("trip_distance", args.min_distance, args.max_distance)):
+        if lower is not None:
+            after = after.filter(F.col(column) >= F.lit(lower))
+        if upper is not None:
+            after = after.filter(F.col(column) < F.lit(upper))
+    after = after.select(*columns)
+
+    for name, df in (("full table", full), ("filter after read", after), ("read_taxis", pushed)):
+        seconds, read = run(spark, df, args.repeats)
+        scanned = "n/a" if read is None else f"{read / 1e6:,.1f} MB"
+        print(f"{name:<18} {seconds * 1000:9.1f} ms  scanned {scanned}")
+    print()
+    print(scan_plan(pushed))
+
+
+if __name__ == "__main__":
+    main()
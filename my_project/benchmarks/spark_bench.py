@@ -0,0 +1,126 @@
+"""Time the taxi transforms on synthetic data at several scales and compare runs.
+
+    python benchmarks/spark_bench.py --scales 10000,1000000,10000000 --output results.json
+    python benchmarks/spark_bench.py --scales 10000,1000000,10000000 --baseline results.json
+
+Generates seeded synthetic trips (``my_project.synthetic``) once per scale
+under ``--data-dir``, reuses them on later runs, and points the taxi readers
+at each in turn through ``MY_PROJECT_TAXIS_TABLE``. Every workload in
+``WORKLOADS`` runs to completion with Spark's ``noop`` sink and the median
+wall time is recorded together with the Spark version and git commit.
+``--output`` writes the results as JSON; ``--baseline`` compares against an
+earlier results file and exits with status 1 when a workload got slower by
+more than ``--tolerance``. To track a new transform, add it to ``WORKLOADS``.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from pyspark.sql import functions as F
+
+from my_project.main import filtered_taxis, get_spark, get_taxis
+from my_project.synthetic import generate_taxis, write_taxis
+
+# Workload name -> DataFrame built from the table named by MY_PROJECT_TAXIS_TABLE
+WORKLOADS = {
+    "get_taxis": get_taxis,
+    "filtered_taxis": filtered_taxis,
+    "fares_by_pickup_zip": lambda spark: filtered_taxis(spark).groupBy("pickup_zip").agg(
+        F.count("*").alias("trips"), F.avg("fare_amount").alias("avg_fare")
+    ),
+}
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def register(spark, rows, seed, fmt, data_dir):
+    """Name of a table over ``rows`` synthetic trips, generated on first use."""
+    path = os.path.abspath(os.path.join(data_dir, f"taxis_{rows}_{seed}.{fmt}"))
+    if not os.path.exists(path):
+        start = time.perf_counter()
+        write_taxis(generate_taxis(spark, rows, seed), path=path, fmt=fmt)
+        print(f"generated {rows:,} rows in {time.perf_counter() - start:.1f}s: {path}")
+    table = f"bench_taxis_{rows}_{seed}"
+    spark.sql(f"DROP TABLE IF EXISTS {table}")
+    spark.catalog.createTable(table, path=path, source=fmt)
+    return table
+
+
+def run(df, repeats):
+    """Every run's seconds for ``df`` into the noop sink, after one warm-up run."""
+    df.write.format("noop").mode("overwrite").save()
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        df.write.format("noop").mode("overwrite").save()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def compare(results, baseline, tolerance):
+    """Print each workload's change against ``baseline``; returns the regressions."""
+    before = {(r["workload"], r["rows"]): r["seconds"] for r in baseline["results"]}
+    regressions = []
+    for result in results["results"]:
+        key = (result["workload"], result["rows"])
+        if key not in before:
+            continue
+        ratio = result["seconds"] / before[key]
+        slower = ratio > 1 + tolerance
+        if slower:
+            regressions.append(key)
+        print(f"{result['workload']:<22} {result['rows']:>11,}  {before[key]:8.3f}s -> {result['seconds']:8.3f}s  "
+              f"{ratio:5.2f}x{'  REGRESSION' if slower else ''}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scales", default="10000,1000000", help="Comma-separated row counts")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--format", choices=["delta", "parquet"], default="delta")
+    parser.add_argument("--data-dir", default=os.path.join(os.getcwd(), ".bench_data"))
+    parser.add_argument("--workloads", default=",".join(WORKLOADS))
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    parser.add_argument("--baseline", help="Results JSON of an earlier run to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="Slowdown over the baseline counted as a regression (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    spark = get_spark()
+    results = {"commit": git_commit(), "spark": spark.version, "format": args.format, "seed": args.seed,
+               "results": []}
+    for rows in sorted(int(n) for n in args.scales.split(",")):
+        os.environ["MY_PROJECT_TAXIS_TABLE"] = register(spark, rows, args.seed, args.format, args.data_dir)
+        for name in args.workloads.split(","):
+            samples = run(WORKLOADS[name](spark), args.repeats)
+            seconds = statistics.median(samples)
+            results["results"].append({"workload": name, "rows": rows, "seconds": seconds, "samples": samples})
+            print(f"{name:<22} {rows:>11,}  {seconds:8.3f}s  {rows / seconds:>13,.0f} rows/s")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        print(f"\ncompared with {baseline.get('commit')} (Spark {baseline.get('spark')}):")
+        if compare(results, baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
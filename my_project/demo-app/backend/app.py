@@ -1,16 +1,97 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from functools import partial
+
 from fastapi import FastAPI
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, PlainTextResponse
 import os
 
-app = FastAPI()
+import db
+from db_metrics import render_prometheus
+from enrollments_api import router as enrollments_router
+from migrations import migrate
+from static_files import PrecompressedStaticFiles
+
+
+def migrate_schema(schema_name):
+    with db.connect() as conn:
+        return migrate(conn, schema_name)
+
+
+# While the database is unavailable, API requests retry connecting at most this often
+DB_RETRY_SECONDS = 30
+DB_OPEN_TIMEOUT = 10
+
+
+async def open_database(app):
+    """Connect the API to the database and return whether it is available.
+
+    Runs at startup and, while the database is unavailable, again from API
+    requests at most every ``DB_RETRY_SECONDS``; the static site is served
+    either way and the API answers 503 until this succeeds.
+    """
+    state = app.state
+    async with state.db_lock:
+        if state.pool is None and time.monotonic() >= state.db_retry_at:
+            pool = None
+            try:
+                # Token fetch and migrations are blocking; run them off the event loop
+                provider = await asyncio.to_thread(db.get_credential_provider)
+                applied = await asyncio.to_thread(migrate_schema, state.schema_name)
+                if applied:
+                    print(f"✅ Applied migrations: {applied}")
+                pool = db.create_async_pool(db.get_conninfo(), provider, kwargs={"autocommit": True})
+                await pool.open(wait=True, timeout=DB_OPEN_TIMEOUT)
+                state.pool = pool
+                print("✅ Database pool ready")
+            except Exception as e:
+                if pool is not None:
+                    await pool.close()
+                state.db_retry_at = time.monotonic() + DB_RETRY_SECONDS
+                print(f"⚠️ Database unavailable, the API will answer 503: {e}")
+    return state.pool is not None
+
+
+@asynccontextmanager
+async def lifespan(app):
+    app.state.schema_name = db.get_schema_name()
+    app.state.pool = None
+    app.state.db_lock = asyncio.Lock()
+    app.state.db_retry_at = 0
+    app.state.open_database = partial(open_database, app)
+    await open_database(app)
+    try:
+        yield
+    finally:
+        if app.state.pool is not None:
+            await app.state.pool.close()
+
+
+app = FastAPI(lifespan=lifespan)
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """Prometheus metrics of this process: API and SQL timings, the pool and the OAuth token."""
+    return PlainTextResponse(
+        render_prometheus(
+            pools={"api": app.state.pool} if app.state.pool is not None else {},
+            credential_provider=db.credential_provider,
+        ),
+        media_type="text/plain; version=0.0.4",
+    )
+
+
+# API routes must be registered before the static mount at "/" catches everything
+app.include_router(enrollments_router)
 
 target_dir = "static"
 
 # Check if static directory exists
 if os.path.exists(target_dir) and os.path.isdir(target_dir):
-    # Mount static files
-    app.mount("/", StaticFiles(directory=target_dir, html=True), name="site")
+    # Mount static files (precompressed, cache headers, SPA fallback to index.html)
+    app.mount("/", PrecompressedStaticFiles(directory=target_dir, html=True), name="site")
     print(f"✅ Mounted static directory: {target_dir}")
 else:
     # Fallback if static directory doesn't exist
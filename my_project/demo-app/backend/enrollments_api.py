@@ -0,0 +1,261 @@
+"""JSON API for HETS EDI enrollments.
+
+Shares the ``hets_*`` schema and SQL with the Streamlit app (``enrollments``,
+``validation`` and ``db`` are copied in from ``streamlit-database-app`` by
+``deploy.sh``), but runs every query on an async psycopg pool so one worker
+can serve many concurrent clearinghouse integrations.
+"""
+import asyncio
+import base64
+import binascii
+import uuid
+from datetime import date, datetime
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from psycopg import errors
+from psycopg.rows import dict_row
+from pydantic import BaseModel
+
+from db_metrics import db_metrics
+from enrollments import (
+    ATTESTATION_TEXT, DEFAULT_PAGE_SIZE, ENROLLMENT_COLUMNS, MAX_SEARCH_LIMIT, SEARCH_COLUMNS, SEARCH_LIMIT,
+    enrollment_detail_queries, insert_enrollment_query, is_concurrent_replay, list_enrollments_query,
+    next_page_cursor, replayed_enrollment_query, search_providers_query
+)
+from export import BATCH_ROWS, CHUNK_BYTES, EXPORT_FORMATS, ParquetEncoder, copy_csv_query, export_query
+from validation import validate_enrollment
+
+MAX_PAGE_SIZE = 500
+# Seconds clients are asked to wait before retrying while the database is unavailable
+DB_RETRY_AFTER = 30
+
+
+async def track_request(request: Request):
+    """Time each API call as a database operation named after its route (see ``db_metrics``)."""
+    with db_metrics.track(f"{request.method} {request.scope['route'].path}"):
+        yield
+
+
+async def require_database(request: Request):
+    """Answer 503 while the app has no database pool (``app.open_database`` retries connecting)."""
+    state = request.app.state
+    if getattr(state, "pool", None) is None:
+        open_database = getattr(state, "open_database", None)
+        if open_database is None or not await open_database():
+            raise HTTPException(status_code=503, detail="Database unavailable",
+                                headers={"Retry-After": str(DB_RETRY_AFTER)})
+
+
+router = APIRouter(prefix="/api/enrollments", tags=["enrollments"],
+                   dependencies=[Depends(require_database), Depends(track_request)])
+
+
+class EnrollmentIn(BaseModel):
+    """One enrollment submission, with the same fields as the Streamlit form.
+
+    Required fields default to empty so that missing values are reported by
+    the shared validation rules, with the same codes the form and bulk
+    import use, rather than by pydantic.
+    """
+    authorized_signatory_name: str = ""
+    title: str = ""
+    organization_name: str = ""
+    email_address: str = ""
+    alternate_email_address: Optional[str] = None
+    phone_number: str = ""
+    ptan: str = ""
+    npi: str = ""
+    tax_id: str = ""
+    organization_type: str = ""
+    vendor_clearinghouse_name: str = ""
+    vendor_contact_name: Optional[str] = None
+    vendor_contact_email: Optional[str] = None
+    vendor_contact_phone: Optional[str] = None
+    effective_date: Optional[date] = None
+    termination_date: Optional[date] = None
+    offshore_data_sharing_consent: bool = False
+    relationship_status: str = "Active"
+    attested_by: str = ""
+
+
+PROVIDER_FIELDS = [
+    "authorized_signatory_name", "title", "organization_name", "email_address",
+    "alternate_email_address", "phone_number", "ptan", "npi", "tax_id", "organization_type",
+]
+VENDOR_FIELDS = [
+    "vendor_clearinghouse_name", "vendor_contact_name", "vendor_contact_email",
+    "vendor_contact_phone", "effective_date", "termination_date",
+    "offshore_data_sharing_consent", "relationship_status",
+]
+
+
+def encode_cursor(cursor):
+    """Turn a ``(created_at, provider_id)`` keyset cursor into an opaque token."""
+    if cursor is None:
+        return None
+    created_at, provider_id = cursor
+    return base64.urlsafe_b64encode(f"{created_at.isoformat()}|{provider_id}".encode()).decode()
+
+
+def decode_cursor(token):
+    """Inverse of ``encode_cursor``; raises a 400 for malformed tokens."""
+    if not token:
+        return None
+    try:
+        created_at, provider_id = base64.urlsafe_b64decode(token.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), int(provider_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+async def fetch_page(pool, schema_name, page_size, after, filters=None):
+    query, params = list_enrollments_query(schema_name, page_size, after, filters)
+    async with pool.connection() as conn:
+        cur = await conn.execute(query, params)
+        rows = await cur.fetchall()
+    return {
+        "items": [dict(zip(ENROLLMENT_COLUMNS, row)) for row in rows],
+        "next_cursor": encode_cursor(next_page_cursor(rows, page_size)),
+    }
+
+
+@router.post("", status_code=201)
+async def create_enrollment(enrollment: EnrollmentIn, request: Request, response: Response,
+                            idempotency_key: Optional[uuid.UUID] = Header(None)):
+    """Create or update an enrollment.
+
+    Send an ``Idempotency-Key`` header (a UUID) to make retries safe: a
+    repeated key returns the original provider with outcome ``replayed``.
+    Returns 201 for a new provider and 200 when the NPI+PTAN was already
+    enrolled or the request was replayed.
+    """
+    record = {
+        field: value.strip() if isinstance(value, str) else value
+        for field, value in enrollment.model_dump().items()
+    }
+    problems = validate_enrollment(record)
+    if problems:
+        raise HTTPException(status_code=422, detail=[problem._asdict() for problem in problems])
+
+    provider_data = {field: record[field] or None for field in PROVIDER_FIELDS}
+    vendor_data = {field: record[field] for field in VENDOR_FIELDS}
+    for field in ("vendor_contact_name", "vendor_contact_email", "vendor_contact_phone"):
+        vendor_data[field] = vendor_data[field] or None
+    attestation_data = {
+        'attestation_text': ATTESTATION_TEXT,
+        'attested_by': record["attested_by"],
+        'ip_address': request.client.host if request.client else None,
+    }
+    key = idempotency_key or uuid.uuid4()
+    schema_name = request.app.state.schema_name
+    query, params = insert_enrollment_query(schema_name, provider_data, vendor_data, attestation_data, key)
+
+    # Pool connections are in autocommit mode, so the single statement
+    # commits on its own (see enrollments.insert_enrollment)
+    async with request.app.state.pool.connection() as conn:
+        try:
+            cur = await conn.execute(query, params, prepare=True)
+        except errors.UniqueViolation as e:
+            if not is_concurrent_replay(e):
+                raise
+            cur = await conn.execute(replayed_enrollment_query(schema_name), (key,))
+        provider_id, outcome = (await cur.fetchone())[:2]
+
+    if outcome != "created":
+        response.status_code = 200
+    response.headers["Location"] = f"{router.prefix}/{provider_id}"
+    return {"provider_id": provider_id, "outcome": outcome}
+
+
+@router.get("")
+async def list_enrollments(request: Request, cursor: Optional[str] = None,
+                           page_size: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE)):
+    """List enrollments newest first; pass ``next_cursor`` back as ``cursor`` for the next page."""
+    state = request.app.state
+    return await fetch_page(state.pool, state.schema_name, page_size, decode_cursor(cursor))
+
+
+@router.get("/search")
+async def search_enrollments(request: Request,
+                             npi: Optional[str] = None,
+                             ptan: Optional[str] = None,
+                             vendor: Optional[str] = None,
+                             status: Optional[list[str]] = Query(None),
+                             created_from: Optional[date] = None,
+                             created_to: Optional[date] = None,
+                             cursor: Optional[str] = None,
+                             page_size: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE)):
+    """Filter enrollments by exact NPI, PTAN, vendor name, status (repeatable) and creation date."""
+    filters = {
+        "npi": npi, "ptan": ptan, "vendor": vendor, "statuses": status,
+        "created_from": created_from, "created_to": created_to,
+    }
+    state = request.app.state
+    return await fetch_page(state.pool, state.schema_name, page_size, decode_cursor(cursor), filters)
+
+
+@router.get("/typeahead")
+async def typeahead(request: Request, q: str = "",
+                    limit: int = Query(SEARCH_LIMIT, ge=1, le=MAX_SEARCH_LIMIT)):
+    """Rank providers whose organization, signatory or vendor names start with the words in ``q``."""
+    built = search_providers_query(request.app.state.schema_name, q, limit)
+    if built is None:
+        return {"items": []}
+    async with request.app.state.pool.connection() as conn:
+        cur = await conn.execute(*built)
+        rows = await cur.fetchall()
+    return {"items": [dict(zip(SEARCH_COLUMNS, row)) for row in rows]}
+
+
+async def stream_export(pool, schema_name, fmt):
+    """Async counterpart of ``export.export_enrollments``: yields the export in bounded chunks."""
+    async with pool.connection() as conn, conn.transaction():
+        if fmt == "csv":
+            async with conn.cursor() as cur, cur.copy(copy_csv_query(schema_name)) as copy:
+                pending, pending_size = [], 0
+                async for block in copy:
+                    pending.append(bytes(block))
+                    pending_size += len(block)
+                    if pending_size >= CHUNK_BYTES:
+                        yield b"".join(pending)
+                        pending, pending_size = [], 0
+                if pending:
+                    yield b"".join(pending)
+            return
+        async with conn.cursor(name="hets_enrollments_export") as cur:
+            await cur.execute(export_query(schema_name))
+            encoder = ParquetEncoder(cur.description, conn.adapters)
+            while rows := await cur.fetchmany(BATCH_ROWS):
+                # Encoding a batch is CPU-bound; keep the event loop free for other requests
+                yield await asyncio.to_thread(encoder.encode, rows)
+            yield encoder.finish()
+
+
+@router.get("/export")
+async def export_enrollments(request: Request, fmt: Literal["csv", "parquet"] = Query("csv", alias="format")):
+    """Download every enrollment (``v_complete_enrollments``) as CSV or Parquet, streamed."""
+    media_type, extension = EXPORT_FORMATS[fmt]
+    return StreamingResponse(
+        stream_export(request.app.state.pool, request.app.state.schema_name, fmt),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="hets_enrollments{extension}"'},
+    )
+
+
+@router.get("/{provider_id}")
+async def get_enrollment(provider_id: int, request: Request):
+    """Return one provider with its vendor relationships and attestations."""
+    provider_query, vendors_query, attestations_query = enrollment_detail_queries(request.app.state.schema_name)
+    async with request.app.state.pool.connection() as conn:
+        async with conn.cursor(row_factory=dict_row) as cur:
+            await cur.execute(provider_query, (provider_id,))
+            provider = await cur.fetchone()
+            if provider is None:
+                raise HTTPException(status_code=404, detail="Enrollment not found")
+            await cur.execute(vendors_query, (provider_id,))
+            vendors = await cur.fetchall()
+            await cur.execute(attestations_query, (provider_id,))
+            attestations = await cur.fetchall()
+    return {"provider": provider, "vendors": vendors, "attestations": attestations}
@@ -0,0 +1,189 @@
+"""Static file serving for the Vite build: precompressed, cache-friendly, SPA-aware.
+
+``deploy.sh`` runs ``python static_files.py dist`` after ``vite build`` to
+write ``.br`` and ``.gz`` variants next to every compressible file. Variants
+missing at startup (e.g. a build uploaded by hand) are generated once on the
+first request into a cache directory, so no request ever compresses on the
+fly.
+"""
+import gzip
+import hashlib
+import mimetypes
+import os
+import sys
+import tempfile
+
+import anyio
+from starlette.datastructures import Headers
+from starlette.exceptions import HTTPException
+from starlette.responses import FileResponse
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Vite fingerprints everything under assets/, so those files never change
+IMMUTABLE_PREFIX = "assets/"
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# Everything else (index.html above all) is revalidated with its ETag
+REVALIDATE_CACHE_CONTROL = "no-cache"
+COMPRESSIBLE_EXTENSIONS = {
+    ".html", ".js", ".mjs", ".css", ".json", ".map", ".svg", ".txt", ".xml", ".wasm", ".ico",
+}
+MIN_COMPRESS_SIZE = 1024
+# Suffix and compressor per content coding, in order of preference
+ENCODINGS = {
+    "br": (".br", (lambda data: brotli.compress(data, quality=11)) if brotli else None),
+    "gzip": (".gz", lambda data: gzip.compress(data, compresslevel=9, mtime=0)),
+}
+DEFAULT_CACHE_DIR = os.path.join(tempfile.gettempdir(), "precompressed-static")
+
+
+def is_compressible(path):
+    return os.path.splitext(path)[1].lower() in COMPRESSIBLE_EXTENSIONS
+
+
+def compress_file(source, encoding, target):
+    """Write the ``encoding`` variant of ``source`` to ``target``; False if it does not pay off."""
+    compress = ENCODINGS[encoding][1]
+    if compress is None:
+        return False
+    with open(source, "rb") as f:
+        data = f.read()
+    if len(data) < MIN_COMPRESS_SIZE:
+        return False
+    compressed = compress(data)
+    if len(compressed) >= len(data) * 0.9:
+        return False
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    partial = f"{target}.{os.getpid()}.tmp"
+    with open(partial, "wb") as f:
+        f.write(compressed)
+    os.replace(partial, target)
+    return True
+
+
+def precompress(directory):
+    """Write ``.br``/``.gz`` variants next to every compressible file; returns how many were written."""
+    written = 0
+    for root, _, files in os.walk(directory):
+        for name in files:
+            path = os.path.join(root, name)
+            if not is_compressible(path):
+                continue
+            for encoding, (suffix, _) in ENCODINGS.items():
+                if compress_file(path, encoding, path + suffix):
+                    written += 1
+    return written
+
+
+def accepted_encodings(request_headers):
+    """Content codings the client accepts (q > 0), from ``Accept-Encoding``."""
+    accepted = set()
+    for item in request_headers.get("accept-encoding", "").split(","):
+        coding, _, params = item.strip().partition(";")
+        q = params.strip()
+        try:
+            if q.startswith("q=") and float(q[2:]) == 0:
+                continue
+        except ValueError:
+            continue
+        accepted.add(coding.strip().lower())
+    return accepted
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """``StaticFiles`` that serves precompressed variants and SPA routes.
+
+    * Picks the best ``.br``/``.gz`` variant the client accepts, with
+      ``Content-Encoding`` and ``Vary: Accept-Encoding``; each variant has
+      its own ETag, so conditional requests still end in a 304.
+    * ``assets/*`` is cached as immutable; every other file revalidates.
+    * Extensionless paths that match no file (client-side routes) are
+      answered with ``index.html``.
+    """
+
+    def __init__(self, *args, cache_dir=DEFAULT_CACHE_DIR, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cache_dir = cache_dir
+        # real path -> {encoding: (variant path, variant stat)}, built on first request
+        self.variants = {}
+
+    async def check_config(self):
+        await super().check_config()
+        if self.directory is not None:
+            self.variants = await anyio.to_thread.run_sync(self.index_variants)
+
+    def index_variants(self):
+        """Find or generate the compressed variants of every compressible file."""
+        root = os.path.realpath(self.directory)
+        cache_root = os.path.join(self.cache_dir, hashlib.sha1(root.encode()).hexdigest()[:12])
+        variants = {}
+        for directory, _, files in os.walk(root):
+            for name in files:
+                path = os.path.join(directory, name)
+                if not is_compressible(path):
+                    continue
+                source_mtime = os.stat(path).st_mtime
+                found = {}
+                for encoding, (suffix, _) in ENCODINGS.items():
+                    cached = os.path.join(cache_root, os.path.relpath(path, root) + suffix)
+                    for candidate in (path + suffix, cached):
+                        if os.path.exists(candidate) and os.stat(candidate).st_mtime >= source_mtime:
+                            break
+                    else:
+                        candidate = cached if compress_file(path, encoding, cached) else None
+                    if candidate:
+                        found[encoding] = (candidate, os.stat(candidate))
+                variants[path] = found
+        print(f"✅ Indexed compressed variants for {len(variants)} static files")
+        return variants
+
+    def is_client_route(self, path, scope):
+        return (scope["method"] in ("GET", "HEAD")
+                and not os.path.splitext(path)[1]
+                and not path.startswith(("api/", IMMUTABLE_PREFIX)))
+
+    async def get_response(self, path, scope):
+        try:
+            response = await super().get_response(path, scope)
+        except HTTPException as exc:
+            if exc.status_code != 404 or not self.is_client_route(path, scope):
+                raise
+            response = None
+        if response is None or (response.status_code == 404 and self.is_client_route(path, scope)):
+            response = await super().get_response("index.html", scope)
+        return response
+
+    def file_response(self, full_path, stat_result, scope, status_code=200):
+        request_headers = Headers(scope=scope)
+        relative = os.path.relpath(full_path, os.path.realpath(self.directory)).replace(os.sep, "/")
+        variants = self.variants.get(full_path, {})
+        accepted = accepted_encodings(request_headers) if variants else ()
+        encoding = next((e for e in ENCODINGS if e in variants and e in accepted), None)
+
+        if encoding is not None:
+            variant_path, variant_stat = variants[encoding]
+            response = FileResponse(variant_path, status_code=status_code, stat_result=variant_stat,
+                                    media_type=mimetypes.guess_type(full_path)[0] or "text/plain")
+            response.headers["content-encoding"] = encoding
+        else:
+            response = FileResponse(full_path, status_code=status_code, stat_result=stat_result)
+        if variants:
+            response.headers["vary"] = "Accept-Encoding"
+        response.headers["cache-control"] = (
+            IMMUTABLE_CACHE_CONTROL if relative.startswith(IMMUTABLE_PREFIX) else REVALIDATE_CACHE_CONTROL
+        )
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2 or not os.path.isdir(sys.argv[1]):
+        raise SystemExit("usage: python static_files.py <build directory>")
+    if brotli is None:
+        print("⚠️ brotli is not installed; writing gzip variants only")
+    print(f"✅ Wrote {precompress(sys.argv[1])} compressed variants")
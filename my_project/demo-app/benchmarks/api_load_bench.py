@@ -0,0 +1,197 @@
+"""Load-test the enrollment REST API and report throughput and latency percentiles.
+
+    HETS_TEST_PG_CONNINFO="host=localhost dbname=postgres" python benchmarks/api_load_bench.py --concurrency 16
+
+By default the benchmark migrates a throwaway schema in the local Postgres,
+starts the API under uvicorn in a subprocess, seeds ``--seed`` enrollments
+and then runs ``--concurrency`` clients for ``--duration`` seconds with a
+mix of creates, gets, list pages and searches. Pass ``--url`` to drive an
+already running server instead.
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+import uuid
+
+import httpx
+import psycopg
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.join(HERE, "..", "backend")
+SHARED_DIR = os.path.join(HERE, "..", "..", "streamlit-database-app")
+sys.path[:0] = [BACKEND_DIR, SHARED_DIR]
+
+from migrations import migrate
+from validation import npi_check_digit
+
+# Share of requests per operation
+MIX = {"create": 0.1, "get": 0.4, "list": 0.3, "search": 0.2}
+STATUSES = ["Active", "Pending", "Terminated"]
+
+
+def bench_app():
+    """uvicorn factory: the API on a plain async pool to HETS_BENCH_CONNINFO."""
+    from contextlib import asynccontextmanager
+
+    from fastapi import FastAPI
+    from psycopg_pool import AsyncConnectionPool
+
+    from enrollments_api import router
+
+    @asynccontextmanager
+    async def lifespan(app):
+        app.state.schema_name = os.environ["HETS_BENCH_SCHEMA"]
+        async with AsyncConnectionPool(os.environ["HETS_BENCH_CONNINFO"], min_size=4, max_size=16,
+                                       kwargs={"autocommit": True}, open=False) as pool:
+            app.state.pool = pool
+            yield
+
+    app = FastAPI(lifespan=lifespan)
+    app.include_router(router)
+    return app
+
+
+def enrollment(i):
+    prefix = str(100000000 + i)
+    return {
+        "authorized_signatory_name": f"Signatory {i}",
+        "title": "Administrator",
+        "organization_name": f"Organization {i}",
+        "email_address": f"provider{i}@example.com",
+        "phone_number": "(555) 555-0100",
+        "ptan": f"PT{i:08d}",
+        "npi": prefix + str(npi_check_digit(prefix)),
+        "tax_id": "12-3456789",
+        "organization_type": "Clinic",
+        "vendor_clearinghouse_name": f"Clearinghouse {i % 20}",
+        "effective_date": "2025-01-01",
+        "relationship_status": STATUSES[i % len(STATUSES)],
+        "attested_by": f"Signatory {i}",
+    }
+
+
+class Workload:
+    def __init__(self, client, seeded):
+        self.client = client
+        self.provider_ids = list(seeded)
+        self.next_index = len(seeded)
+        self.samples = {op: [] for op in MIX}
+        self.failures = 0
+
+    async def create(self):
+        i, self.next_index = self.next_index, self.next_index + 1
+        response = await self.client.post("/api/enrollments", json=enrollment(i),
+                                          headers={"Idempotency-Key": str(uuid.uuid4())})
+        if response.status_code == 201:
+            self.provider_ids.append(response.json()["provider_id"])
+        return response
+
+    async def get(self):
+        return await self.client.get(f"/api/enrollments/{random.choice(self.provider_ids)}")
+
+    async def list(self):
+        return await self.client.get("/api/enrollments", params={"page_size": 25})
+
+    async def search(self):
+        return await self.client.get("/api/enrollments/search", params={
+            "vendor": f"Clearinghouse {random.randrange(20)}", "status": random.choice(STATUSES),
+        })
+
+    async def worker(self, deadline):
+        operations, weights = list(MIX), list(MIX.values())
+        while time.perf_counter() < deadline:
+            op = random.choices(operations, weights)[0]
+            start = time.perf_counter()
+            response = await getattr(self, op)()
+            self.samples[op].append((time.perf_counter() - start) * 1000)
+            if response.status_code >= 400:
+                self.failures += 1
+
+
+def report(name, samples, elapsed):
+    q = statistics.quantiles(samples, n=100)
+    print(f"{name:<8} {len(samples) / elapsed:8.0f} req/s  "
+          f"p50={q[49]:6.1f} ms  p95={q[94]:6.1f} ms  p99={q[98]:6.1f} ms")
+
+
+async def run(url, concurrency, duration, seed):
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=30) as client:
+        seeder = Workload(client, [])
+        for start in range(0, seed, concurrency):
+            await asyncio.gather(*(seeder.create() for _ in range(min(concurrency, seed - start))))
+        workload = Workload(client, seeder.provider_ids)
+        workload.next_index = seeder.next_index
+
+        started = time.perf_counter()
+        await asyncio.gather(*(workload.worker(started + duration) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    total = [s for samples in workload.samples.values() for s in samples]
+    print(f"concurrency={concurrency} duration={elapsed:.1f}s requests={len(total)} failures={workload.failures}")
+    report("all", total, elapsed)
+    for op, samples in workload.samples.items():
+        if len(samples) > 1:
+            report(op, samples, elapsed)
+
+
+def wait_until_ready(url, server, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if server.poll() is not None:
+            raise SystemExit("API server exited during startup")
+        try:
+            httpx.get(f"{url}/api/enrollments", params={"page_size": 1})
+            return
+        except httpx.TransportError:
+            time.sleep(0.2)
+    raise SystemExit("API server did not start")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="Base URL of a running API (skips the local server)")
+    parser.add_argument("--conninfo", default=os.getenv("HETS_TEST_PG_CONNINFO", ""))
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--seed", type=int, default=500, help="Enrollments to create before measuring")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    args = parser.parse_args()
+
+    if args.url:
+        asyncio.run(run(args.url, args.concurrency, args.duration, args.seed))
+        return
+
+    schema_name = f"hets_bench_{uuid.uuid4().hex[:8]}"
+    with psycopg.connect(args.conninfo) as admin:
+        migrate(admin, schema_name)
+    env = {
+        **os.environ,
+        "HETS_BENCH_CONNINFO": args.conninfo,
+        "HETS_BENCH_SCHEMA": schema_name,
+        "PYTHONPATH": os.pathsep.join([HERE, BACKEND_DIR, SHARED_DIR]),
+    }
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "api_load_bench:bench_app", "--factory",
+         "--port", str(args.port), "--workers", str(args.workers), "--log-level", "warning"],
+        env=env,
+    )
+    url = f"http://127.0.0.1:{args.port}"
+    try:
+        wait_until_ready(url, server)
+        asyncio.run(run(url, args.concurrency, args.duration, args.seed))
+    finally:
+        server.terminate()
+        server.wait()
+        with psycopg.connect(args.conninfo, autocommit=True) as admin:
+            admin.execute(f'DROP SCHEMA "{schema_name}" CASCADE')
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""Compare first and repeat page visits against plain and precompressed static serving.
+
+    python benchmarks/static_bench.py --visits 50
+
+Serves the same build (``--build``, or a synthetic Vite-like build of about
+the same shape as a React bundle) under uvicorn twice: with Starlette's
+plain ``StaticFiles`` and with ``static_files.PrecompressedStaticFiles``. A
+visit fetches ``index.html`` and every asset it references; repeat visits
+model a browser cache, skipping responses that are still fresh and
+revalidating the rest with ``If-None-Match``. Reports bytes on the wire (headers included),
+time to first byte of ``index.html``, total visit time over loopback, and
+that time plus the transfer time of the bytes on a ``--mbps`` link.
+"""
+import argparse
+import os
+import random
+import re
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.join(HERE, "..", "backend")
+sys.path.insert(0, BACKEND_DIR)
+
+from static_files import precompress
+
+ACCEPT_ENCODING = "gzip, deflate, br"
+ASSET_PATTERN = re.compile(r'(?:src|href)="(/assets/[^"]+)"')
+
+
+def bench_app():
+    """uvicorn factory serving STATIC_BENCH_DIR in STATIC_BENCH_MODE ("plain" or "precompressed")."""
+    from fastapi import FastAPI
+    from fastapi.staticfiles import StaticFiles
+
+    from static_files import PrecompressedStaticFiles
+
+    directory = os.environ["STATIC_BENCH_DIR"]
+    app = FastAPI()
+    if os.environ["STATIC_BENCH_MODE"] == "plain":
+        app.mount("/", StaticFiles(directory=directory, html=True))
+    else:
+        app.mount("/", PrecompressedStaticFiles(directory=directory, html=True))
+    return app
+
+
+def synthetic_build(directory, seed=7):
+    """Write index.html, a ~450 KB JS bundle and a ~40 KB stylesheet with Vite-style names."""
+    rng = random.Random(seed)
+    words = ["render", "state", "props", "useEffect", "children", "enrollment", "provider",
+             "vendor", "createElement", "className", "onClick", "value", "return", "const"]
+
+    def identifier():
+        return rng.choice(words) + str(rng.randrange(1000))
+
+    js = "".join(
+        f"function {identifier()}({identifier()},{identifier()}){{const {identifier()}="
+        f"{identifier()}.{identifier()}({rng.randrange(10**6)});return {identifier()}}}\n"
+        for _ in range(6000)
+    )
+    css = "".join(
+        f".{identifier()}{{margin:{rng.randrange(40)}px;color:#{rng.randrange(16**6):06x}}}\n"
+        for _ in range(1200)
+    )
+    os.makedirs(os.path.join(directory, "assets"))
+    with open(os.path.join(directory, "assets", "index-4f9c2a1b.js"), "w") as f:
+        f.write(js)
+    with open(os.path.join(directory, "assets", "index-7d3e8b60.css"), "w") as f:
+        f.write(css)
+    with open(os.path.join(directory, "index.html"), "w") as f:
+        f.write('<!DOCTYPE html>\n<html lang="en">\n  <head>\n    <meta charset="UTF-8" />\n'
+                '    <title>Databricks Demo App</title>\n'
+                '    <script type="module" crossorigin src="/assets/index-4f9c2a1b.js"></script>\n'
+                '    <link rel="stylesheet" crossorigin href="/assets/index-7d3e8b60.css">\n'
+                '  </head>\n  <body>\n    <div id="root"></div>\n  </body>\n</html>\n')
+
+
+def is_fresh(headers):
+    cache_control = headers.get("cache-control", "")
+    return "immutable" in cache_control or re.search(r"max-age=[1-9]", cache_control) is not None
+
+
+def visit(client, cache):
+    """Fetch index.html and its assets like a browser with ``cache``; returns (bytes, ttfb, seconds)."""
+    downloaded, ttfb = 0, None
+    started = time.perf_counter()
+    paths = ["/"]
+    while paths:
+        path = paths.pop(0)
+        cached = cache.get(path)
+        if cached is not None and is_fresh(cached["headers"]):
+            body = cached["body"]
+        else:
+            headers = {"Accept-Encoding": ACCEPT_ENCODING}
+            if cached is not None and "etag" in cached["headers"]:
+                headers["If-None-Match"] = cached["headers"]["etag"]
+            with client.stream("GET", path, headers=headers) as response:
+                if ttfb is None:
+                    ttfb = time.perf_counter() - started
+                body = response.read()
+                downloaded += response.num_bytes_downloaded + sum(len(k) + len(v) + 4 for k, v in response.headers.raw)
+                if response.status_code == 304:
+                    body = cached["body"]
+                else:
+                    cache[path] = {"headers": response.headers, "body": body}
+        if path == "/":
+            paths.extend(ASSET_PATTERN.findall(body.decode()))
+    return downloaded, ttfb or 0.0, time.perf_counter() - started
+
+
+def run(url, visits):
+    with httpx.Client(base_url=url) as client:
+        first = [visit(client, {}) for _ in range(visits)]
+        cache = {}
+        visit(client, cache)
+        repeat = [visit(client, cache) for _ in range(visits)]
+    return first, repeat
+
+
+def summarize(name, samples, mbps):
+    size = statistics.median(s[0] for s in samples)
+    ttfb = statistics.median(s[1] for s in samples) * 1000
+    total = statistics.median(s[2] for s in samples) * 1000
+    # Loopback has no bandwidth limit; add the time the bytes would take on a real link
+    on_link = total + size * 8 / (mbps * 1000)
+    print(f"{name:<24} {size:9.0f} B  ttfb={ttfb:6.2f} ms  visit={total:6.2f} ms  "
+          f"at {mbps:g} Mbit/s={on_link:7.1f} ms")
+
+
+def serve(mode, directory, port):
+    env = {**os.environ, "STATIC_BENCH_DIR": directory, "STATIC_BENCH_MODE": mode,
+           "PYTHONPATH": os.pathsep.join([HERE, BACKEND_DIR])}
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "static_bench:bench_app", "--factory",
+         "--port", str(port), "--log-level", "warning"],
+        env=env,
+    )
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            httpx.get(url)
+            return server, url
+        except httpx.TransportError:
+            time.sleep(0.2)
+    server.terminate()
+    raise SystemExit("static server did not start")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--build", help="Vite build directory (default: a synthetic build)")
+    parser.add_argument("--visits", type=int, default=50)
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--mbps", type=float, default=20.0, help="Link speed for the modelled visit time")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as scratch:
+        plain_dir = args.build or os.path.join(scratch, "plain")
+        if not args.build:
+            synthetic_build(plain_dir)
+        precompressed_dir = os.path.join(scratch, "precompressed")
+        shutil.copytree(plain_dir, precompressed_dir)
+        precompress(precompressed_dir)
+
+        for mode, directory in (("plain", plain_dir), ("precompressed", precompressed_dir)):
+            server, url = serve(mode, directory, args.port)
+            try:
+                first, repeat = run(url, args.visits)
+            finally:
+                server.terminate()
+                server.wait()
+            summarize(f"{mode} first visit", first, args.mbps)
+            summarize(f"{mode} repeat visit", repeat, args.mbps)
+
+
+if __name__ == "__main__":
+    main()
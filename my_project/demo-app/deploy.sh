@@ -17,6 +17,8 @@ echo "📦 Building and uploading frontend..."
 (
   cd frontend
   npm run build:ignore-types
+  # Write .br/.gz variants so the backend never compresses on the fly
+  python3 ../backend/static_files.py dist
   databricks workspace import-dir dist "$APP_FOLDER_IN_WORKSPACE/static" --overwrite
 ) &
 
@@ -30,6 +32,10 @@ echo "📦 Packaging and uploading backend..."
   if [ -f app_prod.py ]; then
     cp app_prod.py build/app.py
   fi
+  # The enrollment API shares its SQL, validation and migrations with the Streamlit app
+  SHARED=../../streamlit-database-app
+  cp "$SHARED"/{credentials,db,db_metrics,enrollments,export,migrations,query_cache,validation}.py "$SHARED"/schema.sql build/
+  cp -r "$SHARED"/migrations build/
   # Import and deploy the application
   databricks workspace import-dir build "$APP_FOLDER_IN_WORKSPACE" --overwrite
   rm -rf build
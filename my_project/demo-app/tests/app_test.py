@@ -0,0 +1,40 @@
+import importlib.util
+import os
+
+import pytest
+
+pytest.importorskip("httpx")
+
+from fastapi.testclient import TestClient
+
+import db
+
+BACKEND_APP = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend", "app.py")
+
+
+def load_backend_app():
+    # Loaded by path: ``app`` on sys.path is the Streamlit app
+    spec = importlib.util.spec_from_file_location("backend_app", BACKEND_APP)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_serves_without_database_and_api_answers_503(monkeypatch):
+    attempts = []
+
+    def no_credentials():
+        attempts.append(1)
+        raise RuntimeError("no workspace credentials")
+
+    monkeypatch.setattr(db, "get_credential_provider", no_credentials)
+    backend = load_backend_app()
+    with TestClient(backend.app) as client:
+        assert client.get("/").status_code == 200
+        assert client.get("/metrics").status_code == 200
+        response = client.get("/api/enrollments")
+        assert response.status_code == 503
+        assert response.headers["retry-after"] == "30"
+        # Within DB_RETRY_SECONDS of the startup attempt, requests do not reconnect
+        assert client.get("/api/enrollments/1").status_code == 503
+    assert len(attempts) == 1
@@ -0,0 +1,36 @@
+import os
+import sys
+
+import pytest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+# The backend imports the shared modules that deploy.sh copies next to it
+sys.path.insert(0, os.path.join(HERE, "..", "backend"))
+sys.path.insert(0, os.path.join(HERE, "..", "..", "streamlit-database-app"))
+
+
+@pytest.fixture
+def pg_conninfo():
+    """Connection string for a disposable local Postgres (HETS_TEST_PG_CONNINFO)."""
+    conninfo = os.getenv("HETS_TEST_PG_CONNINFO")
+    if not conninfo:
+        pytest.skip("HETS_TEST_PG_CONNINFO is not set")
+    return conninfo
+
+
+@pytest.fixture
+def hets_schema(pg_conninfo):
+    """A freshly migrated, uniquely named HETS schema; yields its name."""
+    import uuid
+
+    psycopg = pytest.importorskip("psycopg")
+    from migrations import migrate
+
+    schema_name = f"hets_test_{uuid.uuid4().hex[:8]}"
+    with psycopg.connect(pg_conninfo) as conn:
+        migrate(conn, schema_name)
+    try:
+        yield schema_name
+    finally:
+        with psycopg.connect(pg_conninfo, autocommit=True) as conn:
+            conn.execute(f'DROP SCHEMA IF EXISTS "{schema_name}" CASCADE')
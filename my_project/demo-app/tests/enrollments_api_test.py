@@ -0,0 +1,124 @@
+import asyncio
+import uuid
+
+import pytest
+
+pytest.importorskip("fastapi")
+httpx = pytest.importorskip("httpx")
+
+from fastapi import FastAPI
+from psycopg_pool import AsyncConnectionPool
+
+from enrollments_api import decode_cursor, encode_cursor, router
+
+ENROLLMENT = {
+    "authorized_signatory_name": "Jane Doe",
+    "title": "Administrator",
+    "organization_name": "Acme Clinic",
+    "email_address": "jane@example.com",
+    "phone_number": "(555) 555-0100",
+    "ptan": "PTAN12345",
+    "npi": "1234567893",
+    "tax_id": "12-3456789",
+    "organization_type": "Clinic",
+    "vendor_clearinghouse_name": "Clearinghouse",
+    "effective_date": "2025-01-01",
+    "attested_by": "Jane Doe",
+}
+
+
+def run_api(conninfo, schema_name, scenario):
+    """Run ``scenario(client)`` against the router on a fresh async pool."""
+    async def main():
+        app = FastAPI()
+        app.include_router(router)
+        app.state.schema_name = schema_name
+        async with AsyncConnectionPool(conninfo, kwargs={"autocommit": True}, open=False) as pool:
+            app.state.pool = pool
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                return await scenario(client)
+    return asyncio.run(main())
+
+
+def test_cursor_round_trip():
+    from datetime import datetime, timezone
+
+    cursor = (datetime(2025, 1, 2, 3, 4, 5, 678, tzinfo=timezone.utc), 42)
+    assert decode_cursor(encode_cursor(cursor)) == cursor
+
+
+def test_create_get_and_replay(pg_conninfo, hets_schema):
+    key = str(uuid.uuid4())
+
+    async def scenario(client):
+        created = await client.post("/api/enrollments", json=ENROLLMENT, headers={"Idempotency-Key": key})
+        replayed = await client.post("/api/enrollments", json=ENROLLMENT, headers={"Idempotency-Key": key})
+        detail = await client.get(created.headers["location"])
+        missing = await client.get("/api/enrollments/999999")
+        return created, replayed, detail, missing
+
+    created, replayed, detail, missing = run_api(pg_conninfo, hets_schema, scenario)
+    assert created.status_code == 201 and created.json()["outcome"] == "created"
+    assert replayed.status_code == 200
+    assert replayed.json() == {"provider_id": created.json()["provider_id"], "outcome": "replayed"}
+    body = detail.json()
+    assert body["provider"]["npi"] == "1234567893"
+    assert len(body["vendors"]) == 1 and len(body["attestations"]) == 1
+    assert missing.status_code == 404
+
+
+def test_create_reports_validation_codes(pg_conninfo, hets_schema):
+    async def scenario(client):
+        return await client.post("/api/enrollments", json={**ENROLLMENT, "npi": "1234567890", "title": ""})
+
+    response = run_api(pg_conninfo, hets_schema, scenario)
+    assert response.status_code == 422
+    codes = {(e["field"], e["code"]) for e in response.json()["detail"]}
+    assert codes == {("title", "required"), ("npi", "invalid_npi_check_digit")}
+
+
+def test_list_pages_and_search(pg_conninfo, hets_schema):
+    npis = ["1234567893", "1234567901", "1245319599"]
+
+    async def scenario(client):
+        for i, npi in enumerate(npis):
+            status = "Terminated" if i == 0 else "Active"
+            response = await client.post("/api/enrollments", json={
+                **ENROLLMENT, "npi": npi, "ptan": f"PTAN0000{i}", "relationship_status": status,
+            })
+            assert response.status_code == 201, response.text
+        first = (await client.get("/api/enrollments", params={"page_size": 2})).json()
+        second = (await client.get("/api/enrollments", params={"page_size": 2, "cursor": first["next_cursor"]})).json()
+        search = (await client.get("/api/enrollments/search", params={"status": "Terminated"})).json()
+        typeahead = (await client.get("/api/enrollments/typeahead", params={"q": "acme cli", "limit": 2})).json()
+        bad_cursor = await client.get("/api/enrollments", params={"cursor": "nope"})
+        return first, second, search, typeahead, bad_cursor
+
+    first, second, search, typeahead, bad_cursor = run_api(pg_conninfo, hets_schema, scenario)
+    assert [item["npi"] for item in first["items"] + second["items"]] == npis[::-1]
+    assert second["next_cursor"] is None
+    assert [item["npi"] for item in search["items"]] == [npis[0]]
+    assert [item["organization_name"] for item in typeahead["items"]] == ["Acme Clinic"] * 2
+    assert bad_cursor.status_code == 400
+
+
+def test_export_streams_csv_and_parquet(pg_conninfo, hets_schema):
+    import csv
+    import io
+
+    async def scenario(client):
+        await client.post("/api/enrollments", json=ENROLLMENT)
+        csv_response = await client.get("/api/enrollments/export")
+        parquet_response = await client.get("/api/enrollments/export", params={"format": "parquet"})
+        unknown = await client.get("/api/enrollments/export", params={"format": "xml"})
+        return csv_response, parquet_response, unknown
+
+    csv_response, parquet_response, unknown = run_api(pg_conninfo, hets_schema, scenario)
+    assert csv_response.headers["content-type"].startswith("text/csv")
+    assert "attachment" in csv_response.headers["content-disposition"]
+    rows = list(csv.DictReader(io.StringIO(csv_response.text)))
+    assert [row["npi"] for row in rows] == ["1234567893"]
+    pq = pytest.importorskip("pyarrow.parquet")
+    assert pq.read_table(io.BytesIO(parquet_response.content)).column("npi").to_pylist() == ["1234567893"]
+    assert unknown.status_code == 422
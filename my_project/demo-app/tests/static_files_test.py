@@ -0,0 +1,76 @@
+import pytest
+
+pytest.importorskip("httpx")
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from static_files import IMMUTABLE_CACHE_CONTROL, PrecompressedStaticFiles, brotli, precompress
+
+BUNDLE = "export function render(){return 'hello world';}\n" * 200
+
+
+@pytest.fixture
+def build(tmp_path):
+    """A Vite-like build: index.html plus a fingerprinted bundle."""
+    site = tmp_path / "dist"
+    (site / "assets").mkdir(parents=True)
+    (site / "index.html").write_text("<!doctype html><script src='/assets/index-abc123.js'></script>" * 40)
+    (site / "assets" / "index-abc123.js").write_text(BUNDLE)
+    return site
+
+
+def client_for(site, tmp_path):
+    app = FastAPI()
+    app.mount("/", PrecompressedStaticFiles(directory=site, html=True, cache_dir=tmp_path / "cache"))
+    return TestClient(app)
+
+
+def test_serves_build_time_variant_with_cache_headers(build, tmp_path):
+    assert precompress(build) >= 2
+    client = client_for(build, tmp_path)
+
+    response = client.get("/assets/index-abc123.js", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["content-type"].startswith("text/javascript")
+    assert response.headers["cache-control"] == IMMUTABLE_CACHE_CONTROL
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert int(response.headers["content-length"]) < len(BUNDLE) / 10
+    assert response.text == BUNDLE
+
+    identity = client.get("/assets/index-abc123.js", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in identity.headers
+    assert identity.text == BUNDLE
+
+
+def test_generates_variants_on_first_request(build, tmp_path):
+    client = client_for(build, tmp_path)
+    response = client.get("/", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["cache-control"] == "no-cache"
+    assert not (build / "index.html.gz").exists()
+    assert list((tmp_path / "cache").rglob("index.html.gz"))
+
+
+@pytest.mark.skipif(brotli is None, reason="brotli is not installed")
+def test_prefers_brotli(build, tmp_path):
+    client = client_for(build, tmp_path)
+    response = client.get("/assets/index-abc123.js", headers={"Accept-Encoding": "gzip, br"})
+    assert response.headers["content-encoding"] == "br"
+
+
+def test_index_revalidates_with_etag(build, tmp_path):
+    client = client_for(build, tmp_path)
+    first = client.get("/", headers={"Accept-Encoding": "gzip"})
+    repeat = client.get("/", headers={"Accept-Encoding": "gzip", "If-None-Match": first.headers["etag"]})
+    assert repeat.status_code == 304
+    assert repeat.content == b""
+
+
+def test_spa_fallback(build, tmp_path):
+    client = client_for(build, tmp_path)
+    route = client.get("/enrollments/42", headers={"Accept-Encoding": "identity"})
+    assert route.status_code == 200
+    assert route.text == (build / "index.html").read_text()
+    assert client.get("/assets/missing-123.js").status_code == 404
+    assert client.get("/favicon.png").status_code == 404
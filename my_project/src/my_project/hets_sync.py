@@ -0,0 +1,212 @@
+"""Incremental sync of the HETS enrollment tables from Postgres into Delta.
+
+The first run copies each ``hets_*`` table in full from one REPEATABLE READ
+snapshot and records the snapshot's xmin as the watermark. Later runs read
+``hets_change_log`` (filled by triggers, see the streamlit-database-app
+migration ``0007_change_log.sql``) for the transactions between the
+watermark and the xmin of a new snapshot, fetch the current version of every
+changed key from that same snapshot and MERGE them into the Delta tables,
+deleting keys that no longer exist. Every transaction below a snapshot's
+xmin has finished, so no change is ever skipped; changes that are read twice
+merge to the same result. Consumed log entries are pruned once the new
+watermark is saved, so there must be a single sync per source schema.
+Tables that later migrations add are copied in full by the next run, and
+columns they add are added to the Delta tables before merging.
+"""
+from typing import Optional
+
+from pyspark.sql import DataFrame, SparkSession
+from pyspark.sql import types as T
+
+# Source table -> primary key
+SYNC_TABLES = {
+    "hets_providers": "provider_id",
+    "hets_vendor_relationships": "relationship_id",
+    "hets_attestations": "attestation_id",
+    "hets_submission_history": "submission_id",
+    "hets_attestation_templates": "template_id",
+}
+STATE_TABLE = "hets_sync_state"
+DELETED_COLUMN = "_deleted"
+FETCH_ROWS = 10000
+# Postgres type name -> Spark type; anything else is synced as a string
+SPARK_TYPES = {
+    "int2": T.ShortType,
+    "int4": T.IntegerType,
+    "int8": T.LongType,
+    "bool": T.BooleanType,
+    "float4": T.FloatType,
+    "float8": T.DoubleType,
+    "date": T.DateType,
+    "timestamp": T.TimestampNTZType,
+    "timestamptz": T.TimestampType,
+    "bytea": T.BinaryType,
+}
+
+CHANGED_ROWS = """
+    SELECT c.row_key, t.*
+    FROM (
+        SELECT DISTINCT row_key
+        FROM {schema}.hets_change_log
+        WHERE table_name = %(table)s AND txid >= %(since)s::text::xid8 AND txid < %(until)s::text::xid8
+    ) c
+    LEFT JOIN {schema}.{table} t ON t.{key} = c.row_key
+"""
+
+
+def spark_schema(description, adapters) -> T.StructType:
+    """Spark schema for the columns of a psycopg cursor ``description``."""
+    fields = []
+    for column in description:
+        info = adapters.types.get(column.type_code)
+        spark_type = SPARK_TYPES.get(info.name if info else None, T.StringType)
+        fields.append(T.StructField(column.name, spark_type(), True))
+    return T.StructType(fields)
+
+
+def stringify(rows, schema: T.StructType) -> list[tuple]:
+    """``rows`` with the values of string fields (uuid, numeric, json, ...) converted with ``str()``.
+
+    psycopg returns those as Python objects (``uuid.UUID``, ``Decimal``),
+    which Arrow will not take for a string column.
+    """
+    indexes = [i for i, field in enumerate(schema.fields) if isinstance(field.dataType, T.StringType)]
+    if not indexes:
+        return rows
+    converted = []
+    for row in rows:
+        row = list(row)
+        for i in indexes:
+            if row[i] is not None and not isinstance(row[i], str):
+                row[i] = str(row[i])
+        converted.append(tuple(row))
+    return converted
+
+
+def snapshot_xmin(conn) -> int:
+    """The xmin of the current transaction's snapshot: every older transaction has finished."""
+    return int(conn.execute("SELECT pg_snapshot_xmin(pg_current_snapshot())::text").fetchone()[0])
+
+
+def load_watermark(spark: SparkSession, target: str) -> Optional[int]:
+    """Watermark saved by the last successful sync into ``target``, or None."""
+    if not spark.catalog.tableExists(f"{target}.{STATE_TABLE}"):
+        return None
+    row = spark.sql(f"SELECT watermark FROM {target}.{STATE_TABLE} ORDER BY synced_at DESC LIMIT 1").first()
+    return row.watermark if row else None
+
+
+def save_watermark(spark: SparkSession, target: str, watermark: int, full: bool, rows: int) -> None:
+    state = spark.sql(
+        f"SELECT CAST({watermark} AS BIGINT) AS watermark, current_timestamp() AS synced_at, "
+        f"{str(full).upper()} AS full, CAST({rows} AS BIGINT) AS rows"
+    )
+    state.write.format("delta").mode("append").saveAsTable(f"{target}.{STATE_TABLE}")
+
+
+def copy_table(spark: SparkSession, conn, source_schema: str, table: str, target: str, batch_rows: int) -> int:
+    """Replace ``target.table`` with a full copy of the source table; returns the row count."""
+    from psycopg import sql
+
+    copied = 0
+    with conn.cursor(name=f"hets_sync_{table}") as cur:
+        cur.execute(sql.SQL("SELECT * FROM {}.{}").format(sql.Identifier(source_schema), sql.Identifier(table)))
+        schema = spark_schema(cur.description, conn.adapters)
+        mode = "overwrite"
+        while rows := cur.fetchmany(batch_rows):
+            spark.createDataFrame(stringify(rows, schema), schema).write.format("delta").mode(mode) \
+                .option("overwriteSchema", "true").saveAsTable(f"{target}.{table}")
+            mode = "append"
+            copied += len(rows)
+        if mode == "overwrite":
+            spark.createDataFrame([], schema).write.format("delta").mode(mode) \
+                .option("overwriteSchema", "true").saveAsTable(f"{target}.{table}")
+    return copied
+
+
+def read_changes(spark: SparkSession, conn, source_schema: str, table: str, since: int, until: int,
+                 batch_rows: int) -> tuple[Optional[DataFrame], int]:
+    """Current version of every row of ``table`` changed in ``[since, until)``, and how many.
+
+    Keys that no longer exist come back with only the key set and
+    ``_deleted`` true. The DataFrame is None when nothing changed.
+    """
+    from psycopg import sql
+
+    key = SYNC_TABLES[table]
+    query = sql.SQL(CHANGED_ROWS).format(
+        schema=sql.Identifier(source_schema), table=sql.Identifier(table), key=sql.Identifier(key)
+    )
+    changes, count = None, 0
+    with conn.cursor(name=f"hets_sync_{table}") as cur:
+        cur.execute(query, {"table": table, "since": since, "until": until})
+        schema = spark_schema(cur.description[1:], conn.adapters)
+        schema.add(T.StructField(DELETED_COLUMN, T.BooleanType(), False))
+        key_index = schema.fieldNames().index(key)
+        while rows := cur.fetchmany(batch_rows):
+            batch = []
+            for row_key, *values in rows:
+                deleted = values[key_index] is None
+                if deleted:
+                    values = [None] * len(values)
+                    values[key_index] = row_key
+                batch.append((*values, deleted))
+            frame = spark.createDataFrame(stringify(batch, schema), schema)
+            changes = frame if changes is None else changes.unionByName(frame)
+            count += len(batch)
+    return changes, count
+
+
+def merge_changes(spark: SparkSession, changes: DataFrame, target_table: str, key: str) -> None:
+    """MERGE ``changes`` into ``target_table`` by ``key``: upsert live rows, delete ``_deleted`` ones."""
+    columns = [c for c in changes.columns if c != DELETED_COLUMN]
+    existing = set(spark.table(target_table).columns)
+    added = [f for f in changes.schema.fields if f.name in columns and f.name not in existing]
+    if added:
+        spark.sql(f"ALTER TABLE {target_table} ADD COLUMNS "
+                  f"({', '.join(f'`{f.name}` {f.dataType.simpleString()}' for f in added)})")
+    view = f"hets_sync_changes_{key}"
+    changes.createOrReplaceTempView(view)
+    spark.sql(f"""
+        MERGE INTO {target_table} t
+        USING {view} s
+        ON t.`{key}` = s.`{key}`
+        WHEN MATCHED AND s.{DELETED_COLUMN} THEN DELETE
+        WHEN MATCHED THEN UPDATE SET {", ".join(f"t.`{c}` = s.`{c}`" for c in columns)}
+        WHEN NOT MATCHED AND NOT s.{DELETED_COLUMN} THEN INSERT ({", ".join(f"`{c}`" for c in columns)})
+            VALUES ({", ".join(f"s.`{c}`" for c in columns)})
+    """)
+    spark.catalog.dropTempView(view)
+
+
+def sync_hets(spark: SparkSession, conninfo: str, source_schema: str, target: str, full: bool = False,
+              password: Optional[str] = None, batch_rows: int = FETCH_ROWS) -> dict[str, int]:
+    """Sync the ``hets_*`` tables of ``source_schema`` into Delta tables in ``target`` (``catalog.schema``).
+
+    Returns the number of rows copied (full) or changed (incremental) per table.
+    """
+    import psycopg
+    from psycopg import IsolationLevel, sql
+
+    spark.sql(f"CREATE SCHEMA IF NOT EXISTS {target}")
+    since = None if full else load_watermark(spark, target)
+    counts = {}
+    with psycopg.connect(conninfo, **({"password": password} if password else {})) as conn:
+        conn.isolation_level = IsolationLevel.REPEATABLE_READ
+        with conn.transaction():
+            until = snapshot_xmin(conn)
+            for table, key in SYNC_TABLES.items():
+                if since is None or not spark.catalog.tableExists(f"{target}.{table}"):
+                    counts[table] = copy_table(spark, conn, source_schema, table, target, batch_rows)
+                    continue
+                changes, counts[table] = read_changes(spark, conn, source_schema, table, since, until, batch_rows)
+                if changes is not None:
+                    merge_changes(spark, changes, f"{target}.{table}", key)
+        save_watermark(spark, target, until, since is None, sum(counts.values()))
+
+        conn.autocommit = True
+        conn.execute(
+            sql.SQL("DELETE FROM {}.hets_change_log WHERE txid < %s::text::xid8").format(sql.Identifier(source_schema)),
+            (until,)
+        )
+    return counts
@@ -1,8 +1,82 @@
-from pyspark.sql import SparkSession, DataFrame
+import argparse
+import contextlib
+import io
+import os
+from datetime import datetime
+from functools import reduce
+from typing import Optional, Sequence, Union
+
+from pyspark.sql import Column, SparkSession, DataFrame
+from pyspark.sql import functions as F
+
+TAXIS_TABLE = "samples.nyctaxi.trips"
+# Trips at or above this fare are left out of filtered_taxis
+FARE_LIMIT = 30
+
+
+# Set MY_PROJECT_TAXIS_TABLE to read another table with the same schema,
+# such as synthetic data from my_project.synthetic.
+def taxis_table() -> str:
+    return os.getenv("MY_PROJECT_TAXIS_TABLE", TAXIS_TABLE)
 
 
 def get_taxis(spark: SparkSession) -> DataFrame:
-    return spark.read.table("samples.nyctaxi.trips")
+    return read_taxis(spark)
+
+
+def filtered_taxis(spark: SparkSession, streaming: bool = False) -> DataFrame:
+    """The trips kept by the pipeline's ``filtered_taxis`` table."""
+    return read_taxis(spark, max_fare=FARE_LIMIT, streaming=streaming)
+
+
+def read_taxis(
+    spark: SparkSession,
+    columns: Optional[Sequence[str]] = None,
+    pickup_from: Optional[Union[datetime, str]] = None,
+    pickup_until: Optional[Union[datetime, str]] = None,
+    min_fare: Optional[float] = None,
+    max_fare: Optional[float] = None,
+    min_distance: Optional[float] = None,
+    max_distance: Optional[float] = None,
+    table: Optional[str] = None,
+    streaming: bool = False,
+) -> DataFrame:
+    """Read only the taxi trips and columns a consumer needs.
+
+    Each bound is a half-open range (``min``/``from`` inclusive,
+    ``max``/``until`` exclusive). The predicates are plain column comparisons
+    applied directly to the table scan, so Spark pushes them into the file
+    reader (Delta data skipping, Parquet row-group filters) and reads only
+    ``columns`` from storage. Use ``scan_plan()`` to check what was pushed.
+    ``table`` defaults to ``taxis_table()``.
+    With ``streaming``, the same scan is a streaming read that only returns
+    trips appended since the consuming query's last checkpoint.
+    """
+    predicates: list[Column] = []
+    for column, lower, upper in (
+        ("tpep_pickup_datetime", pickup_from, pickup_until),
+        ("fare_amount", min_fare, max_fare),
+        ("trip_distance", min_distance, max_distance),
+    ):
+        if lower is not None:
+            predicates.append(F.col(column) >= F.lit(lower))
+        if upper is not None:
+            predicates.append(F.col(column) < F.lit(upper))
+
+    taxis = (spark.readStream if streaming else spark.read).table(table or taxis_table())
+    if predicates:
+        taxis = taxis.filter(reduce(lambda a, b: a & b, predicates))
+    if columns:
+        taxis = taxis.select(*columns)
+    return taxis
+
+
+def scan_plan(df: DataFrame) -> str:
+    """The formatted physical plan of ``df``, including each scan's PushedFilters and ReadSchema."""
+    plan = io.StringIO()
+    with contextlib.redirect_stdout(plan):
+        df.explain(mode="formatted")
+    return plan.getvalue()
 
 
 # Create a new Databricks Connect session. If this fails,
@@ -14,11 +88,89 @@ def get_spark() -> SparkSession:
 
         return DatabricksSession.builder.getOrCreate()
     except ImportError:
-        return SparkSession.builder.getOrCreate()
+        if os.getenv("DATABRICKS_RUNTIME_VERSION"):
+            return SparkSession.builder.getOrCreate()
+        return get_local_spark()
+
+
+# Offline fallback: a local session with Delta Lake when delta-spark is installed,
+# for tests and benchmarks over my_project.synthetic data.
+def get_local_spark() -> SparkSession:
+    builder = (
+        SparkSession.builder.master(os.getenv("MY_PROJECT_SPARK_MASTER", "local[*]"))
+        .config("spark.sql.session.timeZone", "UTC")
+        .config("spark.sql.shuffle.partitions", os.getenv("MY_PROJECT_SHUFFLE_PARTITIONS", "8"))
+    )
+    warehouse = os.getenv("MY_PROJECT_WAREHOUSE_DIR")
+    if warehouse:
+        builder = builder.config("spark.sql.warehouse.dir", warehouse)
+    try:
+        from delta import configure_spark_with_delta_pip
+    except ImportError:
+        return builder.getOrCreate()
+    builder = (
+        builder.config("spark.sql.extensions", "io.delta.sql.DeltaSparkSessionExtension")
+        .config("spark.sql.catalog.spark_catalog", "org.apache.spark.sql.delta.catalog.DeltaCatalog")
+    )
+    return configure_spark_with_delta_pip(builder).getOrCreate()
+
+
+# Lakebase accepts the OAuth token of the calling identity as its password.
+def get_pg_password() -> Optional[str]:
+    if os.getenv("PGPASSWORD"):
+        return None
+    try:
+        from databricks.sdk import WorkspaceClient
+    except ImportError:
+        return None
+    return WorkspaceClient().config.oauth_token().access_token
+
+
+def sync_hets_tables(args: argparse.Namespace) -> None:
+    from my_project.hets_sync import sync_hets
+
+    # The daily job runs this task on every target; targets without the bundle
+    # variables set have no HETS database to sync from
+    if not args.conninfo or not args.source_schema:
+        print("HETS sync is not configured (no connection string or source schema); skipping")
+        return
+    counts = sync_hets(get_spark(), args.conninfo, args.source_schema, args.target,
+                       full=args.full, password=get_pg_password())
+    for table, rows in counts.items():
+        print(f"{table}: {rows} rows")
+
+
+def write_synthetic_taxis(args: argparse.Namespace) -> None:
+    from my_project.synthetic import generate_taxis, write_taxis
+
+    write_taxis(generate_taxis(get_spark(), args.rows, args.seed), table=args.table, path=args.path, fmt=args.format)
+
 
+def main(argv: Optional[list[str]] = None):
+    parser = argparse.ArgumentParser(prog="main")
+    commands = parser.add_subparsers(dest="command")
+    sync = commands.add_parser("sync-hets", help="Sync the HETS enrollment tables from Postgres into Delta")
+    sync.add_argument("--conninfo", default=os.getenv("HETS_PG_CONNINFO", ""),
+                      help="libpq connection string of the HETS database (default: $HETS_PG_CONNINFO)")
+    sync.add_argument("--source-schema", required=True, help="Postgres schema holding the hets_* tables")
+    sync.add_argument("--target", required=True, help="catalog.schema for the Delta tables")
+    sync.add_argument("--full", action="store_true", help="Copy every table in full instead of syncing changes")
+    synthetic = commands.add_parser("synthetic-taxis", help="Write seeded synthetic taxi trips")
+    synthetic.add_argument("--rows", type=int, default=10000)
+    synthetic.add_argument("--seed", type=int, default=0)
+    synthetic.add_argument("--format", choices=["delta", "parquet"], default="delta")
+    synthetic.add_argument("--table", help="Table to create (read it with MY_PROJECT_TAXIS_TABLE)")
+    synthetic.add_argument("--path", help="Directory for the files")
+    args = parser.parse_args(argv)
 
-def main():
-    get_taxis(get_spark()).show(5)
+    if args.command == "sync-hets":
+        sync_hets_tables(args)
+    elif args.command == "synthetic-taxis":
+        if not args.table and not args.path:
+            parser.error("synthetic-taxis needs --table or --path")
+        write_synthetic_taxis(args)
+    else:
+        get_taxis(get_spark()).show(5)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,63 @@
+"""Seeded synthetic taxi trips with the schema of ``samples.nyctaxi.trips``.
+
+Every value is a hash of the row number and the seed, so the same ``rows``
+and ``seed`` give the same trips however the job is partitioned, and tables
+of 10k to 100M rows are generated in parallel without a driver-side sample.
+The distributions are rough but shaped like the real data: pickups spread
+over January and February 2016, mostly short trips with a long tail, fares
+that follow the meter (base fare plus a per-mile rate) and Manhattan zip
+codes. Point the taxi readers at a generated table with
+``MY_PROJECT_TAXIS_TABLE`` (see ``my_project.main.taxis_table()``).
+"""
+from typing import Optional
+
+from pyspark.sql import Column, DataFrame, SparkSession
+from pyspark.sql import functions as F
+
+# 2016-01-01 00:00:00 UTC
+PICKUP_START = 1451606400
+PICKUP_DAYS = 60
+MEAN_DISTANCE = 2.8
+MAX_DISTANCE = 50.0
+BASE_FARE = 2.5
+FARE_PER_MILE = 2.5
+# Manhattan zip codes 10001-10282
+FIRST_ZIP = 10001
+ZIP_COUNT = 282
+
+
+def uniform(seed: int, stream: int) -> Column:
+    """A deterministic uniform [0, 1) value per row, independent for each ``stream``."""
+    bits = F.xxhash64(F.col("id"), F.lit(seed), F.lit(stream)).bitwiseAND(F.lit((1 << 53) - 1))
+    return bits.cast("double") / F.lit(float(1 << 53))
+
+
+def generate_taxis(spark: SparkSession, rows: int, seed: int = 0, partitions: Optional[int] = None) -> DataFrame:
+    """``rows`` synthetic trips, identical for the same ``rows`` and ``seed``."""
+    distance = F.least(F.round(-F.log1p(-uniform(seed, 1)) * MEAN_DISTANCE, 2), F.lit(MAX_DISTANCE))
+    pickup_seconds = F.lit(PICKUP_START) + F.floor(uniform(seed, 0) * PICKUP_DAYS * 86400)
+    # 2 to 6 minutes per mile plus a minute at either end
+    trip_seconds = F.floor((distance * (2 + 4 * uniform(seed, 2)) + 2) * 60)
+    return (
+        spark.range(rows, numPartitions=partitions)
+        .select(
+            F.timestamp_seconds(pickup_seconds).alias("tpep_pickup_datetime"),
+            F.timestamp_seconds(pickup_seconds + trip_seconds).alias("tpep_dropoff_datetime"),
+            distance.alias("trip_distance"),
+            F.round(BASE_FARE + FARE_PER_MILE * distance + 3 * uniform(seed, 3), 1).alias("fare_amount"),
+            (FIRST_ZIP + F.floor(uniform(seed, 4) * ZIP_COUNT)).cast("int").alias("pickup_zip"),
+            (FIRST_ZIP + F.floor(uniform(seed, 5) * ZIP_COUNT)).cast("int").alias("dropoff_zip"),
+        )
+    )
+
+
+def write_taxis(taxis: DataFrame, table: Optional[str] = None, path: Optional[str] = None,
+                fmt: str = "delta") -> None:
+    """Overwrite ``table`` (optionally stored at ``path``) or the files at ``path`` with ``taxis``."""
+    writer = taxis.write.format(fmt).mode("overwrite")
+    if path:
+        writer = writer.option("path", path)
+    if table:
+        writer.saveAsTable(table)
+    else:
+        writer.save()
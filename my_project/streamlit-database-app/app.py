@@ -1,289 +1,527 @@
 import streamlit as st
-import psycopg
 import os
-import time
-import re
+import tempfile
+import uuid
 from datetime import datetime, date
-from databricks import sdk
-from psycopg import sql
-from psycopg_pool import ConnectionPool
-
-# Database connection setup
-workspace_client = sdk.WorkspaceClient()
-postgres_password = None
-last_password_refresh = 0
-connection_pool = None
-
-def refresh_oauth_token():
-    """Refresh OAuth token if expired."""
-    global postgres_password, last_password_refresh
-    if postgres_password is None or time.time() - last_password_refresh > 900:
-        print("Refreshing PostgreSQL OAuth token")
-        try:
-            postgres_password = workspace_client.config.oauth_token().access_token
-            last_password_refresh = time.time()
-        except Exception as e:
-            st.error(f"❌ Failed to refresh OAuth token: {str(e)}")
-            st.stop()
-
-def get_connection_pool():
-    """Get or create the connection pool."""
-    global connection_pool
-    if connection_pool is None:
-        refresh_oauth_token()
-        conn_string = (
-            f"dbname={os.getenv('PGDATABASE')} "
-            f"user={os.getenv('PGUSER')} "
-            f"password={postgres_password} "
-            f"host={os.getenv('PGHOST')} "
-            f"port={os.getenv('PGPORT')} "
-            f"sslmode={os.getenv('PGSSLMODE', 'require')} "
-            f"application_name={os.getenv('PGAPPNAME')}"
-        )
-        connection_pool = ConnectionPool(conn_string, min_size=2, max_size=10)
-    return connection_pool
 
-def get_connection():
-    """Get a connection from the pool."""
-    global connection_pool
-    
-    # Recreate pool if token expired
-    if postgres_password is None or time.time() - last_password_refresh > 900:
-        if connection_pool:
-            connection_pool.close()
-            connection_pool = None
-    
-    return get_connection_pool().connection()
+import db
+import startup
+from bulk_import import IMPORT_COLUMNS, load_enrollments, read_roster, validate_rows
+from db import get_connection, get_read_connection, get_schema_name
+from db_metrics import db_metrics, pool_stats
+from enrollments import (
+    ATTESTATION_TEXT, DEFAULT_PAGE_SIZE, ENROLLMENT_COLUMNS, SEARCH_COLUMNS, filters_key, find_enrollment,
+    get_enrollment_detail, insert_enrollment, list_enrollments, search_providers
+)
+from export import EXPORT_FORMATS, export_enrollments
+from migrations import ensure_schema
+from partitions import maintain_partitions
+from query_cache import enrollment_cache, listen_for_changes
+from submission_queue import get_queue, postgres_writer
+from validation import MAX_LENGTHS, ORGANIZATION_TYPES, RELATIONSHIP_STATUSES, validate_enrollment
+
+# Users (as forwarded by Databricks Apps) who see the database ops panel
+ADMIN_EMAILS = {e.strip().lower() for e in os.getenv("HETS_ADMIN_EMAILS", "").split(",") if e.strip()}
+
+# Seconds a page waits for the background warm-up before showing an error
+WARM_UP_TIMEOUT = 60
+
+def migrate_database():
+    """Apply pending schema migrations for HETS EDI Enrollment (once per process)."""
+    with db_metrics.track("init_database"):
+        ensure_schema()
+
+def start_workers():
+    """Start the change listener and, if submissions are queued, the submission queue worker."""
+    listen_for_changes(lambda: db.connect(autocommit=True), get_schema_name(), on_change=db.record_write)
+    queue = get_queue()
+    if queue is not None:
+        queue.start(postgres_writer(get_connection, on_flushed=submissions_flushed))
 
-def get_schema_name():
-    """Get the schema name in the format {PGAPPNAME}_schema_{PGUSER}."""
-    pgappname = os.getenv("PGAPPNAME", "my_app")
-    pguser = os.getenv("PGUSER", "").replace('-', '')
-    return f"{pgappname}_schema_{pguser}"
+def start_partition_maintenance():
+    """Create the audit tables' partitions for the coming months in the background, now and every few hours.
+
+    Partitions exist months before they are needed, so the app is ready
+    without waiting for the first check, which can scan the legacy partitions.
+    """
+    maintain_partitions(get_connection, get_schema_name())
+
+# Run in order on a background thread (see startup.py)
+WARM_UP_PHASES = [
+    ("credentials", lambda: db.get_credential_provider()),
+    ("pools", lambda: db.warm_pools()),
+    ("migrations", migrate_database),
+    ("workers", start_workers),
+    ("partitions", start_partition_maintenance),
+]
 
 def init_database():
-    """Initialize database schema and tables for HETS EDI Enrollment."""
+    """Start connecting to the database in the background, once per process; returns the warm-up."""
+    return startup.warm_up(WARM_UP_PHASES)
+
+def database_ready():
+    """Wait for the warm-up before touching the database; shows an error and returns False if it failed."""
+    warm_up = init_database()
     try:
-        with get_connection() as conn:
-            with conn.cursor() as cur:
-                schema_name = get_schema_name()
-                
-                # Create schema
-                cur.execute(sql.SQL("CREATE SCHEMA IF NOT EXISTS {}").format(sql.Identifier(schema_name)))
-                
-                # Create providers table
-                cur.execute(sql.SQL("""
-                    CREATE TABLE IF NOT EXISTS {}.hets_providers (
-                        provider_id SERIAL PRIMARY KEY,
-                        authorized_signatory_name VARCHAR(255) NOT NULL,
-                        title VARCHAR(100),
-                        organization_name VARCHAR(255),
-                        email_address VARCHAR(255) NOT NULL,
-                        alternate_email_address VARCHAR(255),
-                        phone_number VARCHAR(20),
-                        ptan VARCHAR(50),
-                        npi VARCHAR(10),
-                        tax_id VARCHAR(20),
-                        organization_type VARCHAR(100),
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                    )
-                """).format(sql.Identifier(schema_name)))
-                
-                # Create vendor relationships table
-                cur.execute(sql.SQL("""
-                    CREATE TABLE IF NOT EXISTS {}.hets_vendor_relationships (
-                        relationship_id SERIAL PRIMARY KEY,
-                        provider_id INTEGER REFERENCES {}.hets_providers(provider_id) ON DELETE CASCADE,
-                        vendor_clearinghouse_name VARCHAR(255) NOT NULL,
-                        vendor_contact_name VARCHAR(255),
-                        vendor_contact_email VARCHAR(255),
-                        vendor_contact_phone VARCHAR(20),
-                        effective_date DATE NOT NULL,
-                        termination_date DATE,
-                        offshore_data_sharing_consent BOOLEAN DEFAULT FALSE,
-                        relationship_status VARCHAR(50) DEFAULT 'Active',
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                    )
-                """).format(sql.Identifier(schema_name), sql.Identifier(schema_name)))
-                
-                # Create attestations table
-                cur.execute(sql.SQL("""
-                    CREATE TABLE IF NOT EXISTS {}.hets_attestations (
-                        attestation_id SERIAL PRIMARY KEY,
-                        provider_id INTEGER REFERENCES {}.hets_providers(provider_id) ON DELETE CASCADE,
-                        relationship_id INTEGER REFERENCES {}.hets_vendor_relationships(relationship_id) ON DELETE CASCADE,
-                        attestation_text TEXT NOT NULL,
-                        attested_by VARCHAR(255) NOT NULL,
-                        attestation_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        ip_address VARCHAR(45),
-                        submission_status VARCHAR(50) DEFAULT 'Submitted'
-                    )
-                """).format(sql.Identifier(schema_name), sql.Identifier(schema_name), sql.Identifier(schema_name)))
-                
-                # Create submission history table
-                cur.execute(sql.SQL("""
-                    CREATE TABLE IF NOT EXISTS {}.hets_submission_history (
-                        submission_id SERIAL PRIMARY KEY,
-                        provider_id INTEGER REFERENCES {}.hets_providers(provider_id) ON DELETE CASCADE,
-                        submission_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        submission_type VARCHAR(50),
-                        status VARCHAR(50),
-                        notes TEXT
-                    )
-                """).format(sql.Identifier(schema_name), sql.Identifier(schema_name)))
-                
-                conn.commit()
-                return True
+        if not warm_up.ready:
+            with st.spinner("Connecting to the database..."):
+                warm_up.wait(WARM_UP_TIMEOUT)
+        return True
     except Exception as e:
         st.error(f"❌ Database initialization failed: {str(e)}")
         return False
 
-def validate_email(email):
-    """Validate email format."""
-    pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-    return re.match(pattern, email) is not None
+def submissions_flushed(conn):
+    """Called by the submission queue worker after it writes a batch on ``conn``."""
+    db.record_write(conn)
+    enrollment_cache.invalidate()
 
-def validate_npi(npi):
-    """Validate NPI format (10 digits)."""
-    return len(npi) == 10 and npi.isdigit()
+def save_enrollment(provider_data, vendor_data, attestation_data, idempotency_key):
+    """Save enrollment data; replays of the same idempotency key are no-ops.
 
-def validate_ptan(ptan):
-    """Validate PTAN format."""
-    return len(ptan) >= 5 and len(ptan) <= 50
+    With ``HETS_QUEUE_PATH`` set, returns as soon as the submission is on
+    local disk, with the idempotency key as the reference ID; the submission
+    queue worker writes it to Postgres. Otherwise the enrollment is written
+    to Postgres before returning and the provider ID is the reference ID.
+    """
+    queue = get_queue()
+    if queue is None:
+        return write_enrollment(provider_data, vendor_data, attestation_data, idempotency_key)
+    try:
+        with db_metrics.track("queue_enrollment") as timer:
+            added = queue.enqueue(
+                get_schema_name(), idempotency_key, provider_data, vendor_data, attestation_data
+            )
+            timer.rows = int(added)
+        return True, idempotency_key, 'queued' if added else 'replayed'
+    except Exception as e:
+        st.error(f"❌ Failed to save enrollment: {str(e)}")
+        return False, None, None
 
-def save_enrollment(provider_data, vendor_data, attestation_data):
-    """Save enrollment data to database."""
+def write_enrollment(provider_data, vendor_data, attestation_data, idempotency_key):
+    """Write enrollment data to the database; replays of the same idempotency key are no-ops."""
+    if not database_ready():
+        return False, None, None
     try:
-        with get_connection() as conn:
-            with conn.cursor() as cur:
-                schema = get_schema_name()
-                
-                # Insert provider
-                cur.execute(sql.SQL("""
-                    INSERT INTO {}.hets_providers 
-                    (authorized_signatory_name, title, organization_name, email_address, 
-                     alternate_email_address, phone_number, ptan, npi, tax_id, organization_type)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                    RETURNING provider_id
-                """).format(sql.Identifier(schema)), (
-                    provider_data['authorized_signatory_name'],
-                    provider_data['title'],
-                    provider_data['organization_name'],
-                    provider_data['email_address'],
-                    provider_data['alternate_email_address'],
-                    provider_data['phone_number'],
-                    provider_data['ptan'],
-                    provider_data['npi'],
-                    provider_data['tax_id'],
-                    provider_data['organization_type']
-                ))
-                
-                provider_id = cur.fetchone()[0]
-                
-                # Insert vendor relationship
-                cur.execute(sql.SQL("""
-                    INSERT INTO {}.hets_vendor_relationships 
-                    (provider_id, vendor_clearinghouse_name, vendor_contact_name, 
-                     vendor_contact_email, vendor_contact_phone, effective_date, 
-                     termination_date, offshore_data_sharing_consent, relationship_status)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-                    RETURNING relationship_id
-                """).format(sql.Identifier(schema)), (
-                    provider_id,
-                    vendor_data['vendor_clearinghouse_name'],
-                    vendor_data['vendor_contact_name'],
-                    vendor_data['vendor_contact_email'],
-                    vendor_data['vendor_contact_phone'],
-                    vendor_data['effective_date'],
-                    vendor_data['termination_date'],
-                    vendor_data['offshore_data_sharing_consent'],
-                    vendor_data['relationship_status']
-                ))
-                
-                relationship_id = cur.fetchone()[0]
-                
-                # Insert attestation
-                cur.execute(sql.SQL("""
-                    INSERT INTO {}.hets_attestations 
-                    (provider_id, relationship_id, attestation_text, attested_by, ip_address)
-                    VALUES (%s, %s, %s, %s, %s)
-                """).format(sql.Identifier(schema)), (
-                    provider_id,
-                    relationship_id,
-                    attestation_data['attestation_text'],
-                    attestation_data['attested_by'],
-                    attestation_data['ip_address']
-                ))
-                
-                # Insert submission history
-                cur.execute(sql.SQL("""
-                    INSERT INTO {}.hets_submission_history 
-                    (provider_id, submission_type, status, notes)
-                    VALUES (%s, %s, %s, %s)
-                """).format(sql.Identifier(schema)), (
-                    provider_id,
-                    'EDI Enrollment',
-                    'Submitted',
-                    f'Initial enrollment submission for {provider_data["organization_name"]}'
-                ))
-                
-                conn.commit()
-                return True, provider_id
+        with db_metrics.track("save_enrollment") as timer, get_connection() as conn:
+            provider_id, outcome = insert_enrollment(
+                conn, get_schema_name(), provider_data, vendor_data, attestation_data, idempotency_key
+            )
+            timer.rows = 1
+            db.record_write(conn)
+        if outcome != 'replayed':
+            enrollment_cache.invalidate()
+        return True, provider_id, outcome
     except Exception as e:
         st.error(f"❌ Failed to save enrollment: {str(e)}")
-        return False, None
+        return False, None, None
+
+@st.fragment(run_every=5)
+def display_submission_status(submission_id):
+    """Whether the submitter's last enrollment has been written to the database yet."""
+    status = get_queue().status(submission_id)
+    if status is None:
+        return
+    if status["state"] == "failed":
+        st.error(f"❌ Your last submission (Reference ID {submission_id}) could not be recorded: "
+                 f"{status['last_error']}. Please correct it and submit it again.")
+    elif status["state"] == "pending":
+        if status["last_error"]:
+            st.info(f"⏳ Your last submission (Reference ID {submission_id}) is saved and waiting for the "
+                    "database to become available.")
+        else:
+            st.info(f"⏳ Your last submission (Reference ID {submission_id}) is being recorded.")
+    elif status["outcome"] == 'updated':
+        st.warning(f"⚠️ Your last submission (Reference ID {submission_id}) matched an existing NPI and PTAN "
+                   f"and was recorded as an update to Provider ID {status['provider_id']}.")
+    else:
+        st.success(f"✅ Your last submission (Reference ID {submission_id}) was recorded as "
+                   f"Provider ID {status['provider_id']}.")
 
-def get_enrollments():
-    """Retrieve all enrollments."""
+def get_existing_enrollment(npi, ptan):
+    """Look up an existing enrollment by NPI and PTAN."""
     try:
-        with get_connection() as conn:
-            with conn.cursor() as cur:
-                schema = get_schema_name()
-                cur.execute(sql.SQL("""
-                    SELECT 
-                        p.provider_id,
-                        p.authorized_signatory_name,
-                        p.organization_name,
-                        p.email_address,
-                        p.ptan,
-                        p.npi,
-                        v.vendor_clearinghouse_name,
-                        v.effective_date,
-                        v.relationship_status,
-                        p.created_at
-                    FROM {}.hets_providers p
-                    LEFT JOIN {}.hets_vendor_relationships v ON p.provider_id = v.provider_id
-                    ORDER BY p.created_at DESC
-                """).format(sql.Identifier(schema), sql.Identifier(schema)))
-                return cur.fetchall()
+        with db_metrics.track("find_enrollment") as timer, get_read_connection() as conn:
+            existing = find_enrollment(conn, get_schema_name(), npi.strip(), ptan.strip())
+            timer.rows = int(existing is not None)
+            return existing
+    except Exception as e:
+        st.error(f"❌ Failed to look up enrollment: {str(e)}")
+        return None
+
+@st.fragment
+def check_existing_enrollment():
+    """Let submitters check whether an NPI/PTAN is already enrolled before filling in the form."""
+    with st.expander("🔎 Already enrolled? Check an NPI and PTAN"):
+        col1, col2 = st.columns(2)
+        with col1:
+            npi = st.text_input("NPI", max_chars=10, key="check_npi")
+        with col2:
+            ptan = st.text_input("PTAN", max_chars=50, key="check_ptan")
+        if npi and ptan and database_ready():
+            existing = get_existing_enrollment(npi, ptan)
+            if existing:
+                st.warning(
+                    f"⚠️ {existing[1]} is already enrolled with this NPI and PTAN "
+                    f"(Reference ID {existing[0]}, submitted {existing[2].strftime('%Y-%m-%d')}). "
+                    "Submitting again will update that enrollment."
+                )
+            else:
+                st.info("No existing enrollment found for this NPI and PTAN.")
+
+def get_enrollments(page_size=DEFAULT_PAGE_SIZE, after=None, filters=None):
+    """Retrieve one page of enrollments and the cursor of the next page (cached)."""
+    schema = get_schema_name()
+    
+    def load():
+        with db_metrics.track("list_enrollments") as timer, get_read_connection() as conn:
+            page = list_enrollments(conn, schema, page_size=page_size, after=after, filters=filters)
+            timer.rows = len(page[0])
+            return page
+    
+    try:
+        key = ("list_enrollments", schema, page_size, after, filters_key(filters))
+        return enrollment_cache.get_or_load(key, load)
     except Exception as e:
         st.error(f"❌ Failed to retrieve enrollments: {str(e)}")
+        return [], None
+
+def get_enrollment(provider_id):
+    """Retrieve the full record for a single provider (cached)."""
+    schema = get_schema_name()
+    
+    def load():
+        with db_metrics.track("get_enrollment") as timer, get_read_connection() as conn:
+            detail = get_enrollment_detail(conn, schema, provider_id)
+            timer.rows = int(detail is not None)
+            return detail
+    
+    try:
+        return enrollment_cache.get_or_load(("enrollment_detail", schema, provider_id), load)
+    except Exception as e:
+        st.error(f"❌ Failed to retrieve enrollment {provider_id}: {str(e)}")
+        return None
+
+def enrollment_filters():
+    """Render the search/filter controls and return the active filters."""
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        npi = st.text_input("NPI", max_chars=10, key="filter_npi")
+        ptan = st.text_input("PTAN", max_chars=50, key="filter_ptan")
+    with col2:
+        vendor = st.text_input("Vendor/Clearinghouse", key="filter_vendor")
+        statuses = st.multiselect(
+            "Relationship Status",
+            RELATIONSHIP_STATUSES,
+            key="filter_statuses"
+        )
+    with col3:
+        created = st.date_input("Submitted between", value=(), key="filter_created")
+    
+    return {
+        'npi': npi,
+        'ptan': ptan,
+        'vendor': vendor,
+        'statuses': statuses,
+        'created_from': created[0] if len(created) > 0 else None,
+        'created_to': created[1] if len(created) > 1 else None,
+    }
+
+def display_enrollment_detail(provider_id):
+    """Display the full record for one provider."""
+    detail = get_enrollment(provider_id)
+    if detail is None:
+        return
+    
+    provider = detail['provider']
+    st.markdown(f"#### 🏥 {provider['organization_name']} - {provider['authorized_signatory_name']}")
+    col1, col2 = st.columns(2)
+    with col1:
+        st.write(f"**Title:** {provider['title']}")
+        st.write(f"**Email:** {provider['email_address']}")
+        st.write(f"**Alternate Email:** {provider['alternate_email_address'] or '—'}")
+        st.write(f"**Phone:** {provider['phone_number']}")
+    with col2:
+        st.write(f"**PTAN:** {provider['ptan']}")
+        st.write(f"**NPI:** {provider['npi']}")
+        st.write(f"**Tax ID:** {provider['tax_id']}")
+        st.write(f"**Organization Type:** {provider['organization_type']}")
+    st.markdown("**Vendor Relationships**")
+    st.dataframe(detail['vendors'], hide_index=True, use_container_width=True)
+    st.markdown("**Attestations**")
+    st.dataframe(detail['attestations'], hide_index=True, use_container_width=True)
+    st.caption(f"Submitted: {provider['created_at'].strftime('%Y-%m-%d %H:%M')}")
+    if provider['last_submission_date']:
+        st.caption(
+            f"Submissions: {provider['total_submissions']} "
+            f"(last {provider['last_submission_date'].strftime('%Y-%m-%d %H:%M')})"
+        )
+
+def find_providers(text):
+    """Typeahead search over organization, signatory and vendor names (cached)."""
+    schema = get_schema_name()
+    
+    def load():
+        with db_metrics.track("search_providers") as timer, get_read_connection() as conn:
+            matches = search_providers(conn, schema, text)
+            timer.rows = len(matches)
+            return matches
+    
+    try:
+        return enrollment_cache.get_or_load(("search_providers", schema, " ".join(text.lower().split())), load)
+    except Exception as e:
+        st.error(f"❌ Search failed: {str(e)}")
         return []
 
+@st.fragment
+def display_search():
+    """Find a provider by the start of any word in its organization, signatory or vendor name."""
+    text = st.text_input(
+        "🔍 Search organizations, signatories and vendors",
+        placeholder="e.g. summit heal",
+        key="enrollment_search"
+    )
+    if not text.strip():
+        return
+    
+    results = find_providers(text)
+    if not results:
+        st.info("No matching enrollments.")
+        return
+    selection = st.dataframe(
+        [dict(zip(SEARCH_COLUMNS[:-1], result)) for result in results],
+        column_config={
+            "provider_id": st.column_config.NumberColumn("ID", format="%d"),
+            "organization_name": "Organization",
+            "authorized_signatory_name": "Signatory",
+            "npi": "NPI",
+            "ptan": "PTAN",
+            "vendor_clearinghouse_name": "Matched Vendor",
+        },
+        hide_index=True,
+        use_container_width=True,
+        on_select="rerun",
+        selection_mode="single-row",
+        key="search_results"
+    )
+    if selection.selection.rows:
+        display_enrollment_detail(results[selection.selection.rows[0]][0])
+    st.markdown("---")
+
 @st.fragment
 def display_enrollments():
-    """Display existing enrollments."""
+    """Display existing enrollments in a filterable grid, one page at a time."""
     st.subheader("📊 Enrollment Records")
     
-    enrollments = get_enrollments()
+    filters = enrollment_filters()
+    page_size = st.selectbox("Records per page", [25, 50, 100, 250], index=1, key="enrollment_page_size")
+    
+    # Cursors of the pages visited so far; the last one is the current page.
+    # Changing the filters or page size starts again from the first page.
+    view_key = (filters_key(filters), page_size)
+    if st.session_state.get("enrollment_view_key") != view_key:
+        st.session_state.enrollment_view_key = view_key
+        st.session_state.enrollment_page_cursors = [None]
+    cursors = st.session_state.enrollment_page_cursors
+    
+    enrollments, next_cursor = get_enrollments(page_size=page_size, after=cursors[-1], filters=filters)
     
     if not enrollments:
         st.info("📋 No enrollment records found.")
     else:
-        for enrollment in enrollments:
-            with st.expander(f"🏥 {enrollment[2]} - {enrollment[1]}"):
-                col1, col2 = st.columns(2)
-                with col1:
-                    st.write(f"**Email:** {enrollment[3]}")
-                    st.write(f"**PTAN:** {enrollment[4]}")
-                    st.write(f"**NPI:** {enrollment[5]}")
-                with col2:
-                    st.write(f"**Vendor:** {enrollment[6]}")
-                    st.write(f"**Effective Date:** {enrollment[7]}")
-                    st.write(f"**Status:** {enrollment[8]}")
-                st.caption(f"Submitted: {enrollment[9].strftime('%Y-%m-%d %H:%M')}")
+        selection = st.dataframe(
+            [dict(zip(ENROLLMENT_COLUMNS, enrollment)) for enrollment in enrollments],
+            column_config={
+                "provider_id": st.column_config.NumberColumn("ID", format="%d"),
+                "authorized_signatory_name": "Signatory",
+                "organization_name": "Organization",
+                "email_address": "Email",
+                "ptan": "PTAN",
+                "npi": "NPI",
+                "vendor_clearinghouse_name": "Vendor",
+                "effective_date": st.column_config.DateColumn("Effective Date"),
+                "relationship_status": "Status",
+                "created_at": st.column_config.DatetimeColumn("Submitted", format="YYYY-MM-DD HH:mm"),
+            },
+            hide_index=True,
+            use_container_width=True,
+            on_select="rerun",
+            selection_mode="single-row",
+            key="enrollment_grid"
+        )
+        st.caption("Select a row to view the full enrollment record.")
+    
+    col_prev, col_page, col_next = st.columns([1, 1, 1])
+    with col_prev:
+        if st.button("◀ Previous", disabled=len(cursors) == 1, use_container_width=True):
+            cursors.pop()
+            st.rerun(scope="fragment")
+    with col_page:
+        st.caption(f"Page {len(cursors)}")
+    with col_next:
+        if st.button("Next ▶", disabled=next_cursor is None, use_container_width=True):
+            cursors.append(next_cursor)
+            st.rerun(scope="fragment")
+    
+    # Details are loaded lazily, only for the selected provider
+    if enrollments and selection.selection.rows:
+        st.markdown("---")
+        display_enrollment_detail(enrollments[selection.selection.rows[0]][0])
+
+def build_export(fmt):
+    """Stream a full enrollment export to a temporary file and return it, rewound."""
+    export_file = tempfile.TemporaryFile()
+    stats = {"rows": 0}
+    with db_metrics.track(f"export_{fmt}") as timer, get_read_connection() as conn:
+        for chunk in export_enrollments(conn, get_schema_name(), fmt, stats=stats):
+            export_file.write(chunk)
+        timer.rows = stats["rows"]
+    export_file.seek(0)
+    return export_file
+
+@st.fragment
+def display_export():
+    """Download every enrollment (v_complete_enrollments) as CSV or Parquet."""
+    with st.expander("📤 Export all enrollments"):
+        fmt = st.radio("Format", list(EXPORT_FORMATS), format_func=str.upper, horizontal=True, key="export_format")
+        mime, extension = EXPORT_FORMATS[fmt]
+        # The export only runs when the button is clicked, on a separate thread
+        st.download_button(
+            f"Download {fmt.upper()}",
+            data=lambda: build_export(fmt),
+            file_name=f"hets_enrollments_{date.today():%Y%m%d}{extension}",
+            mime=mime,
+            on_click="ignore"
+        )
+        st.caption("For very large exports, use `python export.py` or `GET /api/enrollments/export`.")
+
+def is_admin():
+    """Whether the signed-in user is listed in HETS_ADMIN_EMAILS."""
+    return st.context.headers.get("X-Forwarded-Email", "").lower() in ADMIN_EMAILS
+
+@st.fragment
+def display_ops_panel():
+    """Pool, token, cache and query metrics of this app process, for admins."""
+    st.header("🛠️ Database")
+    st.button("Refresh", key="ops_refresh")
+    for name, pool in db.get_pools().items():
+        stats = pool_stats(pool)
+        st.markdown(f"**{name.title()} pool** ({stats['saturation']:.0%} saturated)")
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Active", stats["pool_active"])
+        col2.metric("Idle", stats.get("pool_available", 0))
+        col3.metric("Waiting", stats.get("requests_waiting", 0))
+        queued = stats.get("requests_queued", 0)
+        st.caption(
+            f"{stats.get('requests_num', 0):,} checkouts, {queued:,} waited "
+            f"(avg {stats.get('requests_wait_ms', 0) / queued if queued else 0:.1f} ms), "
+            f"{stats.get('requests_errors', 0):,} timed out. Max {stats['pool_max']} connections; "
+            f"{stats.get('connections_num', 0):,} opened, {stats.get('connections_lost', 0):,} lost."
+        )
+    st.caption(
+        f"Pools created {db.pools_created}x; {db.read_fallbacks:,} reads went to the primary "
+        "while the replica caught up."
+    )
+    warm_up = init_database()
+    if warm_up.ready:
+        st.caption("Startup warm-up: " + ", ".join(
+            f"{name} {seconds * 1000:,.0f} ms" for name, seconds in warm_up.timings.items()
+        ) + ".")
+    provider = db.credential_provider
+    if provider is not None and provider.refresh_count:
+        st.caption(
+            f"Token refreshed {(datetime.now().timestamp() - provider.last_refresh) / 60:.0f} min ago "
+            f"in {provider.last_refresh_seconds * 1000:.0f} ms ({provider.refresh_failures} failed refreshes)."
+        )
+    cache = enrollment_cache.stats()
+    st.caption(f"Query cache: {cache['hits']:,} hits, {cache['misses']:,} misses, {cache['entries']} entries.")
+    queue = get_queue()
+    if queue is not None:
+        queue = queue.stats()
+        st.caption(
+            f"Submission queue: {queue['pending']:,} pending ({queue['failing']:,} retrying), "
+            f"oldest {queue['oldest_pending_seconds']:.0f} s, {queue['failed']:,} rejected."
+        )
+
+    statements = db_metrics.statements()
+    st.dataframe([
+        {
+            "Operation": name,
+            "Calls": entry["calls"],
+            "Errors": entry["errors"],
+            "Avg ms": round(entry["seconds"] / entry["calls"] * 1000, 1),
+            "Max ms": round(entry["max_seconds"] * 1000, 1),
+            "Rows": entry["rows"],
+            "Statements": statements.get(name, {}).get("statements", 0),
+        }
+        for name, entry in sorted(db_metrics.operations().items())
+    ], hide_index=True)
+    st.markdown(f"**Slow queries** (≥ {db_metrics.slow_query_ms:g} ms)")
+    slow = db_metrics.slow_queries()
+    if slow:
+        st.dataframe([
+            {"At": q["at"].strftime("%H:%M:%S"), "Operation": q["operation"], "ms": q["ms"], "Rows": q["rows"],
+             "SQL": q["sql"]}
+            for q in slow
+        ], hide_index=True)
+    else:
+        st.caption("None")
+
+def import_enrollments(rows):
+    """Bulk load validated roster rows."""
+    try:
+        with db_metrics.track("import_enrollments") as timer, get_connection() as conn:
+            count, skipped = load_enrollments(conn, get_schema_name(), rows)
+            timer.rows = count
+            db.record_write(conn)
+        enrollment_cache.invalidate()
+        return True, count, skipped
+    except Exception as e:
+        st.error(f"❌ Bulk import failed: {str(e)}")
+        return False, 0, []
+
+def display_bulk_import():
+    """Bulk enrollment import from a CSV or Excel roster."""
+    st.subheader("📥 Bulk Enrollment Import")
+    st.markdown("Upload a provider roster with one enrollment per row. Column names must match the template.")
+    st.download_button(
+        "Download CSV template",
+        data=",".join(IMPORT_COLUMNS) + "\n",
+        file_name="hets_enrollment_template.csv",
+        mime="text/csv"
+    )
+    
+    roster = st.file_uploader("Roster file", type=["csv", "xlsx"])
+    if roster is None:
+        return
+    
+    try:
+        rows, errors = validate_rows(read_roster(roster, roster.name))
+    except Exception as e:
+        st.error(f"❌ Could not read roster: {str(e)}")
+        return
+    
+    invalid = len({row_number for row_number, *_ in errors})
+    col1, col2 = st.columns(2)
+    col1.metric("Valid rows", f"{len(rows):,}")
+    col2.metric("Rows with errors", f"{invalid:,}")
+    if errors:
+        st.error("❌ The following rows will not be imported:")
+        st.dataframe(
+            [{"Row": row_number, "Field": field, "Code": code, "Error": message}
+             for row_number, field, code, message in errors],
+            hide_index=True,
+            use_container_width=True
+        )
+    
+    if rows and st.button(f"Import {len(rows):,} valid enrollments", type="primary"):
+        with st.spinner("Importing enrollments..."):
+            success, count, skipped = import_enrollments(rows)
+        if success:
+            st.success(f"✅ Imported {count:,} enrollments.")
+            if skipped:
+                st.warning(f"⚠️ Skipped {len(skipped):,} rows whose NPI and PTAN are already enrolled:")
+                st.dataframe([{"NPI": npi, "PTAN": ptan} for npi, ptan in skipped], hide_index=True)
 
 # Streamlit UI
 def main():
@@ -320,17 +558,29 @@ def main():
         </div>
     """, unsafe_allow_html=True)
     
-    # Initialize database
-    if not init_database():
-        st.stop()
+    # Connect in the background; the form renders (and, with HETS_QUEUE_PATH
+    # set, queues submissions) before the database is ready, and the tabs
+    # that read from it wait.
+    init_database()
+    
+    if is_admin():
+        with st.sidebar:
+            display_ops_panel()
     
     # Create tabs
-    tab1, tab2 = st.tabs(["📝 New Enrollment", "📊 View Enrollments"])
+    tab1, tab2, tab3 = st.tabs(["📝 New Enrollment", "📊 View Enrollments", "📥 Bulk Import"])
     
     with tab1:
         st.markdown("### Provider Information")
         st.markdown("Please complete all required fields marked with *")
         
+        check_existing_enrollment()
+        
+        # One idempotency key per form submission, so reruns and double-clicks
+        # cannot create a second enrollment
+        if "enrollment_idempotency_key" not in st.session_state:
+            st.session_state.enrollment_idempotency_key = str(uuid.uuid4())
+        
         with st.form("hets_enrollment_form", clear_on_submit=True):
             # Provider Information Section
             col1, col2 = st.columns(2)
@@ -339,29 +589,35 @@ def main():
                 authorized_signatory = st.text_input(
                     "Authorized Signatory Name *",
                     placeholder="Full legal name",
+                    max_chars=MAX_LENGTHS['authorized_signatory_name'],
                     help="The person authorized to sign on behalf of the organization"
                 )
                 title = st.text_input(
                     "Title *",
-                    placeholder="e.g., CEO, Administrator, Director"
+                    placeholder="e.g., CEO, Administrator, Director",
+                    max_chars=MAX_LENGTHS['title']
                 )
                 organization_name = st.text_input(
                     "Organization/Practice Name *",
-                    placeholder="Legal organization name"
+                    placeholder="Legal organization name",
+                    max_chars=MAX_LENGTHS['organization_name']
                 )
                 email = st.text_input(
                     "Email Address *",
-                    placeholder="primary@example.com"
+                    placeholder="primary@example.com",
+                    max_chars=MAX_LENGTHS['email_address']
                 )
                 alternate_email = st.text_input(
                     "Alternate Email Address",
-                    placeholder="secondary@example.com (optional)"
+                    placeholder="secondary@example.com (optional)",
+                    max_chars=MAX_LENGTHS['alternate_email_address']
                 )
             
             with col2:
                 phone = st.text_input(
                     "Phone Number *",
-                    placeholder="(123) 456-7890"
+                    placeholder="(123) 456-7890",
+                    max_chars=MAX_LENGTHS['phone_number']
                 )
                 ptan = st.text_input(
                     "Provider Transaction Access Number (PTAN) *",
@@ -375,12 +631,12 @@ def main():
                 )
                 tax_id = st.text_input(
                     "Tax ID/EIN *",
-                    placeholder="XX-XXXXXXX"
+                    placeholder="XX-XXXXXXX",
+                    max_chars=MAX_LENGTHS['tax_id']
                 )
                 organization_type = st.selectbox(
                     "Organization Type *",
-                    ["", "Hospital", "Clinic", "Physician Practice", "DME Supplier", 
-                     "Home Health Agency", "Nursing Facility", "Other"]
+                    [""] + ORGANIZATION_TYPES
                 )
             
             st.markdown("---")
@@ -391,21 +647,25 @@ def main():
             with col3:
                 vendor_name = st.text_input(
                     "Vendor/Clearinghouse Name *",
-                    placeholder="Name of EDI vendor or clearinghouse"
+                    placeholder="Name of EDI vendor or clearinghouse",
+                    max_chars=MAX_LENGTHS['vendor_clearinghouse_name']
                 )
                 vendor_contact_name = st.text_input(
                     "Vendor Contact Name",
-                    placeholder="Primary contact at vendor"
+                    placeholder="Primary contact at vendor",
+                    max_chars=MAX_LENGTHS['vendor_contact_name']
                 )
                 vendor_contact_email = st.text_input(
                     "Vendor Contact Email",
-                    placeholder="vendor@example.com"
+                    placeholder="vendor@example.com",
+                    max_chars=MAX_LENGTHS['vendor_contact_email']
                 )
             
             with col4:
                 vendor_contact_phone = st.text_input(
                     "Vendor Contact Phone",
-                    placeholder="(123) 456-7890"
+                    placeholder="(123) 456-7890",
+                    max_chars=MAX_LENGTHS['vendor_contact_phone']
                 )
                 effective_date = st.date_input(
                     "Relationship Effective Date *",
@@ -428,22 +688,13 @@ def main():
             
             relationship_status = st.selectbox(
                 "Relationship Status *",
-                ["Active", "Pending", "Terminated", "Suspended"]
+                RELATIONSHIP_STATUSES
             )
             
             st.markdown("---")
             st.markdown("### Attestation")
             
-            attestation_text = """
-            I hereby attest that:
-            
-            1. I am authorized to submit this HETS EDI enrollment on behalf of the organization listed above.
-            2. All information provided in this form is accurate and complete to the best of my knowledge.
-            3. I understand that this enrollment is subject to CMS verification and approval.
-            4. I agree to notify CMS of any changes to the information provided within 30 days.
-            5. I acknowledge that providing false information may result in termination of HETS access and potential legal consequences.
-            6. I have read and agree to comply with all HIPAA regulations and CMS requirements for EDI transactions.
-            """
+            attestation_text = ATTESTATION_TEXT
             
             st.text_area(
                 "Attestation Statement",
@@ -460,6 +711,7 @@ def main():
             attested_by_name = st.text_input(
                 "Type your full name to attest *",
                 placeholder="Full legal name",
+                max_chars=MAX_LENGTHS['attested_by'],
                 help="This serves as your electronic signature"
             )
             
@@ -471,104 +723,112 @@ def main():
                 submitted = st.form_submit_button("Submit Enrollment", type="primary", use_container_width=True)
             
             if submitted:
+                provider_data = {
+                    'authorized_signatory_name': authorized_signatory,
+                    'title': title,
+                    'organization_name': organization_name,
+                    'email_address': email,
+                    'alternate_email_address': alternate_email if alternate_email else None,
+                    'phone_number': phone,
+                    'ptan': ptan,
+                    'npi': npi,
+                    'tax_id': tax_id,
+                    'organization_type': organization_type
+                }
+                
+                vendor_data = {
+                    'vendor_clearinghouse_name': vendor_name,
+                    'vendor_contact_name': vendor_contact_name if vendor_contact_name else None,
+                    'vendor_contact_email': vendor_contact_email if vendor_contact_email else None,
+                    'vendor_contact_phone': vendor_contact_phone if vendor_contact_phone else None,
+                    'effective_date': effective_date,
+                    'termination_date': termination_date if termination_date else None,
+                    'offshore_data_sharing_consent': offshore_consent,
+                    'relationship_status': relationship_status
+                }
+                
+                attestation_data = {
+                    'attestation_text': attestation_text,
+                    'attested_by': attested_by_name,
+                    'ip_address': 'system'  # You can enhance this to capture actual IP
+                }
+                
                 # Validation
                 errors = []
-                
-                if not authorized_signatory:
-                    errors.append("Authorized Signatory Name is required")
-                if not title:
-                    errors.append("Title is required")
-                if not organization_name:
-                    errors.append("Organization Name is required")
-                if not email:
-                    errors.append("Email Address is required")
-                elif not validate_email(email):
-                    errors.append("Invalid email format")
-                if alternate_email and not validate_email(alternate_email):
-                    errors.append("Invalid alternate email format")
-                if not phone:
-                    errors.append("Phone Number is required")
-                if not ptan:
-                    errors.append("PTAN is required")
-                elif not validate_ptan(ptan):
-                    errors.append("Invalid PTAN format")
-                if not npi:
-                    errors.append("NPI is required")
-                elif not validate_npi(npi):
-                    errors.append("NPI must be exactly 10 digits")
-                if not tax_id:
-                    errors.append("Tax ID is required")
-                if not organization_type:
-                    errors.append("Organization Type is required")
-                if not vendor_name:
-                    errors.append("Vendor/Clearinghouse Name is required")
                 if not attestation_agree:
                     errors.append("You must agree to the attestation statement")
-                if not attested_by_name:
-                    errors.append("You must type your name to attest")
-                if attested_by_name and authorized_signatory and attested_by_name.strip().lower() != authorized_signatory.strip().lower():
-                    errors.append("Attested name must match Authorized Signatory Name")
+                for error in validate_enrollment({**provider_data, **vendor_data, 'attested_by': attested_by_name}):
+                    if error.field == 'attested_by' and error.code == 'required':
+                        errors.append("You must type your name to attest")
+                    else:
+                        errors.append(error.message)
                 
                 if errors:
                     st.error("❌ Please correct the following errors:")
                     for error in errors:
                         st.write(f"- {error}")
                 else:
-                    # Prepare data
-                    provider_data = {
-                        'authorized_signatory_name': authorized_signatory,
-                        'title': title,
-                        'organization_name': organization_name,
-                        'email_address': email,
-                        'alternate_email_address': alternate_email if alternate_email else None,
-                        'phone_number': phone,
-                        'ptan': ptan,
-                        'npi': npi,
-                        'tax_id': tax_id,
-                        'organization_type': organization_type
-                    }
-                    
-                    vendor_data = {
-                        'vendor_clearinghouse_name': vendor_name,
-                        'vendor_contact_name': vendor_contact_name if vendor_contact_name else None,
-                        'vendor_contact_email': vendor_contact_email if vendor_contact_email else None,
-                        'vendor_contact_phone': vendor_contact_phone if vendor_contact_phone else None,
-                        'effective_date': effective_date,
-                        'termination_date': termination_date if termination_date else None,
-                        'offshore_data_sharing_consent': offshore_consent,
-                        'relationship_status': relationship_status
-                    }
-                    
-                    attestation_data = {
-                        'attestation_text': attestation_text,
-                        'attested_by': attested_by_name,
-                        'ip_address': 'system'  # You can enhance this to capture actual IP
-                    }
-                    
                     # Save to database
-                    success, provider_id = save_enrollment(provider_data, vendor_data, attestation_data)
+                    success, reference_id, outcome = save_enrollment(
+                        provider_data, vendor_data, attestation_data,
+                        st.session_state.enrollment_idempotency_key
+                    )
                     
                     if success:
-                        st.success(f"""
-                        ✅ **Enrollment Submitted Successfully!**
-                        
-                        Your HETS EDI enrollment has been submitted for processing.
-                        
-                        **Reference ID:** {provider_id}
-                        
-                        **Organization:** {organization_name}
-                        
-                        **Next Steps:**
-                        - You will receive a confirmation email at {email}
-                        - CMS will review your enrollment within 5-7 business days
-                        - You will be notified of your enrollment status
-                        
-                        Please retain this reference ID for your records.
-                        """)
-                        st.balloons()
+                        # The next submission gets a new key; replays of this one are no-ops
+                        st.session_state.enrollment_idempotency_key = str(uuid.uuid4())
+                        if outcome in ('queued', 'replayed') and get_queue() is not None:
+                            st.session_state.last_submission_id = reference_id
+                        if outcome == 'replayed':
+                            st.info(f"ℹ️ This submission was already received (Reference ID {reference_id}).")
+                        elif outcome == 'queued':
+                            st.info(f"""
+                            📨 **Enrollment Received**
+                            
+                            Your HETS EDI enrollment has been received and is being recorded.
+                            
+                            **Reference ID:** {reference_id}
+                            
+                            **Organization:** {organization_name}
+                            
+                            The status below shows when it has been recorded, or why it could not be.
+                            Please retain this reference ID for your records.
+                            """)
+                        else:
+                            if outcome == 'updated':
+                                st.warning(f"⚠️ An enrollment for NPI {npi} and PTAN {ptan} already existed. "
+                                           f"This submission was recorded as an update to Reference ID {reference_id}.")
+                            st.success(f"""
+                            ✅ **Enrollment Submitted Successfully!**
+                            
+                            Your HETS EDI enrollment has been submitted for processing.
+                            
+                            **Reference ID:** {reference_id}
+                            
+                            **Organization:** {organization_name}
+                            
+                            **Next Steps:**
+                            - You will receive a confirmation email at {email}
+                            - CMS will review your enrollment within 5-7 business days
+                            - You will be notified of your enrollment status
+                            
+                            Please retain this reference ID for your records.
+                            """)
+                            st.balloons()
+        
+        # After the form, so a submission queued on this run shows its status right away
+        if "last_submission_id" in st.session_state:
+            display_submission_status(st.session_state.last_submission_id)
     
     with tab2:
-        display_enrollments()
+        if database_ready():
+            display_search()
+            display_enrollments()
+            display_export()
+    
+    with tab3:
+        if database_ready():
+            display_bulk_import()
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
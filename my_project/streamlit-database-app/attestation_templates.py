@@ -0,0 +1,108 @@
+"""Move attestation statements stored inline to ``hets_attestation_templates``.
+
+Attestations written before migration ``0009_attestation_templates.sql``
+carry their full statement text. ``backfill`` replaces it with a reference
+to the template of the same content hash, a batch at a time so writers are
+never held up for long, then vacuums the table. A plain ``VACUUM`` only lets
+new rows reuse the freed space; the table does not shrink (it briefly grows,
+as every moved row is rewritten) until it is compacted with ``VACUUM FULL``,
+which locks out reads and writes of ``hets_attestations`` while it rewrites
+the table, so run ``--compact`` in a maintenance window (or use pg_repack).
+Run the backfill once every app process writes template ids:
+
+    python attestation_templates.py             # move inline statements to templates
+    python attestation_templates.py --compact   # ...then rewrite the table to return the space
+    python attestation_templates.py --check     # count attestations still stored inline
+"""
+import argparse
+
+from psycopg import sql
+
+BATCH_ROWS = 10000
+
+BACKFILL_BATCH = """
+    WITH batch AS (
+        SELECT attestation_id, attestation_text
+        FROM {schema}.hets_attestations
+        WHERE attestation_id > %(after)s AND attestation_text IS NOT NULL
+        ORDER BY attestation_id
+        LIMIT %(batch_rows)s
+    ), templates AS (
+        SELECT attestation_text, {schema}.attestation_template_id(attestation_text) AS template_id
+        FROM (SELECT DISTINCT attestation_text FROM batch) texts
+    )
+    UPDATE {schema}.hets_attestations a
+    SET template_id = t.template_id, attestation_text = NULL
+    FROM batch b
+    JOIN templates t ON t.attestation_text = b.attestation_text
+    WHERE a.attestation_id = b.attestation_id
+    RETURNING a.attestation_id
+"""
+
+
+def inline_attestations(conn, schema_name):
+    """Number of attestations whose statement text is still stored inline."""
+    return conn.execute(sql.SQL(
+        "SELECT COUNT(*) FROM {}.hets_attestations WHERE attestation_text IS NOT NULL"
+    ).format(sql.Identifier(schema_name))).fetchone()[0]
+
+
+def backfill(conn, schema_name, batch_rows=BATCH_ROWS, vacuum=True, compact=False):
+    """Point every attestation with inline text at its template and return how many were moved.
+
+    Each batch commits on its own; an interrupted backfill resumes where it
+    stopped. Afterwards the check that every attestation has a statement is
+    validated, and the table vacuumed unless ``vacuum`` is false. With
+    ``compact``, the vacuum is a ``VACUUM FULL``, which returns the freed
+    space but holds an exclusive lock on the table while it runs.
+    """
+    schema = sql.Identifier(schema_name)
+    query = sql.SQL(BACKFILL_BATCH).format(schema=schema)
+    moved, after = 0, 0
+    previous_autocommit = conn.autocommit
+    conn.autocommit = True
+    try:
+        while True:
+            with conn.transaction():
+                ids = [row[0] for row in conn.execute(query, {"after": after, "batch_rows": batch_rows})]
+            if not ids:
+                break
+            moved += len(ids)
+            after = max(ids)
+        conn.execute(sql.SQL("ALTER TABLE {}.hets_attestations VALIDATE CONSTRAINT chk_attestation_statement").format(
+            schema
+        ))
+        if compact:
+            conn.execute(sql.SQL("VACUUM (FULL, ANALYZE) {}.hets_attestations").format(schema))
+        elif vacuum:
+            conn.execute(sql.SQL("VACUUM (ANALYZE) {}.hets_attestations").format(schema))
+    finally:
+        conn.autocommit = previous_autocommit
+    return moved
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Move inline HETS attestation statements to templates.")
+    parser.add_argument("--check", action="store_true",
+                        help="Only report how many attestations still store their statement inline")
+    parser.add_argument("--compact", action="store_true",
+                        help="Rewrite hets_attestations afterwards to return the freed space "
+                             "(VACUUM FULL: blocks reads and writes meanwhile)")
+    parser.add_argument("--batch-rows", type=int, default=BATCH_ROWS, help="Attestations updated per transaction")
+    args = parser.parse_args()
+
+    import db
+    from migrations import ensure_schema
+
+    ensure_schema()
+    with db.get_connection() as conn:
+        if args.check:
+            count = inline_attestations(conn, db.get_schema_name())
+            print(f"{count} attestations store their statement inline")
+            raise SystemExit(1 if count else 0)
+        moved = backfill(conn, db.get_schema_name(), args.batch_rows, compact=args.compact)
+        print(f"Moved the statements of {moved} attestations to templates")
+
+
+if __name__ == "__main__":
+    main()
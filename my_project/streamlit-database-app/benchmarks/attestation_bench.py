@@ -0,0 +1,132 @@
+"""Measure attestation storage and scan speed with inline statements and with templates.
+
+    HETS_TEST_PG_CONNINFO="host=localhost dbname=postgres" python benchmarks/attestation_bench.py --rows 1000000
+
+Seeds a throwaway schema with ``--rows`` enrollments whose attestations
+carry the full statement text, as they did before migration 0009, then
+runs ``attestation_templates.backfill`` over them. Reports the size of
+``hets_attestations`` (heap, TOAST and indexes of every partition) and the
+time of a full scan of it and of a CSV export of ``v_complete_enrollments``
+three times: with the text inline, after the backfill (the freed space is
+reusable by new rows but still allocated), and after ``VACUUM FULL``
+compacts the table, which is also the layout of rows written since the
+migration.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+import uuid
+
+import psycopg
+from psycopg import sql
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from attestation_templates import backfill
+from enrollments import ATTESTATION_TEXT
+from export import export_enrollments
+from migrations import migrate
+
+SEED = """
+    WITH providers AS (
+        INSERT INTO {schema}.hets_providers (authorized_signatory_name, organization_name, email_address, ptan, npi)
+        SELECT 'Signatory ' || i, 'Organization ' || i, 'provider' || i || '@example.com',
+               'PT' || lpad(i::text, 10, '0'), lpad(i::text, 10, '0')
+        FROM generate_series(%(start)s::int, %(stop)s::int) AS i
+        RETURNING provider_id
+    ), vendors AS (
+        INSERT INTO {schema}.hets_vendor_relationships
+        (provider_id, vendor_clearinghouse_name, effective_date, relationship_status)
+        SELECT provider_id, 'Clearinghouse ' || provider_id %% 50, DATE '2025-01-01', 'Active'
+        FROM providers
+        RETURNING provider_id, relationship_id
+    )
+    INSERT INTO {schema}.hets_attestations (provider_id, relationship_id, attestation_text, attested_by, ip_address)
+    SELECT provider_id, relationship_id, %(attestation_text)s, 'Signatory ' || provider_id, 'system'
+    FROM vendors
+"""
+# hets_attestations is partitioned; its own relation holds no data
+TABLE_BYTES = """
+    SELECT SUM(pg_total_relation_size(relid))::bigint FROM pg_partition_tree(%s::regclass) WHERE isleaf
+"""
+TABLE_SCAN = "SELECT COUNT(attested_by) FROM {schema}.hets_attestations"
+
+
+def seed(conn, schema_name, rows, batch=100000):
+    schema = sql.Identifier(schema_name)
+    for first in range(1, rows + 1, batch):
+        conn.execute(sql.SQL(SEED).format(schema=schema),
+                     {"start": first, "stop": min(first + batch - 1, rows), "attestation_text": ATTESTATION_TEXT})
+        conn.commit()
+    conn.autocommit = True
+    for table in ("hets_providers", "hets_vendor_relationships", "hets_attestations"):
+        conn.execute(sql.SQL("VACUUM ANALYZE {}.{}").format(schema, sql.Identifier(table)))
+    conn.autocommit = False
+
+
+def median_seconds(run, repeats):
+    samples = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        run()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples)
+
+
+def measure(conn, schema_name, rows, repeats):
+    """Return ``(table MB, bytes per row, scan seconds, export seconds)``."""
+    size = conn.execute(TABLE_BYTES, (f'"{schema_name}".hets_attestations',)).fetchone()[0]
+    scan = sql.SQL(TABLE_SCAN).format(schema=sql.Identifier(schema_name))
+    scan_seconds = median_seconds(lambda: conn.execute(scan).fetchone(), repeats)
+    export_seconds = median_seconds(
+        lambda: sum(len(chunk) for chunk in export_enrollments(conn, schema_name, "csv")), repeats
+    )
+    conn.commit()
+    return size / 1e6, size / rows, scan_seconds, export_seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1000000, help="Enrollments (one attestation each) to seed")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--conninfo", default=os.getenv("HETS_TEST_PG_CONNINFO", ""))
+    args = parser.parse_args()
+
+    schema_name = f"hets_bench_{uuid.uuid4().hex[:8]}"
+    schema = sql.Identifier(schema_name)
+    with psycopg.connect(args.conninfo, autocommit=True) as conn:
+        migrate(conn, schema_name)
+        conn.autocommit = False
+        try:
+            started = time.perf_counter()
+            seed(conn, schema_name, args.rows)
+            print(f"seeded {args.rows} enrollments in {time.perf_counter() - started:.1f} s")
+            results = {"inline": measure(conn, schema_name, args.rows, args.repeats)}
+
+            started = time.perf_counter()
+            moved = backfill(conn, schema_name)
+            seconds = time.perf_counter() - started
+            print(f"backfill moved {moved} statements in {seconds:.1f} s ({moved / seconds:,.0f} rows/s)")
+            results["backfilled"] = measure(conn, schema_name, args.rows, args.repeats)
+
+            conn.autocommit = True
+            conn.execute(sql.SQL("VACUUM FULL ANALYZE {}.hets_attestations").format(schema))
+            conn.autocommit = False
+            results["compacted"] = measure(conn, schema_name, args.rows, args.repeats)
+
+            print(f"{'layout':<12}  {'table MB':>9}  {'bytes/row':>9}  {'table scan':>10}  {'view export':>11}")
+            for layout, (megabytes, per_row, scan, export) in results.items():
+                print(f"{layout:<12}  {megabytes:9.1f}  {per_row:9.0f}  {scan * 1000:7.0f} ms  {export:9.2f} s")
+            inline, compacted = results["inline"], results["compacted"]
+            print(f"storage -{1 - compacted[0] / inline[0]:.0%}, table scan {inline[2] / compacted[2]:.1f}x, "
+                  f"view export {inline[3] / compacted[3]:.2f}x")
+        finally:
+            conn.rollback()
+            conn.autocommit = True
+            conn.execute(sql.SQL("DROP SCHEMA {} CASCADE").format(schema))
+
+
+if __name__ == "__main__":
+    main()
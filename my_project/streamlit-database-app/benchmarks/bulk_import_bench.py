@@ -0,0 +1,80 @@
+"""Measure bulk import throughput against a disposable local Postgres.
+
+    HETS_TEST_PG_CONNINFO="host=localhost dbname=postgres" python benchmarks/bulk_import_bench.py --rows 50000
+"""
+import argparse
+import os
+import sys
+import time
+import uuid
+
+import pandas as pd
+import psycopg
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bulk_import import IMPORT_COLUMNS, load_enrollments, validate_rows
+from migrations import migrate
+from validation import npi_check_digit
+
+
+def synthetic_roster(count):
+    """Build a valid roster DataFrame with ``count`` rows."""
+    records = []
+    for i in range(count):
+        name = f"Signatory {i}"
+        records.append({
+            "authorized_signatory_name": name,
+            "title": "Administrator",
+            "organization_name": f"Organization {i}",
+            "email_address": f"provider{i}@example.com",
+            "alternate_email_address": "",
+            "phone_number": "(555) 555-0100",
+            "ptan": f"PT{i:08d}",
+            "npi": f"{100000000 + i}{npi_check_digit(str(100000000 + i))}",
+            "tax_id": "12-3456789",
+            "organization_type": "Clinic",
+            "vendor_clearinghouse_name": f"Clearinghouse {i % 50}",
+            "vendor_contact_name": "",
+            "vendor_contact_email": "",
+            "vendor_contact_phone": "",
+            "effective_date": "2025-01-01",
+            "termination_date": "",
+            "offshore_data_sharing_consent": "no",
+            "relationship_status": "Active",
+            "attested_by": name,
+        })
+    return pd.DataFrame.from_records(records, columns=IMPORT_COLUMNS)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--conninfo", default=os.getenv("HETS_TEST_PG_CONNINFO", ""))
+    args = parser.parse_args()
+
+    df = synthetic_roster(args.rows)
+    start = time.perf_counter()
+    rows, errors = validate_rows(df)
+    validate_seconds = time.perf_counter() - start
+    assert not errors, errors[:5]
+
+    schema_name = f"hets_bench_{uuid.uuid4().hex[:8]}"
+    with psycopg.connect(args.conninfo) as conn:
+        migrate(conn, schema_name)
+        try:
+            start = time.perf_counter()
+            count, _ = load_enrollments(conn, schema_name, rows)
+            load_seconds = time.perf_counter() - start
+        finally:
+            conn.execute(f'DROP SCHEMA "{schema_name}" CASCADE')
+            conn.commit()
+
+    total = validate_seconds + load_seconds
+    print(f"rows={count} validate={validate_seconds:.2f}s ({count / validate_seconds:,.0f} rows/s) "
+          f"load={load_seconds:.2f}s ({count / load_seconds:,.0f} rows/s) "
+          f"total={count / total:,.0f} enrollments/s")
+
+
+if __name__ == "__main__":
+    main()
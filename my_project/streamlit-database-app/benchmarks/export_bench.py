@@ -0,0 +1,115 @@
+"""Measure export throughput and peak memory as the enrollment table grows.
+
+    HETS_TEST_PG_CONNINFO="host=localhost dbname=postgres" python benchmarks/export_bench.py --rows 100000,1000000
+
+Grows a throwaway schema to each ``--rows`` size (one provider, vendor
+relationship and attestation per row) and exports ``v_complete_enrollments``
+to /dev/null in a fresh child process per run: CSV and Parquet through
+``export.export_enrollments``, and for comparison the old approach of
+``fetchall()`` into a list before writing CSV. Reports rows per second and
+the child's peak RSS, which stays flat for the streaming exports.
+"""
+import argparse
+import csv
+import multiprocessing
+import os
+import resource
+import sys
+import time
+import uuid
+
+import psycopg
+from psycopg import sql
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from export import export_enrollments, export_query
+from migrations import migrate
+
+SEED = """
+    WITH providers AS (
+        INSERT INTO {schema}.hets_providers
+        (authorized_signatory_name, title, organization_name, email_address, phone_number,
+         ptan, npi, tax_id, organization_type)
+        SELECT 'Signatory ' || i, 'Administrator', 'Organization ' || i, 'provider' || i || '@example.com',
+               '(555) 555-0100', 'PT' || lpad(i::text, 10, '0'), lpad(i::text, 10, '0'), '12-3456789', 'Clinic'
+        FROM generate_series(%(start)s::int, %(stop)s::int) AS i
+        RETURNING provider_id
+    ), vendors AS (
+        INSERT INTO {schema}.hets_vendor_relationships
+        (provider_id, vendor_clearinghouse_name, vendor_contact_email, effective_date, relationship_status)
+        SELECT provider_id, 'Clearinghouse ' || provider_id %% 50, 'edi@example.com', DATE '2025-01-01', 'Active'
+        FROM providers
+        RETURNING provider_id, relationship_id
+    )
+    INSERT INTO {schema}.hets_attestations (provider_id, relationship_id, attestation_text, attested_by)
+    SELECT provider_id, relationship_id, 'I attest.', 'Signatory ' || provider_id
+    FROM vendors
+"""
+
+
+def grow(conn, schema_name, start, stop, batch=100000):
+    schema = sql.Identifier(schema_name)
+    for first in range(start, stop + 1, batch):
+        conn.execute(sql.SQL(SEED).format(schema=schema), {"start": first, "stop": min(first + batch - 1, stop)})
+        conn.commit()
+    conn.autocommit = True
+    for table in ("hets_providers", "hets_vendor_relationships", "hets_attestations"):
+        conn.execute(sql.SQL("VACUUM ANALYZE {}.{}").format(schema, sql.Identifier(table)))
+    conn.autocommit = False
+
+
+def run_export(conninfo, schema_name, mode, results):
+    """Child process: export to /dev/null and report (rows, seconds, peak RSS in MB)."""
+    start = time.perf_counter()
+    stats = {"rows": 0}
+    with psycopg.connect(conninfo) as conn, open(os.devnull, "wb") as out:
+        if mode == "fetchall csv":
+            with open(os.devnull, "w", newline="") as text_out:
+                cur = conn.execute(export_query(schema_name))
+                rows = cur.fetchall()
+                writer = csv.writer(text_out)
+                writer.writerow([c.name for c in cur.description])
+                writer.writerows(rows)
+                stats["rows"] = len(rows)
+        else:
+            for chunk in export_enrollments(conn, schema_name, mode, stats=stats):
+                out.write(chunk)
+    results.put((stats["rows"], time.perf_counter() - start,
+                 resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", default="100000,1000000", help="Comma-separated table sizes")
+    parser.add_argument("--modes", default="csv,parquet,fetchall csv")
+    parser.add_argument("--conninfo", default=os.getenv("HETS_TEST_PG_CONNINFO", ""))
+    args = parser.parse_args()
+    sizes = sorted(int(n) for n in args.rows.split(","))
+
+    schema_name = f"hets_bench_{uuid.uuid4().hex[:8]}"
+    context = multiprocessing.get_context("spawn")
+    with psycopg.connect(args.conninfo, autocommit=True) as conn:
+        migrate(conn, schema_name)
+        conn.autocommit = False
+        try:
+            seeded = 0
+            for size in sizes:
+                grow(conn, schema_name, seeded + 1, size)
+                seeded = size
+                for mode in args.modes.split(","):
+                    results = context.Queue()
+                    child = context.Process(target=run_export, args=(args.conninfo, schema_name, mode, results))
+                    child.start()
+                    rows, elapsed, peak_mb = results.get()
+                    child.join()
+                    print(f"{size:>9} rows  {mode:<13} {rows / elapsed:>9,.0f} rows/s  "
+                          f"{elapsed:6.2f}s  peak RSS {peak_mb:6.0f} MB")
+        finally:
+            conn.rollback()
+            conn.autocommit = True
+            conn.execute(sql.SQL("DROP SCHEMA {} CASCADE").format(sql.Identifier(schema_name)))
+
+
+if __name__ == "__main__":
+    main()
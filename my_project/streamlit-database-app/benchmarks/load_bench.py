@@ -0,0 +1,238 @@
+"""Load-test the app's database layer with many concurrent sessions.
+
+    HETS_TEST_PG_CONNINFO="host=localhost dbname=postgres" python benchmarks/load_bench.py \
+        --sessions 50,100,200 --pool-sizes 10,20,40 --output load.jsonl
+
+Drives ``app.init_database``, ``app.save_enrollment`` and
+``app.get_enrollments`` directly from one thread per session, as Streamlit
+runs them, against a throwaway schema, with the module-level pool replaced by
+one of each ``--pool-sizes`` and ``st.error`` recorded instead of rendered.
+Each run starts with every session calling ``init_database`` at once and
+waiting for its background warm-up (a cold process), then each session loops for ``--duration`` seconds, saving a new
+enrollment with probability ``--write-ratio`` and otherwise listing a page of
+enrollments (served from the query cache until a save invalidates it).
+Saves go to the submission queue (in a temporary directory); after each run
+the bench waits for the queue worker to write them all to Postgres and
+reports how long that took.
+
+With ``--replica-conninfo`` (a streaming standby of ``--conninfo``), reads
+go to a second pool of the same size, as with ``REPLICA_PGHOST`` in the app.
+
+Prints one line per (sessions, pool size) and, with ``--output``, appends
+one JSON object per run with throughput, latency percentiles per operation,
+each pool's wait time and saturation, and errors, for comparison across
+releases.
+"""
+import argparse
+import itertools
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+import psycopg
+from psycopg import sql
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app
+import db
+import migrations
+import startup
+from db_metrics import pool_stats
+from export_bench import grow
+from query_cache import enrollment_cache
+from submission_queue import get_queue
+from write_latency_bench import sample_enrollment
+
+
+class StaticPassword:
+    """Credential provider for a local Postgres: the password (if any) is in the conninfo."""
+
+    def get_password(self):
+        return None
+
+
+def percentiles(samples):
+    if len(samples) < 2:
+        return {"p50": samples[0] if samples else None, "p95": None, "p99": None}
+    q = statistics.quantiles(samples, n=100)
+    return {"p50": q[49], "p95": q[94], "p99": q[98]}
+
+
+def use_database(conninfo, schema_name):
+    """Point the app's db module at ``conninfo`` and ``schema_name``."""
+    db.credential_provider = StaticPassword()
+    db.get_conninfo = lambda: conninfo
+    db.get_schema_name = app.get_schema_name = lambda: schema_name
+    os.environ["HETS_QUEUE_PATH"] = os.path.join(tempfile.mkdtemp(prefix="hets_bench_"), "submissions.db")
+    # Keep the page from rendering; count the errors it would have shown instead.
+    errors = []
+    app.st.error = errors.append
+    return errors
+
+
+def pool_results(pool, stats):
+    requests = stats.get("requests_num", 0)
+    return {
+        "requests": requests,
+        "queued": stats.get("requests_queued", 0),
+        "wait_ms_avg": stats.get("requests_wait_ms", 0) / requests if requests else 0,
+        "timeouts": stats.get("requests_errors", 0),
+        "connections_opened": stats.get("connections_num", 0),
+        "peak_saturation": pool.peak_saturation,
+    }
+
+
+def sample_saturation(pools, stop, interval=0.05):
+    """Record each pool's highest saturation (see ``db_metrics.pool_stats``) until ``stop`` is set."""
+    while not stop.wait(interval):
+        for pool in pools:
+            pool.peak_saturation = max(pool.peak_saturation, pool_stats(pool)["saturation"])
+
+
+def wait_for_queue(timeout=300):
+    """Seconds until the submission queue has written everything to Postgres."""
+    queue = get_queue()
+    started = time.perf_counter()
+    while queue.stats()["pending"] and time.perf_counter() - started < timeout:
+        time.sleep(0.05)
+    return time.perf_counter() - started
+
+
+def run(conninfo, schema_name, sessions, pool_size, duration, write_ratio, ids, errors, replica_conninfo=None):
+    """One load run; returns its results as a dict."""
+    pools = {}
+    for name, pool_conninfo in (("primary", conninfo), ("replica", replica_conninfo)):
+        if pool_conninfo:
+            pool = pools[name] = db.create_pool(pool_conninfo, db.credential_provider,
+                                                min_size=min(db.POOL_MIN_SIZE, pool_size), max_size=pool_size)
+            pool.wait()
+            pool.peak_saturation = 0.0
+    db.connection_pool, db.read_pool = pools["primary"], pools.get("replica")
+    db.read_fallbacks = 0
+    migrations._migrated_schemas.discard(schema_name)
+    startup._warm_up = None
+    enrollment_cache.invalidate()
+    del errors[:]
+    for pool in pools.values():
+        pool.pop_stats()
+
+    latencies = {"init": [], "save": [], "list": []}
+    start_line = threading.Barrier(sessions + 1)
+    deadline = [0.0]
+
+    def session(seed):
+        rng = random.Random(seed)
+        timings = {"init": [], "save": [], "list": []}
+        start_line.wait()
+        started = time.perf_counter()
+        app.init_database().wait()
+        timings["init"].append((time.perf_counter() - started) * 1000)
+        while time.perf_counter() < deadline[0]:
+            started = time.perf_counter()
+            if rng.random() < write_ratio:
+                app.save_enrollment(*sample_enrollment(next(ids)), str(uuid.uuid4()))
+                op = "save"
+            else:
+                app.get_enrollments()
+                op = "list"
+            timings[op].append((time.perf_counter() - started) * 1000)
+        for op, samples in timings.items():
+            latencies[op].extend(samples)
+
+    threads = [threading.Thread(target=session, args=(i,)) for i in range(sessions)]
+    for thread in threads:
+        thread.start()
+    stop = threading.Event()
+    sampler = threading.Thread(target=sample_saturation, args=(pools.values(), stop))
+    sampler.start()
+    deadline[0] = time.perf_counter() + duration
+    start_line.wait()
+    started = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    drain_seconds = wait_for_queue()
+    stop.set()
+    sampler.join()
+    results = {name: pool_results(pool, pool.pop_stats()) for name, pool in pools.items()}
+    for pool in pools.values():
+        pool.close()
+
+    completed = len(latencies["save"]) + len(latencies["list"])
+    return {
+        "sessions": sessions,
+        "pool_size": pool_size,
+        "seconds": elapsed,
+        "ops": completed,
+        "ops_per_second": completed / elapsed,
+        "latency_ms": {op: {"count": len(samples), **percentiles(samples)} for op, samples in latencies.items()},
+        "pools": results,
+        "read_fallbacks": db.read_fallbacks,
+        "queue_drain_seconds": drain_seconds,
+        "errors": len(errors),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", default="50,100,200", help="Comma-separated concurrent session counts")
+    parser.add_argument("--pool-sizes", default=str(db.POOL_MAX_SIZE), help="Comma-separated pool max sizes")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds of load per run")
+    parser.add_argument("--write-ratio", type=float, default=0.1, help="Share of operations that save")
+    parser.add_argument("--preload", type=int, default=10000, help="Enrollments in the table before the first run")
+    parser.add_argument("--output", help="Append one JSON object per run to this file")
+    parser.add_argument("--conninfo", default=os.getenv("HETS_TEST_PG_CONNINFO", ""))
+    parser.add_argument("--replica-conninfo", default=os.getenv("HETS_TEST_PG_REPLICA_CONNINFO"),
+                        help="Streaming standby of --conninfo to send reads to")
+    args = parser.parse_args()
+
+    schema_name = f"hets_bench_{uuid.uuid4().hex[:8]}"
+    errors = use_database(args.conninfo, schema_name)
+    with psycopg.connect(args.conninfo) as conn:
+        migrations.migrate(conn, schema_name)
+        if args.preload:
+            grow(conn, schema_name, 1, args.preload)
+        release = {"commit": git_commit(), "postgres": conn.info.server_version}
+    # Saved enrollments get PTANs after the preloaded ones
+    ids = itertools.count(10 ** 7)
+
+    try:
+        for sessions, pool_size in itertools.product(
+                (int(n) for n in args.sessions.split(",")), [int(n) for n in args.pool_sizes.split(",")]):
+            result = run(args.conninfo, schema_name, sessions, pool_size, args.duration, args.write_ratio,
+                         ids, errors, args.replica_conninfo)
+            latency = result["latency_ms"]
+            pools = "  ".join(f"{name} wait {pool['wait_ms_avg']:6.1f} ms avg, peak {pool['peak_saturation']:4.0%}"
+                              for name, pool in result["pools"].items())
+            print(f"sessions={sessions:<4} pool={pool_size:<3} {result['ops_per_second']:8.0f} ops/s  "
+                  f"save p50/p99={latency['save']['p50'] or 0:6.1f}/{latency['save']['p99'] or 0:7.1f} ms  "
+                  f"list p50/p99={latency['list']['p50'] or 0:6.1f}/{latency['list']['p99'] or 0:7.1f} ms  "
+                  f"init p99={latency['init']['p99'] or 0:7.1f} ms  {pools}  "
+                  f"queue drained in {result['queue_drain_seconds']:.1f} s  errors {result['errors']}")
+            if args.output:
+                with open(args.output, "a") as f:
+                    f.write(json.dumps({**release, "duration": args.duration, "write_ratio": args.write_ratio,
+                                        **result}) + "\n")
+    finally:
+        with psycopg.connect(args.conninfo, autocommit=True) as conn:
+            conn.execute(sql.SQL("DROP SCHEMA {} CASCADE").format(sql.Identifier(schema_name)))
+
+
+if __name__ == "__main__":
+    main()
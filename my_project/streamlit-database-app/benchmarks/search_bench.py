@@ -0,0 +1,139 @@
+"""Time typeahead search over a large synthetic provider table.
+
+    HETS_TEST_PG_CONNINFO="host=localhost dbname=postgres" python benchmarks/search_bench.py --rows 1000000
+
+Seeds ``--rows`` providers, each with one vendor relationship, into a
+throwaway schema (names are built from syllables and common words, so
+prefixes match anywhere from a handful to tens of thousands of rows), then
+runs ``enrollments.search_providers`` for typed prefixes, whole words and
+multi-word terms and reports latency percentiles per kind of term.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+import uuid
+
+import psycopg
+from psycopg import sql
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from enrollments import search_providers
+from migrations import migrate
+
+SYLLABLES = ["ash", "bel", "brook", "cal", "clay", "dal", "elm", "fair", "glen", "green", "hart",
+             "haven", "high", "lake", "lin", "mar", "mont", "north", "oak", "pine", "red", "ridge",
+             "river", "rock", "shore", "spring", "stone", "sum", "wood", "york"]
+SPECIALTIES = ["Family", "Pediatric", "Cardiology", "Orthopedic", "Dental", "Vision", "Surgical",
+               "Oncology", "Behavioral", "Rehab", "Medical", "Women's", "Urgent", "Senior", "Dermatology"]
+SUFFIXES = ["Clinic", "Health", "Associates", "Partners", "Group", "Center", "Care", "Practice",
+            "Hospital", "Services"]
+FIRST_NAMES = ["James", "Mary", "Robert", "Patricia", "John", "Jennifer", "Michael", "Linda", "David",
+               "Elizabeth", "William", "Barbara", "Richard", "Susan", "Joseph", "Jessica", "Thomas",
+               "Sarah", "Charles", "Karen", "Priya", "Wei", "Carlos", "Fatima", "Olga", "Kenji"]
+LAST_NAMES = ["Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller", "Davis",
+              "Rodriguez", "Martinez", "Hernandez", "Lopez", "Gonzalez", "Wilson", "Anderson",
+              "Thomas", "Taylor", "Moore", "Jackson", "Martin", "Lee", "Perez", "Thompson", "White",
+              "Harris", "Sanchez", "Clark", "Ramirez", "Lewis", "Robinson", "Nguyen", "Patel", "Kim"]
+VENDORS = ["Availity", "Change Healthcare", "Waystar", "Trizetto", "Office Ally", "Claim.MD",
+           "Experian Health", "Inmediata", "Apex EDI", "ABILITY Network", "eSolutions", "Zirmed"]
+
+SEED_PROVIDERS = """
+    INSERT INTO {schema}.hets_providers
+    (authorized_signatory_name, title, organization_name, email_address, phone_number,
+     ptan, npi, tax_id, organization_type)
+    SELECT (%(first)s::text[])[1 + floor(random() * cardinality(%(first)s::text[]))::int] || ' ' ||
+           (%(last)s::text[])[1 + floor(random() * cardinality(%(last)s::text[]))::int],
+           'Administrator',
+           initcap((%(syllables)s::text[])[1 + floor(random() * cardinality(%(syllables)s::text[]))::int] ||
+                   (%(syllables)s::text[])[1 + floor(random() * cardinality(%(syllables)s::text[]))::int]) || ' ' ||
+           (%(specialties)s::text[])[1 + floor(random() * cardinality(%(specialties)s::text[]))::int] || ' ' ||
+           (%(suffixes)s::text[])[1 + floor(random() * cardinality(%(suffixes)s::text[]))::int],
+           'provider' || i || '@example.com', '(555) 555-0100',
+           'PT' || lpad(i::text, 10, '0'), lpad(i::text, 10, '0'), '12-3456789', 'Clinic'
+    FROM generate_series(%(start)s, %(stop)s) AS i
+"""
+SEED_VENDORS = """
+    INSERT INTO {schema}.hets_vendor_relationships
+    (provider_id, vendor_clearinghouse_name, effective_date, relationship_status)
+    SELECT provider_id,
+           (%(vendors)s::text[])[1 + floor(random() * cardinality(%(vendors)s::text[]))::int],
+           DATE '2025-01-01', 'Active'
+    FROM {schema}.hets_providers
+"""
+
+
+def seed(conn, schema_name, rows, batch=100000):
+    schema = sql.Identifier(schema_name)
+    params = {"first": FIRST_NAMES, "last": LAST_NAMES, "syllables": SYLLABLES,
+              "specialties": SPECIALTIES, "suffixes": SUFFIXES, "vendors": VENDORS}
+    conn.execute("SELECT setseed(0.42)")
+    for start in range(1, rows + 1, batch):
+        conn.execute(sql.SQL(SEED_PROVIDERS).format(schema=schema),
+                     {**params, "start": start, "stop": min(start + batch - 1, rows)})
+        conn.commit()
+    conn.execute(sql.SQL(SEED_VENDORS).format(schema=schema), params)
+    conn.commit()
+    conn.autocommit = True
+    conn.execute(sql.SQL("VACUUM ANALYZE {}.hets_providers").format(schema))
+    conn.execute(sql.SQL("VACUUM ANALYZE {}.hets_vendor_relationships").format(schema))
+
+
+def sample_terms(rng, count):
+    """Terms a user might have typed so far, grouped by kind."""
+    def place():
+        return (rng.choice(SYLLABLES) + rng.choice(SYLLABLES)).capitalize()
+
+    return {
+        "3-char prefix": [place()[:3] for _ in range(count)],
+        "word prefix": [place()[:rng.randint(4, 7)] for _ in range(count)],
+        "org + word": [f"{place()} {rng.choice(SPECIALTIES)[:4]}" for _ in range(count)],
+        "signatory": [f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)[:3]}" for _ in range(count)],
+        "vendor": [rng.choice(VENDORS)[:5] for _ in range(count)],
+        "no match": [f"zq{rng.randrange(1000)}" for _ in range(count)],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--queries", type=int, default=200, help="Queries per kind of term")
+    parser.add_argument("--conninfo", default=os.getenv("HETS_TEST_PG_CONNINFO", ""))
+    args = parser.parse_args()
+
+    schema_name = f"hets_bench_{uuid.uuid4().hex[:8]}"
+    with psycopg.connect(args.conninfo, autocommit=True) as conn:
+        migrate(conn, schema_name)
+        conn.autocommit = False
+        try:
+            start = time.perf_counter()
+            seed(conn, schema_name, args.rows)
+            print(f"Seeded {args.rows} providers in {time.perf_counter() - start:.1f}s")
+
+            terms = sample_terms(random.Random(7), args.queries)
+            for text in terms["3-char prefix"][:20]:
+                search_providers(conn, schema_name, text)
+            all_samples = []
+            for kind, texts in terms.items():
+                samples, results = [], 0
+                for text in texts:
+                    started = time.perf_counter()
+                    results += len(search_providers(conn, schema_name, text))
+                    samples.append((time.perf_counter() - started) * 1000)
+                all_samples.extend(samples)
+                q = statistics.quantiles(samples, n=100)
+                print(f"{kind:<14} p50={q[49]:6.1f} ms  p95={q[94]:6.1f} ms  p99={q[98]:6.1f} ms  "
+                      f"avg results={results / len(texts):.1f}")
+            q = statistics.quantiles(all_samples, n=100)
+            print(f"{'all':<14} p50={q[49]:6.1f} ms  p95={q[94]:6.1f} ms  p99={q[98]:6.1f} ms")
+        finally:
+            conn.rollback()
+            conn.autocommit = True
+            conn.execute(sql.SQL("DROP SCHEMA {} CASCADE").format(sql.Identifier(schema_name)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""Compare provider summary reads before and after the maintained summary table.
+
+    HETS_TEST_PG_CONNINFO="host=localhost dbname=postgres" python benchmarks/summary_bench.py --history 10,50,200
+
+For each ``--history`` size, seeds one provider with that many submissions,
+vendor relationships and attestations (plus ``--providers`` small ones
+around it) in a throwaway schema and times three reads of it: the
+original fan-out ``get_provider_summary`` query, the ``get_provider_summary()``
+function and ``v_submission_summary``, both backed by ``hets_provider_summary``.
+The fan-out query joins submissions x vendors x attestations, so its cost
+grows with the cube of the history; the summary reads stay flat.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+import uuid
+
+import psycopg
+from psycopg import sql
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from migrations import migrate
+from provider_summary import get_provider_summary
+
+# get_provider_summary() as it was before migration 0006
+FAN_OUT_SUMMARY = """
+    SELECT p.organization_name, p.email_address,
+           COUNT(DISTINCT CASE WHEN v.relationship_status = 'Active' THEN v.relationship_id END),
+           COUNT(DISTINCT a.attestation_id),
+           GREATEST(p.updated_at, MAX(sh.submission_date))
+    FROM {schema}.hets_providers p
+    LEFT JOIN {schema}.hets_vendor_relationships v ON p.provider_id = v.provider_id
+    LEFT JOIN {schema}.hets_attestations a ON p.provider_id = a.provider_id
+    LEFT JOIN {schema}.hets_submission_history sh ON p.provider_id = sh.provider_id
+    WHERE p.provider_id = %s
+    GROUP BY p.provider_id, p.organization_name, p.email_address, p.updated_at
+"""
+VIEW_SUMMARY = "SELECT * FROM {schema}.v_submission_summary WHERE provider_id = %s"
+
+SEED_PROVIDERS = """
+    INSERT INTO {schema}.hets_providers (authorized_signatory_name, organization_name, email_address, ptan, npi)
+    SELECT 'Signatory ' || i, 'Organization ' || i, 'provider' || i || '@example.com',
+           'PT' || lpad(i::text, 10, '0'), lpad(i::text, 10, '0')
+    FROM generate_series(%(start)s::int, %(stop)s::int) AS i
+    RETURNING provider_id
+"""
+SEED_HISTORY = """
+    WITH vendors AS (
+        INSERT INTO {schema}.hets_vendor_relationships
+        (provider_id, vendor_clearinghouse_name, effective_date, relationship_status)
+        SELECT %(provider_id)s, 'Clearinghouse ' || i, DATE '2025-01-01',
+               CASE WHEN i %% 3 = 0 THEN 'Terminated' ELSE 'Active' END
+        FROM generate_series(1, %(count)s::int) AS i
+        RETURNING relationship_id
+    ), attestations AS (
+        INSERT INTO {schema}.hets_attestations (provider_id, relationship_id, attestation_text, attested_by)
+        SELECT %(provider_id)s, relationship_id, 'I attest.', 'Signatory'
+        FROM vendors
+    )
+    INSERT INTO {schema}.hets_submission_history (provider_id, submission_type, submission_date)
+    SELECT %(provider_id)s, 'Update', TIMESTAMP '2025-01-01' + i * INTERVAL '1 hour'
+    FROM generate_series(1, %(count)s::int) AS i
+"""
+
+
+def seed(conn, schema_name, providers, history):
+    """Seed ``providers`` with one of everything and one provider per history size; returns their ids."""
+    schema = sql.Identifier(schema_name)
+    conn.execute(sql.SQL(SEED_PROVIDERS).format(schema=schema), {"start": 1, "stop": providers})
+    for provider_id in conn.execute(sql.SQL("SELECT provider_id FROM {}.hets_providers").format(schema)).fetchall():
+        conn.execute(sql.SQL(SEED_HISTORY).format(schema=schema), {"provider_id": provider_id[0], "count": 1})
+    targets = {}
+    for offset, count in enumerate(history, start=providers + 1):
+        provider_id = conn.execute(sql.SQL(SEED_PROVIDERS).format(schema=schema),
+                                   {"start": offset, "stop": offset}).fetchone()[0]
+        conn.execute(sql.SQL(SEED_HISTORY).format(schema=schema), {"provider_id": provider_id, "count": count})
+        targets[count] = provider_id
+    conn.commit()
+    conn.autocommit = True
+    for table in ("hets_providers", "hets_vendor_relationships", "hets_attestations",
+                  "hets_submission_history", "hets_provider_summary"):
+        conn.execute(sql.SQL("VACUUM ANALYZE {}.{}").format(schema, sql.Identifier(table)))
+    conn.autocommit = False
+    return targets
+
+
+def time_reads(read, repeats):
+    read()
+    samples = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        read()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--history", default="10,25,50,100",
+                        help="Comma-separated submissions/vendors/attestations per measured provider")
+    parser.add_argument("--providers", type=int, default=1000, help="Background providers")
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--conninfo", default=os.getenv("HETS_TEST_PG_CONNINFO", ""))
+    args = parser.parse_args()
+    history = [int(n) for n in args.history.split(",")]
+
+    schema_name = f"hets_bench_{uuid.uuid4().hex[:8]}"
+    schema = sql.Identifier(schema_name)
+    with psycopg.connect(args.conninfo, autocommit=True) as conn:
+        migrate(conn, schema_name)
+        conn.autocommit = False
+        try:
+            targets = seed(conn, schema_name, args.providers, history)
+            fan_out = sql.SQL(FAN_OUT_SUMMARY).format(schema=schema)
+            view = sql.SQL(VIEW_SUMMARY).format(schema=schema)
+            print(f"{'history':>8}  {'fan-out rows':>12}  {'fan-out':>10}  {'function':>10}  {'view':>10}")
+            for count, provider_id in targets.items():
+                expected = conn.execute(fan_out, (provider_id,)).fetchone()
+                assert get_provider_summary(conn, schema_name, provider_id) == expected
+                timings = [
+                    time_reads(lambda: conn.execute(fan_out, (provider_id,)).fetchone(), args.repeats),
+                    time_reads(lambda: get_provider_summary(conn, schema_name, provider_id), args.repeats),
+                    time_reads(lambda: conn.execute(view, (provider_id,)).fetchone(), args.repeats),
+                ]
+                print(f"{count:>8}  {count ** 3:>12}  " + "  ".join(f"{t:7.2f} ms" for t in timings))
+        finally:
+            conn.rollback()
+            conn.autocommit = True
+            conn.execute(sql.SQL("DROP SCHEMA {} CASCADE").format(schema))
+
+
+if __name__ == "__main__":
+    main()
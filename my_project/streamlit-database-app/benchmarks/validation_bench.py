@@ -0,0 +1,61 @@
+"""Time batch validation of synthetic enrollment records.
+
+    python benchmarks/validation_bench.py --rows 1000000
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from validation import npi_check_digit, validate_batch
+
+
+def synthetic_records(count, invalid_fraction=0.05, seed=42):
+    """Build ``count`` records as a DataFrame, with roughly ``invalid_fraction`` bad NPIs or emails."""
+    rng = np.random.default_rng(seed)
+    ids = np.arange(count)
+    prefixes = (100000000 + ids).astype(str)
+    npis = pd.Series([p + str(npi_check_digit(p)) for p in prefixes])
+    bad = rng.random(count) < invalid_fraction
+    npis[bad] = npis[bad].str.slice(0, 9) + "0"
+    names = pd.Series(ids.astype(str)).radd("Signatory ")
+    return pd.DataFrame({
+        'authorized_signatory_name': names,
+        'title': "Administrator",
+        'organization_name': pd.Series(ids.astype(str)).radd("Organization "),
+        'email_address': np.where(rng.random(count) < invalid_fraction, "not-an-email",
+                                  pd.Series(ids.astype(str)).radd("provider").add("@example.com")),
+        'alternate_email_address': "",
+        'phone_number': "(555) 555-0100",
+        'ptan': pd.Series(ids.astype(str)).radd("PT"),
+        'npi': npis,
+        'tax_id': "12-3456789",
+        'organization_type': "Clinic",
+        'vendor_clearinghouse_name': "Clearinghouse",
+        'effective_date': "2025-01-01",
+        'termination_date': "",
+        'relationship_status': "Active",
+        'attested_by': names,
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1000000)
+    args = parser.parse_args()
+
+    records = synthetic_records(args.rows)
+    start = time.perf_counter()
+    errors = validate_batch(records)
+    elapsed = time.perf_counter() - start
+    print(f"rows={args.rows} errors={len(errors)} elapsed={elapsed:.2f}s ({args.rows / elapsed:,.0f} rows/s)")
+    print(errors['code'].value_counts().to_string())
+
+
+if __name__ == "__main__":
+    main()
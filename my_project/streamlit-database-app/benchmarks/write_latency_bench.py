@@ -0,0 +1,212 @@
+"""Compare enrollment submit latency over a simulated slow network.
+
+    HETS_TEST_PG_CONNINFO="host=localhost dbname=postgres" python benchmarks/write_latency_bench.py --delay-ms 10
+
+The benchmark relays the Postgres connection through a local TCP proxy that
+delays every chunk by ``--delay-ms`` in each direction (20 ms round trip by
+default) and times the original four-statement write path against
+``enrollments.insert_enrollment`` and against queueing the submission (what
+``app.save_enrollment`` does), reporting how long the queue worker then takes
+to write the queued submissions through the proxy.
+"""
+import argparse
+import os
+import queue
+import socket
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import date
+
+import psycopg
+from psycopg import sql
+from psycopg.conninfo import conninfo_to_dict, make_conninfo
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from enrollments import ATTESTATION_TEXT, insert_enrollment
+from migrations import migrate
+from submission_queue import SubmissionQueue, postgres_writer
+
+
+class DelayProxy:
+    """TCP proxy that delays each forwarded chunk by ``delay`` seconds."""
+
+    def __init__(self, upstream, delay):
+        self.upstream = upstream
+        self.delay = delay
+        self.server = socket.create_server(("127.0.0.1", 0))
+        self.port = self.server.getsockname()[1]
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def _connect_upstream(self):
+        host, port = self.upstream
+        if host.startswith("/"):
+            sock = socket.socket(socket.AF_UNIX)
+            sock.connect(os.path.join(host, f".s.PGSQL.{port}"))
+            return sock
+        return socket.create_connection((host, port))
+
+    def _accept(self):
+        while True:
+            client, _ = self.server.accept()
+            upstream = self._connect_upstream()
+            for src, dst in ((client, upstream), (upstream, client)):
+                threading.Thread(target=self._pipe, args=(src, dst), daemon=True).start()
+
+    def _pipe(self, src, dst):
+        # Each chunk is released ``delay`` after it arrived, so the proxy adds
+        # latency without serialising back-to-back chunks.
+        chunks = queue.Queue()
+
+        def send():
+            while (item := chunks.get()) is not None:
+                release_at, data = item
+                time.sleep(max(release_at - time.monotonic(), 0))
+                try:
+                    dst.sendall(data)
+                except OSError:
+                    return
+            dst.close()
+
+        threading.Thread(target=send, daemon=True).start()
+        try:
+            while data := src.recv(65536):
+                chunks.put((time.monotonic() + self.delay, data))
+        except OSError:
+            pass
+        finally:
+            chunks.put(None)
+
+
+def sample_enrollment(i):
+    provider_data = {
+        'authorized_signatory_name': f'Signatory {i}',
+        'title': 'Administrator',
+        'organization_name': f'Organization {i}',
+        'email_address': f'provider{i}@example.com',
+        'alternate_email_address': None,
+        'phone_number': '(555) 555-0100',
+        'ptan': f'PT{i:08d}',
+        'npi': '1234567893',
+        'tax_id': '12-3456789',
+        'organization_type': 'Clinic'
+    }
+    vendor_data = {
+        'vendor_clearinghouse_name': 'Clearinghouse',
+        'vendor_contact_name': None,
+        'vendor_contact_email': None,
+        'vendor_contact_phone': None,
+        'effective_date': date(2025, 1, 1),
+        'termination_date': None,
+        'offshore_data_sharing_consent': False,
+        'relationship_status': 'Active'
+    }
+    attestation_data = {
+        'attestation_text': ATTESTATION_TEXT,
+        'attested_by': f'Signatory {i}',
+        'ip_address': 'benchmark'
+    }
+    return provider_data, vendor_data, attestation_data
+
+
+def sequential_insert(conn, schema_name, provider_data, vendor_data, attestation_data):
+    """The original write path: four dependent statements, then commit."""
+    schema = sql.Identifier(schema_name)
+    with conn.cursor() as cur:
+        cur.execute(sql.SQL("""
+            INSERT INTO {}.hets_providers
+            (authorized_signatory_name, title, organization_name, email_address,
+             alternate_email_address, phone_number, ptan, npi, tax_id, organization_type)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+            RETURNING provider_id
+        """).format(schema), [provider_data[k] for k in (
+            'authorized_signatory_name', 'title', 'organization_name', 'email_address',
+            'alternate_email_address', 'phone_number', 'ptan', 'npi', 'tax_id', 'organization_type')])
+        provider_id = cur.fetchone()[0]
+        cur.execute(sql.SQL("""
+            INSERT INTO {}.hets_vendor_relationships
+            (provider_id, vendor_clearinghouse_name, vendor_contact_name,
+             vendor_contact_email, vendor_contact_phone, effective_date,
+             termination_date, offshore_data_sharing_consent, relationship_status)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+            RETURNING relationship_id
+        """).format(schema), [provider_id] + list(vendor_data.values()))
+        relationship_id = cur.fetchone()[0]
+        cur.execute(sql.SQL("""
+            INSERT INTO {}.hets_attestations
+            (provider_id, relationship_id, attestation_text, attested_by, ip_address)
+            VALUES (%s, %s, %s, %s, %s)
+        """).format(schema), [provider_id, relationship_id] + list(attestation_data.values()))
+        cur.execute(sql.SQL("""
+            INSERT INTO {}.hets_submission_history
+            (provider_id, submission_type, status, notes)
+            VALUES (%s, %s, %s, %s)
+        """).format(schema), (provider_id, 'EDI Enrollment', 'Submitted', 'benchmark'))
+        conn.commit()
+    return provider_id
+
+
+def time_writes(conn, schema_name, write, count):
+    samples = []
+    for i in range(count):
+        start = time.perf_counter()
+        write(conn, schema_name, *sample_enrollment(i))
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def report(name, samples):
+    q = statistics.quantiles(samples, n=100)
+    print(f"{name:<12} p50={q[49]:7.1f} ms  p95={q[94]:7.1f} ms  p99={q[98]:7.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=100)
+    parser.add_argument("--delay-ms", type=float, default=10.0, help="One-way delay (round trip is twice this)")
+    parser.add_argument("--conninfo", default=os.getenv("HETS_TEST_PG_CONNINFO", ""))
+    args = parser.parse_args()
+
+    params = conninfo_to_dict(args.conninfo)
+    proxy = DelayProxy((params.get("host") or "localhost", int(params.get("port") or 5432)), args.delay_ms / 1000)
+    delayed = make_conninfo(args.conninfo, host="127.0.0.1", port=proxy.port, sslmode="disable")
+
+    schema_name = f"hets_bench_{uuid.uuid4().hex[:8]}"
+    with psycopg.connect(args.conninfo) as admin:
+        migrate(admin, schema_name)
+    try:
+        with psycopg.connect(delayed) as conn:
+            report("before", time_writes(conn, schema_name, sequential_insert, args.count))
+            report("after", time_writes(
+                conn, schema_name, lambda *enrollment: insert_enrollment(*enrollment, str(uuid.uuid4())), args.count
+            ))
+
+            with tempfile.TemporaryDirectory() as tmp:
+                submissions = SubmissionQueue(os.path.join(tmp, "submissions.db"))
+
+                def enqueue(conn, schema_name, *enrollment):
+                    submissions.enqueue(schema_name, str(uuid.uuid4()), *enrollment)
+
+                @contextmanager
+                def connection():
+                    yield conn
+
+                submissions.start(postgres_writer(connection))
+                started = time.perf_counter()
+                report("queued", time_writes(conn, schema_name, enqueue, args.count))
+                while submissions.stats()["pending"]:
+                    time.sleep(0.01)
+                print(f"{'':<12} queue drained {(time.perf_counter() - started) * 1000:.0f} ms after the first submit")
+                submissions.stop()
+    finally:
+        with psycopg.connect(args.conninfo, autocommit=True) as admin:
+            admin.execute(f'DROP SCHEMA "{schema_name}" CASCADE')
+
+
+if __name__ == "__main__":
+    main()
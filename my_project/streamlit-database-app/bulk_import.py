@@ -0,0 +1,208 @@
+import argparse
+import os
+import time
+
+from psycopg import sql
+
+from enrollments import ATTESTATION_TEXT
+from query_cache import notify_change
+from validation import validate_batch
+
+# Roster columns, in staging-table order
+PROVIDER_COLUMNS = [
+    "authorized_signatory_name", "title", "organization_name", "email_address",
+    "alternate_email_address", "phone_number", "ptan", "npi", "tax_id", "organization_type",
+]
+VENDOR_COLUMNS = [
+    "vendor_clearinghouse_name", "vendor_contact_name", "vendor_contact_email",
+    "vendor_contact_phone", "effective_date", "termination_date",
+    "offshore_data_sharing_consent", "relationship_status",
+]
+IMPORT_COLUMNS = PROVIDER_COLUMNS + VENDOR_COLUMNS + ["attested_by"]
+REQUIRED_COLUMNS = [
+    "authorized_signatory_name", "title", "organization_name", "email_address",
+    "phone_number", "ptan", "npi", "tax_id", "organization_type",
+    "vendor_clearinghouse_name", "effective_date", "attested_by",
+]
+TRUE_VALUES = {"true", "yes", "y", "1", "x"}
+BULK_IP_ADDRESS = "bulk-import"
+
+
+def read_roster(file, filename):
+    """Read a CSV or Excel (.xlsx) roster into a DataFrame of strings."""
+    # Imported here so the app renders its first page without loading pandas
+    import pandas as pd
+
+    if filename.lower().endswith(".xlsx"):
+        df = pd.read_excel(file, dtype=str, keep_default_na=False)
+    else:
+        df = pd.read_csv(file, dtype=str, keep_default_na=False)
+    df.columns = [str(c).strip().lower() for c in df.columns]
+    return df
+
+
+def validate_rows(df):
+    """Validate every roster row in one vectorized pass.
+
+    Returns ``(rows, errors)``: ``rows`` holds one tuple per valid record in
+    ``IMPORT_COLUMNS`` order with dates and booleans parsed, and ``errors``
+    holds ``(row_number, field, code, message)`` tuples, numbered as in a
+    spreadsheet (the header is row 1).
+    """
+    import pandas as pd
+
+    missing = [c for c in REQUIRED_COLUMNS if c not in df.columns]
+    if missing:
+        return [], [(1, None, 'missing_columns', f"Missing required columns: {', '.join(missing)}")]
+    df = df.reindex(columns=IMPORT_COLUMNS, fill_value="").reset_index(drop=True)
+    df = df.apply(lambda column: column.astype("string").fillna("").str.strip())
+    df["relationship_status"] = df["relationship_status"].mask(df["relationship_status"] == "", "Active")
+
+    found = validate_batch(df)
+    errors = list(zip((found["row"] + 2).tolist(), found["field"].tolist(),
+                      found["code"].tolist(), found["message"].tolist()))
+
+    # Each NPI+PTAN may appear once per roster
+    duplicated = df.duplicated(["npi", "ptan"])
+    if duplicated.any():
+        first_row = df.reset_index().groupby(["npi", "ptan"], sort=False)["index"].transform("min")
+        for index in df.index[duplicated].tolist():
+            errors.append((index + 2, "ptan", "duplicate_npi_ptan",
+                           f"Duplicate NPI/PTAN (first seen on row {first_row[index] + 2})"))
+        errors.sort(key=lambda e: e[0])
+
+    valid = df.drop(index=sorted({row_number - 2 for row_number, *_ in errors}))
+    columns = {}
+    for column in IMPORT_COLUMNS:
+        values = valid[column]
+        if column in ("effective_date", "termination_date"):
+            parsed = pd.to_datetime(values.str.slice(0, 10), format="%Y-%m-%d", errors="coerce")
+            columns[column] = [d.date() if pd.notna(d) else None for d in parsed]
+        elif column == "offshore_data_sharing_consent":
+            columns[column] = values.str.lower().isin(TRUE_VALUES).tolist()
+        else:
+            columns[column] = [v or None for v in values.tolist()]
+    rows = list(zip(*(columns[c] for c in IMPORT_COLUMNS)))
+    return rows, errors
+
+
+def load_enrollments(conn, schema_name, rows):
+    """Load validated rows into the four hets_* tables.
+
+    Rows are COPYed into a temporary staging table whose ids are drawn from
+    the real tables' sequences, then inserted with one set-based statement
+    per table, all in a single transaction. Rows whose NPI+PTAN is already
+    enrolled, or gets enrolled while the import runs, are skipped. Returns ``(imported_count, skipped)`` where
+    ``skipped`` lists the ``(npi, ptan)`` pairs that already existed.
+    """
+    schema = sql.Identifier(schema_name)
+    columns = sql.SQL(", ").join(map(sql.Identifier, IMPORT_COLUMNS))
+    provider_columns = sql.SQL(", ").join(map(sql.Identifier, PROVIDER_COLUMNS))
+    vendor_columns = sql.SQL(", ").join(map(sql.Identifier, VENDOR_COLUMNS))
+
+    with conn.transaction():
+        with conn.cursor() as cur:
+            cur.execute(
+                "SELECT pg_get_serial_sequence(%s, 'provider_id'), pg_get_serial_sequence(%s, 'relationship_id')",
+                (sql.SQL("{}.hets_providers").format(schema).as_string(conn),
+                 sql.SQL("{}.hets_vendor_relationships").format(schema).as_string(conn))
+            )
+            provider_seq, relationship_seq = cur.fetchone()
+            cur.execute(sql.SQL("""
+                CREATE TEMP TABLE hets_import_staging (
+                    provider_id INTEGER NOT NULL DEFAULT nextval({}),
+                    relationship_id INTEGER NOT NULL DEFAULT nextval({}),
+                    authorized_signatory_name VARCHAR(255),
+                    title VARCHAR(100),
+                    organization_name VARCHAR(255),
+                    email_address VARCHAR(255),
+                    alternate_email_address VARCHAR(255),
+                    phone_number VARCHAR(20),
+                    ptan VARCHAR(50),
+                    npi VARCHAR(10),
+                    tax_id VARCHAR(20),
+                    organization_type VARCHAR(100),
+                    vendor_clearinghouse_name VARCHAR(255),
+                    vendor_contact_name VARCHAR(255),
+                    vendor_contact_email VARCHAR(255),
+                    vendor_contact_phone VARCHAR(20),
+                    effective_date DATE,
+                    termination_date DATE,
+                    offshore_data_sharing_consent BOOLEAN,
+                    relationship_status VARCHAR(50),
+                    attested_by VARCHAR(255)
+                ) ON COMMIT DROP
+            """).format(sql.Literal(provider_seq), sql.Literal(relationship_seq)))
+
+            with cur.copy(sql.SQL("COPY hets_import_staging ({}) FROM STDIN").format(columns)) as copy:
+                for row in rows:
+                    copy.write_row(row)
+
+            # ON CONFLICT rather than a prior existence check, so an enrollment
+            # committed by the form mid-import is skipped instead of aborting it
+            cur.execute(sql.SQL("""
+                WITH inserted AS (
+                    INSERT INTO {schema}.hets_providers (provider_id, {provider_columns})
+                    SELECT provider_id, {provider_columns} FROM hets_import_staging
+                    ON CONFLICT (npi, ptan) DO NOTHING
+                    RETURNING provider_id
+                )
+                DELETE FROM hets_import_staging s
+                WHERE NOT EXISTS (SELECT 1 FROM inserted i WHERE i.provider_id = s.provider_id)
+                RETURNING s.npi, s.ptan
+            """).format(schema=schema, provider_columns=provider_columns))
+            skipped = cur.fetchall()
+            count = len(rows) - len(skipped)
+            cur.execute(sql.SQL("""
+                INSERT INTO {schema}.hets_vendor_relationships (relationship_id, provider_id, {vendor_columns})
+                SELECT relationship_id, provider_id, {vendor_columns} FROM hets_import_staging
+            """).format(schema=schema, vendor_columns=vendor_columns))
+            cur.execute(sql.SQL("""
+                INSERT INTO {}.hets_attestations
+                (provider_id, relationship_id, template_id, attested_by, ip_address)
+                SELECT provider_id, relationship_id, t.template_id, attested_by, %s
+                FROM hets_import_staging, {}.attestation_template_id(%s) AS t(template_id)
+            """).format(schema, schema), (BULK_IP_ADDRESS, ATTESTATION_TEXT))
+            cur.execute(sql.SQL("""
+                INSERT INTO {}.hets_submission_history
+                (provider_id, submission_type, status, notes)
+                SELECT provider_id, 'EDI Enrollment', 'Submitted',
+                       'Bulk import enrollment submission for ' || organization_name
+                FROM hets_import_staging
+            """).format(schema))
+            notify_change(cur, schema_name)
+    return count, skipped
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import HETS EDI enrollments from a CSV or Excel roster.")
+    parser.add_argument("roster", help="Path to a .csv or .xlsx roster file")
+    parser.add_argument("--dry-run", action="store_true", help="Validate only; do not write to the database")
+    parser.add_argument("--allow-partial", action="store_true", help="Import valid rows even if some rows fail validation")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    rows, errors = validate_rows(read_roster(args.roster, os.path.basename(args.roster)))
+    invalid = len({row_number for row_number, *_ in errors})
+    print(f"Validated {len(rows) + invalid} rows in {time.perf_counter() - start:.2f}s: "
+          f"{len(rows)} valid, {invalid} with errors")
+    for row_number, field, code, message in errors:
+        print(f"  row {row_number}: [{code}] {message}")
+    if args.dry_run or not rows or (errors and not args.allow_partial):
+        raise SystemExit(1 if errors else 0)
+
+    import db
+    from migrations import ensure_schema
+
+    ensure_schema()
+    start = time.perf_counter()
+    with db.get_connection() as conn:
+        count, skipped = load_enrollments(conn, db.get_schema_name(), rows)
+    elapsed = time.perf_counter() - start
+    print(f"Imported {count} enrollments in {elapsed:.2f}s ({count / elapsed:,.0f} rows/s)")
+    for npi, ptan in skipped:
+        print(f"  skipped NPI {npi} / PTAN {ptan}: already enrolled")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+import threading
+import time
+
+import psycopg
+
+# Lakebase OAuth tokens are valid for an hour; refresh well before that so a
+# slow token endpoint never leaves new connections without a valid password.
+DEFAULT_REFRESH_INTERVAL = 900
+DEFAULT_REFRESH_MARGIN = 300
+
+
+def workspace_token_source(workspace_client):
+    """Build a token source backed by a Databricks workspace client."""
+    def fetch():
+        token = workspace_client.config.oauth_token()
+        expiry = getattr(token, "expiry", None)
+        return token.access_token, expiry.timestamp() if expiry else None
+    return fetch
+
+
+class OAuthCredentialProvider:
+    """Keep a fresh OAuth token available for new database connections.
+
+    ``token_source`` is a callable returning ``(access_token, expires_at)``,
+    where ``expires_at`` is a Unix timestamp or None. The token is refreshed
+    on a background thread ahead of expiry, so callers only ever read the
+    cached value and never wait on the token endpoint after the first fetch.
+    """
+
+    def __init__(self, token_source, refresh_interval=DEFAULT_REFRESH_INTERVAL,
+                 refresh_margin=DEFAULT_REFRESH_MARGIN, retry_interval=10):
+        self._token_source = token_source
+        self._refresh_interval = refresh_interval
+        self._refresh_margin = refresh_margin
+        self._retry_interval = retry_interval
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._token = None
+        self._expires_at = None
+        self.last_refresh = 0
+        self.last_refresh_seconds = 0.0
+        self.refresh_count = 0
+        self.refresh_failures = 0
+
+    def get_password(self):
+        """Return the current token, fetching it synchronously only once."""
+        if self._token is None:
+            with self._lock:
+                if self._token is None:
+                    self.refresh()
+        return self._token
+
+    def refresh(self):
+        """Fetch a new token from the token source."""
+        print("Refreshing PostgreSQL OAuth token")
+        start = time.perf_counter()
+        token, expires_at = self._token_source()
+        self._token, self._expires_at = token, expires_at
+        self.last_refresh = time.time()
+        self.last_refresh_seconds = time.perf_counter() - start
+        self.refresh_count += 1
+
+    def seconds_until_refresh(self):
+        """Seconds until the background thread should fetch the next token."""
+        due = self.last_refresh + self._refresh_interval
+        if self._expires_at is not None:
+            due = min(due, self._expires_at - self._refresh_margin)
+            if due <= self.last_refresh:
+                # The token source handed out a token already inside the
+                # margin (the SDK returns its cached token until shortly
+                # before expiry); ask again after a back-off, not at once.
+                due = self.last_refresh + self._retry_interval
+        return max(due - time.time(), 0)
+
+    def start(self):
+        """Start the background refresh thread (idempotent)."""
+        self.get_password()
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._run, name="oauth-token-refresh", daemon=True
+            )
+            self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop the background refresh thread."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.seconds_until_refresh()):
+            try:
+                self.refresh()
+            except Exception as e:
+                self.refresh_failures += 1
+                # Keep serving the current token; it is still valid until
+                # expiry and the next attempt comes after a short back-off.
+                print(f"OAuth token refresh failed, retrying: {e}")
+                self._stop.wait(self._retry_interval)
+
+
+def connection_class(provider):
+    """Return a connection class that opens every connection with the current token.
+
+    The pool calls ``connect()`` whenever it grows or replaces a connection,
+    so new connections pick up a rotated token while existing ones keep
+    working until the pool retires them at ``max_lifetime``.
+    """
+    class TokenConnection(psycopg.Connection):
+        @classmethod
+        def connect(cls, conninfo="", **kwargs):
+            kwargs["password"] = provider.get_password()
+            return super().connect(conninfo, **kwargs)
+
+    return TokenConnection
+
+
+def async_connection_class(provider):
+    """Async counterpart of ``connection_class`` for ``AsyncConnectionPool``."""
+    class TokenAsyncConnection(psycopg.AsyncConnection):
+        @classmethod
+        async def connect(cls, conninfo="", **kwargs):
+            kwargs["password"] = provider.get_password()
+            return await super().connect(conninfo, **kwargs)
+
+    return TokenAsyncConnection
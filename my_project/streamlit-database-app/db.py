@@ -0,0 +1,229 @@
+import os
+import threading
+from contextlib import ExitStack, contextmanager
+
+from psycopg_pool import AsyncConnectionPool, ConnectionPool
+
+from credentials import (
+    OAuthCredentialProvider, async_connection_class, connection_class, workspace_token_source
+)
+from db_metrics import instrument, instrument_async
+
+# Streamlit re-executes app.py on every rerun, so process-wide state such as
+# the pool and the credential provider lives in this imported module instead.
+# Size the pool with HETS_POOL_MIN_SIZE / HETS_POOL_MAX_SIZE; measure a
+# setting with benchmarks/load_bench.py before changing it.
+POOL_MIN_SIZE = int(os.getenv("HETS_POOL_MIN_SIZE", "2"))
+POOL_MAX_SIZE = int(os.getenv("HETS_POOL_MAX_SIZE", "10"))
+# Connections are retired (with the pool's built-in jitter) well within the
+# token lifetime, so a rotation replaces them gradually instead of all at once.
+POOL_MAX_LIFETIME = 1800
+# Setting REPLICA_PGHOST adds a read-only pool (e.g. a Lakebase readable
+# secondary) for queries that can be served from a replica; the other
+# REPLICA_PG* variables default to the primary's PG* values.
+REPLICA_ENV_PREFIX = "REPLICA_"
+
+_lock = threading.Lock()
+credential_provider = None
+connection_pool = None
+read_pool = None
+pools_created = 0
+# Every read must see WAL up to _required_lsn: the last write this process
+# made or was notified of. The replica is known to have replayed _replayed_lsn.
+_lsn_lock = threading.Lock()
+_required_lsn = 0
+_replayed_lsn = 0
+read_fallbacks = 0
+
+
+def get_credential_provider():
+    """Get or create the OAuth credential provider."""
+    global credential_provider
+    if credential_provider is None:
+        # The SDK takes over a second to import; only pay for it when connecting
+        from databricks import sdk
+
+        with _lock:
+            if credential_provider is None:
+                token_source = workspace_token_source(sdk.WorkspaceClient())
+                credential_provider = OAuthCredentialProvider(token_source).start()
+    return credential_provider
+
+
+def get_conninfo(prefix=""):
+    """Build the connection string from the PG* environment variables.
+
+    With a ``prefix``, ``{prefix}PGHOST`` and so on take precedence.
+    """
+    def env(name, default=None):
+        return os.getenv(prefix + name) or os.getenv(name, default)
+
+    return (
+        f"dbname={env('PGDATABASE')} "
+        f"user={env('PGUSER')} "
+        f"host={env('PGHOST')} "
+        f"port={env('PGPORT')} "
+        f"sslmode={env('PGSSLMODE', 'require')} "
+        f"application_name={env('PGAPPNAME')}"
+    )
+
+
+def get_replica_conninfo():
+    """Connection string of the read replica, or None when none is configured."""
+    if not os.getenv(REPLICA_ENV_PREFIX + "PGHOST"):
+        return None
+    return get_conninfo(REPLICA_ENV_PREFIX)
+
+
+def create_pool(conninfo, provider, min_size=POOL_MIN_SIZE, max_size=POOL_MAX_SIZE,
+                max_lifetime=POOL_MAX_LIFETIME, **kwargs):
+    """Create a pool whose new connections authenticate with the provider's token.
+
+    Every statement on its connections is timed (see ``db_metrics``).
+    """
+    kwargs.setdefault("open", True)
+    kwargs.setdefault("configure", instrument)
+    return ConnectionPool(
+        conninfo,
+        connection_class=connection_class(provider),
+        min_size=min_size,
+        max_size=max_size,
+        max_lifetime=max_lifetime,
+        **kwargs
+    )
+
+
+def create_async_pool(conninfo, provider, min_size=POOL_MIN_SIZE, max_size=POOL_MAX_SIZE,
+                      max_lifetime=POOL_MAX_LIFETIME, **kwargs):
+    """Async variant of ``create_pool``; open it with ``await pool.open()``."""
+    kwargs.setdefault("open", False)
+    kwargs.setdefault("configure", instrument_async)
+    return AsyncConnectionPool(
+        conninfo,
+        connection_class=async_connection_class(provider),
+        min_size=min_size,
+        max_size=max_size,
+        max_lifetime=max_lifetime,
+        **kwargs
+    )
+
+
+def get_connection_pool():
+    """Get or create the connection pool."""
+    global connection_pool, pools_created
+    if connection_pool is None:
+        provider = get_credential_provider()
+        with _lock:
+            if connection_pool is None:
+                connection_pool = create_pool(get_conninfo(), provider)
+                pools_created += 1
+    return connection_pool
+
+
+def get_read_pool():
+    """Get or create the read-only pool; None when no replica is configured."""
+    global read_pool, pools_created
+    if read_pool is None:
+        conninfo = get_replica_conninfo()
+        if conninfo is None:
+            return None
+        provider = get_credential_provider()
+        with _lock:
+            if read_pool is None:
+                read_pool = create_pool(conninfo, provider)
+                pools_created += 1
+    return read_pool
+
+
+def warm_pools(timeout=30):
+    """Create the pools, wait for their minimum connections and validate them.
+
+    Connections that fail a check are replaced before the first request
+    checks them out.
+    """
+    for pool in (get_connection_pool(), get_read_pool()):
+        if pool is not None:
+            pool.wait(timeout)
+            pool.check()
+
+
+def get_pools():
+    """The open pools by name, for metrics."""
+    pools = {"primary": connection_pool, "replica": read_pool}
+    return {name: pool for name, pool in pools.items() if pool is not None}
+
+
+def get_connection():
+    """Get a connection from the pool."""
+    return get_connection_pool().connection()
+
+
+def lsn_value(lsn):
+    """A pg_lsn such as ``16/B374D848`` as an integer."""
+    high, low = lsn.split("/")
+    return (int(high, 16) << 32) | int(low, 16)
+
+
+def record_write(conn=None):
+    """Make later reads see everything committed on the primary so far.
+
+    Call it after a write commits, with the writing connection, and when
+    another process reports a write. A no-op without a read replica.
+    """
+    global _required_lsn
+    if get_read_pool() is None:
+        return
+    with ExitStack() as stack:
+        if conn is None:
+            conn = stack.enter_context(get_connection())
+        lsn = lsn_value(conn.execute("SELECT pg_current_wal_lsn()::text").fetchone()[0])
+    with _lsn_lock:
+        _required_lsn = max(_required_lsn, lsn)
+
+
+def _replica_has_replayed(conn, required):
+    """Whether the replica behind ``conn`` has replayed the WAL up to ``required``."""
+    global _replayed_lsn
+    if required <= _replayed_lsn:
+        return True
+    replayed = conn.execute("SELECT pg_last_wal_replay_lsn()::text").fetchone()[0]
+    # NULL: not a standby, so never behind
+    replayed = required if replayed is None else lsn_value(replayed)
+    with _lsn_lock:
+        _replayed_lsn = max(_replayed_lsn, replayed)
+    return replayed >= required
+
+
+@contextmanager
+def get_read_connection():
+    """Get a connection for read-only queries.
+
+    It comes from the read pool when a replica is configured and has
+    replayed every write this process made or was notified of (see
+    ``record_write``), so sessions always read their own submissions;
+    otherwise it comes from the primary pool.
+    """
+    global read_fallbacks
+    pool = get_read_pool()
+    with ExitStack() as stack:
+        if pool is None:
+            conn = stack.enter_context(get_connection())
+        else:
+            conn = stack.enter_context(pool.connection())
+            if not _replica_has_replayed(conn, _required_lsn):
+                stack.close()
+                read_fallbacks += 1
+                conn = stack.enter_context(get_connection())
+        yield conn
+
+
+def connect(**kwargs):
+    """Open a dedicated connection outside the pool (e.g. for LISTEN)."""
+    return connection_class(get_credential_provider()).connect(get_conninfo(), **kwargs)
+
+
+def get_schema_name():
+    """Get the schema name in the format {PGAPPNAME}_schema_{PGUSER}."""
+    pgappname = os.getenv("PGAPPNAME", "my_app")
+    pguser = os.getenv("PGUSER", "").replace('-', '')
+    return f"{pgappname}_schema_{pguser}"
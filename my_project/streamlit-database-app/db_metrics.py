@@ -0,0 +1,271 @@
+"""Timing, row counts and pool statistics for database calls.
+
+Operations (one app-level call such as listing a page of enrollments) are
+timed with ``db_metrics.track(name)``. Every statement run on a pooled
+connection is timed by the cursor classes that ``db.create_pool`` installs,
+attributed to the enclosing operation, and logged with its SQL text when it
+takes longer than ``HETS_SLOW_QUERY_MS``. ``render_prometheus`` exposes the
+counters, pool statistics and token refreshes in the Prometheus text format.
+"""
+import contextvars
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+
+import psycopg
+
+SLOW_QUERY_MS = float(os.getenv("HETS_SLOW_QUERY_MS", "500"))
+SLOW_QUERY_LOG_SIZE = 50
+# Upper bounds (seconds) of the operation latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# psycopg_pool counters exported as Prometheus counters; name -> (stats key, scale)
+POOL_COUNTERS = {
+    "requests": ("requests_num", 1),
+    "requests_queued": ("requests_queued", 1),
+    "wait_seconds": ("requests_wait_ms", 0.001),
+    "timeouts": ("requests_errors", 1),
+    "connections_opened": ("connections_num", 1),
+    "connection_errors": ("connections_errors", 1),
+    "connections_lost": ("connections_lost", 1),
+    "returns_bad": ("returns_bad", 1),
+}
+
+_operation = contextvars.ContextVar("hets_db_operation", default="other")
+
+
+class _Timer:
+    def __init__(self):
+        self.rows = None
+
+
+class DbMetrics:
+    """Thread-safe counters for database operations and statements."""
+
+    def __init__(self, slow_query_ms=SLOW_QUERY_MS, buckets=LATENCY_BUCKETS, log_size=SLOW_QUERY_LOG_SIZE):
+        self.slow_query_ms = slow_query_ms
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._operations = {}
+        self._statements = {}
+        self._slow_queries = deque(maxlen=log_size)
+
+    @contextmanager
+    def track(self, operation):
+        """Time the enclosed block as ``operation``; set ``.rows`` on the yielded timer to count rows."""
+        timer = _Timer()
+        token = _operation.set(operation)
+        start = time.perf_counter()
+        error = True
+        try:
+            yield timer
+            error = False
+        finally:
+            _operation.reset(token)
+            self.observe(operation, time.perf_counter() - start, timer.rows, error)
+
+    def observe(self, operation, seconds, rows=None, error=False):
+        with self._lock:
+            entry = self._operations.get(operation)
+            if entry is None:
+                entry = self._operations[operation] = {
+                    "calls": 0, "errors": 0, "rows": 0, "seconds": 0.0, "max_seconds": 0.0,
+                    "buckets": [0] * len(self.buckets),
+                }
+            entry["calls"] += 1
+            entry["errors"] += error
+            entry["rows"] += rows or 0
+            entry["seconds"] += seconds
+            entry["max_seconds"] = max(entry["max_seconds"], seconds)
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    entry["buckets"][i] += 1
+                    break
+
+    def observe_statement(self, cursor, query, seconds, error):
+        """Count a statement against the current operation and log it if slow."""
+        operation = _operation.get()
+        rows = cursor.rowcount if not error and cursor.rowcount > 0 else 0
+        slow = seconds * 1000 >= self.slow_query_ms
+        with self._lock:
+            entry = self._statements.setdefault(
+                operation, {"statements": 0, "errors": 0, "rows": 0, "seconds": 0.0, "slow": 0}
+            )
+            entry["statements"] += 1
+            entry["errors"] += error
+            entry["rows"] += rows
+            entry["seconds"] += seconds
+            entry["slow"] += slow
+        if slow:
+            sql_text = query if isinstance(query, (str, bytes)) else query.as_string(cursor.connection)
+            if isinstance(sql_text, bytes):
+                sql_text = sql_text.decode(errors="replace")
+            sql_text = " ".join(sql_text.split())
+            self._slow_queries.append({
+                "at": datetime.now(), "operation": operation, "ms": round(seconds * 1000, 1),
+                "rows": rows, "sql": sql_text,
+            })
+            print(f"Slow query ({seconds * 1000:.0f} ms, {operation}): {sql_text}")
+
+    def operations(self):
+        with self._lock:
+            return {name: {**entry, "buckets": list(entry["buckets"])} for name, entry in self._operations.items()}
+
+    def statements(self):
+        with self._lock:
+            return {name: dict(entry) for name, entry in self._statements.items()}
+
+    def slow_queries(self):
+        """The most recent slow statements, newest first."""
+        return list(reversed(self._slow_queries))
+
+
+# Shared by every session in this process
+db_metrics = DbMetrics()
+
+
+class _TimedExecute:
+    def execute(self, query, params=None, **kwargs):
+        start = time.perf_counter()
+        error = True
+        try:
+            result = super().execute(query, params, **kwargs)
+            error = False
+            return result
+        finally:
+            db_metrics.observe_statement(self, query, time.perf_counter() - start, error)
+
+
+class _AsyncTimedExecute:
+    async def execute(self, query, params=None, **kwargs):
+        start = time.perf_counter()
+        error = True
+        try:
+            result = await super().execute(query, params, **kwargs)
+            error = False
+            return result
+        finally:
+            db_metrics.observe_statement(self, query, time.perf_counter() - start, error)
+
+
+class TimedCursor(_TimedExecute, psycopg.Cursor):
+    pass
+
+
+class TimedServerCursor(_TimedExecute, psycopg.ServerCursor):
+    pass
+
+
+class AsyncTimedCursor(_AsyncTimedExecute, psycopg.AsyncCursor):
+    pass
+
+
+class AsyncTimedServerCursor(_AsyncTimedExecute, psycopg.AsyncServerCursor):
+    pass
+
+
+def instrument(conn):
+    """Pool ``configure`` callback: time every statement run on ``conn``."""
+    conn.cursor_factory, conn.server_cursor_factory = TimedCursor, TimedServerCursor
+
+
+async def instrument_async(conn):
+    conn.cursor_factory, conn.server_cursor_factory = AsyncTimedCursor, AsyncTimedServerCursor
+
+
+def pool_stats(pool):
+    """The pool's statistics with the active connection count and saturation.
+
+    Saturation is connections in use plus requests waiting for one, over the
+    pool's maximum size: above 1, requests queue.
+    """
+    stats = pool.get_stats()
+    stats["pool_active"] = stats.get("pool_size", 0) - stats.get("pool_available", 0)
+    stats["saturation"] = (stats["pool_active"] + stats.get("requests_waiting", 0)) / stats["pool_max"]
+    return stats
+
+
+def _labels(**labels):
+    return "{" + ",".join(f'{key}="{value}"' for key, value in labels.items()) + "}"
+
+
+def render_prometheus(metrics=db_metrics, pools=None, pools_created=None, read_fallbacks=None,
+                      credential_provider=None, cache=None):
+    """Prometheus text exposition of ``metrics``, the named ``pools`` and the token and cache state."""
+    lines = []
+
+    def metric(name, kind, help_text, samples):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        lines.extend(f"{name}{labels} {value}" for labels, value in samples)
+
+    operations = metrics.operations()
+    histogram = []
+    for name, entry in sorted(operations.items()):
+        cumulative = 0
+        for bound, count in zip(metrics.buckets, entry["buckets"]):
+            cumulative += count
+            histogram.append((f"_bucket{_labels(operation=name, le=bound)}", cumulative))
+        histogram.append((f"_bucket{_labels(operation=name, le='+Inf')}", entry["calls"]))
+        histogram.append((f"_sum{_labels(operation=name)}", entry["seconds"]))
+        histogram.append((f"_count{_labels(operation=name)}", entry["calls"]))
+    lines.append("# HELP hets_db_operation_seconds Time spent in database operations")
+    lines.append("# TYPE hets_db_operation_seconds histogram")
+    lines.extend(f"hets_db_operation_seconds{suffix} {value}" for suffix, value in histogram)
+    metric("hets_db_operation_errors_total", "counter", "Database operations that raised",
+           [(_labels(operation=n), e["errors"]) for n, e in sorted(operations.items())])
+    metric("hets_db_operation_rows_total", "counter", "Rows returned or written by database operations",
+           [(_labels(operation=n), e["rows"]) for n, e in sorted(operations.items())])
+
+    statements = sorted(metrics.statements().items())
+    metric("hets_db_statements_total", "counter", "SQL statements executed",
+           [(_labels(operation=n), e["statements"]) for n, e in statements])
+    metric("hets_db_statement_seconds_total", "counter", "Time spent executing SQL statements",
+           [(_labels(operation=n), e["seconds"]) for n, e in statements])
+    metric("hets_db_statement_errors_total", "counter", "SQL statements that failed",
+           [(_labels(operation=n), e["errors"]) for n, e in statements])
+    metric("hets_db_slow_statements_total", "counter",
+           f"SQL statements slower than {metrics.slow_query_ms:g} ms",
+           [(_labels(operation=n), e["slow"]) for n, e in statements])
+
+    pools = {name: pool_stats(pool) for name, pool in (pools or {}).items()}
+    metric("hets_db_pool_connections", "gauge", "Open pool connections by state",
+           [(_labels(pool=name, state=state), stats.get(key, 0))
+            for name, stats in pools.items()
+            for state, key in (("active", "pool_active"), ("idle", "pool_available"))])
+    metric("hets_db_pool_max_size", "gauge", "Maximum connections per pool",
+           [(_labels(pool=name), stats.get("pool_max", 0)) for name, stats in pools.items()])
+    metric("hets_db_pool_requests_waiting", "gauge", "Requests currently waiting for a connection",
+           [(_labels(pool=name), stats.get("requests_waiting", 0)) for name, stats in pools.items()])
+    metric("hets_db_pool_saturation", "gauge", "Connections in use plus waiting requests over the maximum size",
+           [(_labels(pool=name), stats["saturation"]) for name, stats in pools.items()])
+    for counter, (key, scale) in POOL_COUNTERS.items():
+        metric(f"hets_db_pool_{counter}_total", "counter", f"psycopg_pool {key}",
+               [(_labels(pool=name), stats.get(key, 0) * scale) for name, stats in pools.items()])
+    if pools_created is not None:
+        metric("hets_db_pools_created_total", "counter", "Connection pools created by this process",
+               [("", pools_created)])
+    if read_fallbacks is not None:
+        metric("hets_db_read_fallbacks_total", "counter",
+               "Reads sent to the primary because the replica had not replayed a recent write",
+               [("", read_fallbacks)])
+
+    if credential_provider is not None:
+        metric("hets_db_token_refreshes_total", "counter", "OAuth token refreshes",
+               [("", credential_provider.refresh_count)])
+        metric("hets_db_token_refresh_failures_total", "counter", "Failed OAuth token refreshes",
+               [("", credential_provider.refresh_failures)])
+        metric("hets_db_token_refresh_seconds", "gauge", "Duration of the last OAuth token refresh",
+               [("", credential_provider.last_refresh_seconds)])
+        metric("hets_db_token_age_seconds", "gauge", "Seconds since the OAuth token was refreshed",
+               [("", time.time() - credential_provider.last_refresh)])
+
+    if cache is not None:
+        stats = cache.stats()
+        for key in ("hits", "misses", "invalidations"):
+            metric(f"hets_query_cache_{key}_total", "counter", f"Query cache {key}", [("", stats[key])])
+        metric("hets_query_cache_entries", "gauge", "Entries in the query cache", [("", stats["entries"])])
+
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,401 @@
+import re
+from datetime import timedelta
+
+from psycopg import errors, sql
+from psycopg.rows import dict_row
+
+from query_cache import CHANGE_CHANNEL
+
+DEFAULT_PAGE_SIZE = 25
+IDEMPOTENCY_CONSTRAINT = "pk_submission_keys"
+SEARCH_LIMIT = 10
+MAX_SEARCH_LIMIT = 50
+# Best-ranked matches kept from each table before they are merged per
+# provider; every match is still ranked, so short, common prefixes cost a
+# scan of all their matches
+SEARCH_CANDIDATES = 500
+
+# Attestation statement shown on the form and recorded with every enrollment
+ATTESTATION_TEXT = """
+            I hereby attest that:
+            
+            1. I am authorized to submit this HETS EDI enrollment on behalf of the organization listed above.
+            2. All information provided in this form is accurate and complete to the best of my knowledge.
+            3. I understand that this enrollment is subject to CMS verification and approval.
+            4. I agree to notify CMS of any changes to the information provided within 30 days.
+            5. I acknowledge that providing false information may result in termination of HETS access and potential legal consequences.
+            6. I have read and agree to comply with all HIPAA regulations and CMS requirements for EDI transactions.
+            """
+
+# Columns shown in the enrollment grid, in result-tuple order
+ENROLLMENT_COLUMNS = [
+    "provider_id",
+    "authorized_signatory_name",
+    "organization_name",
+    "email_address",
+    "ptan",
+    "npi",
+    "vendor_clearinghouse_name",
+    "effective_date",
+    "relationship_status",
+    "created_at",
+]
+
+ENROLLMENT_SELECT = """
+    SELECT
+        p.provider_id,
+        p.authorized_signatory_name,
+        p.organization_name,
+        p.email_address,
+        p.ptan,
+        p.npi,
+        v.vendor_clearinghouse_name,
+        v.effective_date,
+        v.relationship_status,
+        p.created_at
+"""
+
+
+def build_filters(filters):
+    """Translate grid filters into provider and vendor predicates.
+
+    ``filters`` may contain ``npi``, ``ptan``, ``statuses``, ``vendor``,
+    ``created_from`` and ``created_to`` (dates, inclusive). Returns
+    ``(provider_conditions, vendor_conditions)``, each a list of
+    ``(sql_fragment, params)`` pairs that the existing indexes can serve.
+    """
+    filters = filters or {}
+    provider_conditions, vendor_conditions = [], []
+    if filters.get("npi"):
+        provider_conditions.append((sql.SQL("p.npi = %s"), [filters["npi"].strip()]))
+    if filters.get("ptan"):
+        provider_conditions.append((sql.SQL("p.ptan = %s"), [filters["ptan"].strip()]))
+    if filters.get("created_from"):
+        provider_conditions.append((sql.SQL("p.created_at >= %s"), [filters["created_from"]]))
+    if filters.get("created_to"):
+        provider_conditions.append(
+            (sql.SQL("p.created_at < %s"), [filters["created_to"] + timedelta(days=1)])
+        )
+    if filters.get("statuses"):
+        vendor_conditions.append((sql.SQL("v.relationship_status = ANY(%s)"), [list(filters["statuses"])]))
+    if filters.get("vendor"):
+        vendor_conditions.append(
+            (sql.SQL("LOWER(v.vendor_clearinghouse_name) = LOWER(%s)"), [filters["vendor"].strip()])
+        )
+    return provider_conditions, vendor_conditions
+
+
+def filters_key(filters):
+    """Return a hashable key identifying a set of grid filters."""
+    return tuple(sorted((k, str(v)) for k, v in (filters or {}).items() if v))
+
+
+def _and(conditions):
+    return sql.SQL(" AND ").join(condition for condition, _ in conditions)
+
+
+def _params(conditions):
+    return [param for _, params in conditions for param in params]
+
+
+def list_enrollments_query(schema_name, page_size=DEFAULT_PAGE_SIZE, after=None, filters=None):
+    """Build the query behind ``list_enrollments``; returns ``(query, params)``."""
+    schema = sql.Identifier(schema_name)
+    provider_conditions, vendor_conditions = build_filters(filters)
+    if after is not None:
+        provider_conditions.append((sql.SQL("(p.created_at, p.provider_id) < (%s, %s)"), list(after)))
+    if vendor_conditions:
+        provider_conditions.append((
+            sql.SQL("EXISTS (SELECT 1 FROM {}.hets_vendor_relationships v "
+                    "WHERE v.provider_id = p.provider_id AND {})").format(schema, _and(vendor_conditions)),
+            _params(vendor_conditions)
+        ))
+    where = sql.SQL("WHERE {}").format(_and(provider_conditions)) if provider_conditions else sql.SQL("")
+    join_filter = sql.SQL(" AND {}").format(_and(vendor_conditions)) if vendor_conditions else sql.SQL("")
+    query = sql.SQL(ENROLLMENT_SELECT + """
+        FROM (
+            SELECT p.provider_id, p.authorized_signatory_name, p.organization_name,
+                   p.email_address, p.ptan, p.npi, p.created_at
+            FROM {schema}.hets_providers p
+            {where}
+            ORDER BY p.created_at DESC, p.provider_id DESC
+            LIMIT %s
+        ) p
+        LEFT JOIN {schema}.hets_vendor_relationships v
+            ON p.provider_id = v.provider_id{join_filter}
+        ORDER BY p.created_at DESC, p.provider_id DESC, v.relationship_id
+    """).format(schema=schema, where=where, join_filter=join_filter)
+    return query, _params(provider_conditions) + [page_size] + _params(vendor_conditions)
+
+
+def next_page_cursor(rows, page_size):
+    """Return the cursor of the page after ``rows``, or None if this was the last page."""
+    provider_ids = {row[0] for row in rows}
+    return (rows[-1][9], rows[-1][0]) if len(provider_ids) == page_size else None
+
+
+def list_enrollments(conn, schema_name, page_size=DEFAULT_PAGE_SIZE, after=None, filters=None):
+    """Return one page of enrollments, newest first, and the cursor of the next page.
+
+    ``after`` is the ``(created_at, provider_id)`` of the last provider on the
+    previous page (None for the first page). Pages are cut on providers, not
+    joined rows, so a provider with several vendors never straddles two pages.
+    Vendor filters restrict both which providers match and which of their
+    vendor rows are returned.
+    """
+    query, params = list_enrollments_query(schema_name, page_size, after, filters)
+    with conn.cursor() as cur:
+        cur.execute(query, params)
+        rows = cur.fetchall()
+    return rows, next_page_cursor(rows, page_size)
+
+
+ENROLLMENT_DETAIL_PROVIDER = """
+    SELECT p.provider_id, p.authorized_signatory_name, p.title, p.organization_name,
+           p.email_address, p.alternate_email_address, p.phone_number, p.ptan, p.npi,
+           p.tax_id, p.organization_type, p.created_at, p.updated_at,
+           s.total_submissions, s.last_submission_date
+    FROM {schema}.hets_providers p
+    LEFT JOIN {schema}.hets_provider_summary s ON s.provider_id = p.provider_id
+    WHERE p.provider_id = %s
+"""
+ENROLLMENT_DETAIL_VENDORS = """
+    SELECT relationship_id, vendor_clearinghouse_name, vendor_contact_name,
+           vendor_contact_email, vendor_contact_phone, effective_date,
+           termination_date, offshore_data_sharing_consent, relationship_status
+    FROM {schema}.hets_vendor_relationships
+    WHERE provider_id = %s
+    ORDER BY relationship_id
+"""
+ENROLLMENT_DETAIL_ATTESTATIONS = """
+    SELECT attestation_id, relationship_id, attested_by, attestation_date, submission_status
+    FROM {schema}.hets_attestations
+    WHERE provider_id = %s
+    ORDER BY attestation_date DESC
+"""
+
+
+def enrollment_detail_queries(schema_name):
+    """Return the provider, vendor and attestation queries behind ``get_enrollment_detail``."""
+    schema = sql.Identifier(schema_name)
+    return tuple(
+        sql.SQL(query).format(schema=schema)
+        for query in (ENROLLMENT_DETAIL_PROVIDER, ENROLLMENT_DETAIL_VENDORS, ENROLLMENT_DETAIL_ATTESTATIONS)
+    )
+
+
+def get_enrollment_detail(conn, schema_name, provider_id):
+    """Load the full record for one provider: provider fields, vendors and attestations."""
+    provider_query, vendors_query, attestations_query = enrollment_detail_queries(schema_name)
+    with conn.cursor(row_factory=dict_row) as cur:
+        cur.execute(provider_query, (provider_id,))
+        provider = cur.fetchone()
+        if provider is None:
+            return None
+        cur.execute(vendors_query, (provider_id,))
+        vendors = cur.fetchall()
+        cur.execute(attestations_query, (provider_id,))
+        attestations = cur.fetchall()
+    return {"provider": provider, "vendors": vendors, "attestations": attestations}
+
+
+INSERT_ENROLLMENT = """
+    WITH replay AS (
+        SELECT provider_id
+        FROM {schema}.hets_submission_keys
+        WHERE idempotency_key = %(idempotency_key)s
+    ), provider AS (
+        INSERT INTO {schema}.hets_providers
+        (authorized_signatory_name, title, organization_name, email_address,
+         alternate_email_address, phone_number, ptan, npi, tax_id, organization_type)
+        SELECT %(authorized_signatory_name)s, %(title)s, %(organization_name)s, %(email_address)s,
+               %(alternate_email_address)s, %(phone_number)s, %(ptan)s, %(npi)s, %(tax_id)s,
+               %(organization_type)s
+        WHERE NOT EXISTS (SELECT 1 FROM replay)
+        ON CONFLICT (npi, ptan) DO UPDATE SET
+            authorized_signatory_name = EXCLUDED.authorized_signatory_name,
+            title = EXCLUDED.title,
+            organization_name = EXCLUDED.organization_name,
+            email_address = EXCLUDED.email_address,
+            alternate_email_address = EXCLUDED.alternate_email_address,
+            phone_number = EXCLUDED.phone_number,
+            tax_id = EXCLUDED.tax_id,
+            organization_type = EXCLUDED.organization_type
+        RETURNING provider_id, (xmax = 0) AS created
+    ), submission_key AS (
+        INSERT INTO {schema}.hets_submission_keys (idempotency_key, provider_id)
+        SELECT %(idempotency_key)s, provider_id
+        FROM provider
+    ), vendor AS (
+        INSERT INTO {schema}.hets_vendor_relationships
+        (provider_id, vendor_clearinghouse_name, vendor_contact_name,
+         vendor_contact_email, vendor_contact_phone, effective_date,
+         termination_date, offshore_data_sharing_consent, relationship_status)
+        SELECT provider_id, %(vendor_clearinghouse_name)s, %(vendor_contact_name)s,
+               %(vendor_contact_email)s, %(vendor_contact_phone)s, %(effective_date)s,
+               %(termination_date)s, %(offshore_data_sharing_consent)s, %(relationship_status)s
+        FROM provider
+        RETURNING provider_id, relationship_id
+    ), attestation AS (
+        INSERT INTO {schema}.hets_attestations
+        (provider_id, relationship_id, template_id, attested_by, ip_address)
+        SELECT provider_id, relationship_id, {schema}.attestation_template_id(%(attestation_text)s),
+               %(attested_by)s, %(ip_address)s
+        FROM vendor
+    ), history AS (
+        INSERT INTO {schema}.hets_submission_history
+        (provider_id, submission_type, status, notes, idempotency_key)
+        SELECT provider_id,
+               CASE WHEN created THEN 'EDI Enrollment' ELSE 'Enrollment Update' END,
+               'Submitted',
+               CASE WHEN created THEN %(notes)s ELSE %(update_notes)s END,
+               %(idempotency_key)s
+        FROM provider
+    )
+    SELECT provider_id, CASE WHEN created THEN 'created' ELSE 'updated' END,
+           pg_notify(%(channel)s, %(schema_name)s)
+    FROM provider
+    UNION ALL
+    SELECT provider_id, 'replayed', NULL FROM replay
+"""
+
+
+def insert_enrollment_query(schema_name, provider_data, vendor_data, attestation_data, idempotency_key):
+    """Build the statement behind ``insert_enrollment``; returns ``(query, params)``."""
+    params = {
+        **provider_data,
+        **vendor_data,
+        **attestation_data,
+        'notes': f'Initial enrollment submission for {provider_data["organization_name"]}',
+        'update_notes': f'Enrollment update submission for {provider_data["organization_name"]}',
+        'idempotency_key': idempotency_key,
+        'channel': CHANGE_CHANNEL,
+        'schema_name': schema_name,
+    }
+    return sql.SQL(INSERT_ENROLLMENT).format(schema=sql.Identifier(schema_name)), params
+
+
+def replayed_enrollment_query(schema_name):
+    """Query returning ``(provider_id, 'replayed')`` for an already submitted idempotency key."""
+    return sql.SQL(
+        "SELECT provider_id, 'replayed' FROM {}.hets_submission_keys WHERE idempotency_key = %s"
+    ).format(sql.Identifier(schema_name))
+
+
+def is_concurrent_replay(error):
+    """True if a UniqueViolation means a concurrent replay of the same submission committed first."""
+    return error.diag.constraint_name == IDEMPOTENCY_CONSTRAINT
+
+
+def insert_enrollment(conn, schema_name, provider_data, vendor_data, attestation_data, idempotency_key):
+    """Write one enrollment in a single round trip and return ``(provider_id, outcome)``.
+
+    The inserts are chained in one data-modifying CTE and sent as a
+    server-side prepared statement. It runs as a single autocommit statement,
+    which is atomic on its own and avoids separate BEGIN/COMMIT round trips.
+    The change notification for other app replicas is part of the same
+    statement.
+
+    ``outcome`` is ``'created'`` for a new provider, ``'updated'`` when the
+    NPI+PTAN is already enrolled (the provider row is upserted and the new
+    vendor relationship and attestation are attached to it), or
+    ``'replayed'`` when ``idempotency_key`` was already submitted, in which
+    case nothing is written.
+    """
+    query, params = insert_enrollment_query(
+        schema_name, provider_data, vendor_data, attestation_data, idempotency_key
+    )
+    previous_autocommit = conn.autocommit
+    conn.autocommit = True
+    try:
+        row = conn.execute(query, params, prepare=True).fetchone()
+    except errors.UniqueViolation as e:
+        if not is_concurrent_replay(e):
+            raise
+        row = conn.execute(replayed_enrollment_query(schema_name), (idempotency_key,)).fetchone()
+    finally:
+        conn.autocommit = previous_autocommit
+    return row[0], row[1]
+
+
+def find_enrollment(conn, schema_name, npi, ptan):
+    """Return ``(provider_id, organization_name, created_at)`` for an enrolled NPI+PTAN, or None.
+
+    Served by the unique NPI+PTAN index.
+    """
+    return conn.execute(sql.SQL("""
+        SELECT provider_id, organization_name, created_at
+        FROM {}.hets_providers
+        WHERE npi = %s AND ptan = %s
+    """).format(sql.Identifier(schema_name)), (npi, ptan)).fetchone()
+
+
+SEARCH_COLUMNS = [
+    "provider_id",
+    "organization_name",
+    "authorized_signatory_name",
+    "npi",
+    "ptan",
+    "vendor_clearinghouse_name",
+    "rank",
+]
+
+SEARCH_PROVIDERS = """
+    WITH q AS (
+        SELECT to_tsquery('simple', %(query)s) AS query
+    ), matches AS (
+        (SELECT p.provider_id, NULL::varchar AS vendor_clearinghouse_name,
+                ts_rank(p.search_vector, q.query) AS rank
+         FROM {schema}.hets_providers p, q
+         WHERE p.search_vector @@ q.query
+         ORDER BY rank DESC, LENGTH(p.organization_name), p.provider_id
+         LIMIT %(candidates)s)
+        UNION ALL
+        (SELECT v.provider_id, v.vendor_clearinghouse_name,
+                ts_rank(v.search_vector, q.query) AS rank
+         FROM {schema}.hets_vendor_relationships v, q
+         WHERE v.search_vector @@ q.query
+         ORDER BY rank DESC, v.provider_id
+         LIMIT %(candidates)s)
+    ), best AS (
+        SELECT DISTINCT ON (provider_id) provider_id, vendor_clearinghouse_name, rank
+        FROM matches
+        ORDER BY provider_id, rank DESC
+    )
+    SELECT p.provider_id, p.organization_name, p.authorized_signatory_name, p.npi, p.ptan,
+           b.vendor_clearinghouse_name, b.rank
+    FROM best b
+    JOIN {schema}.hets_providers p ON p.provider_id = b.provider_id
+    ORDER BY b.rank DESC, LENGTH(p.organization_name), p.provider_id
+    LIMIT %(limit)s
+"""
+
+
+def search_terms(text):
+    """Turn free text into a prefix tsquery ("acme cli" -> "acme:* & cli:*"), or None."""
+    words = re.findall(r"\w+", text.lower())
+    return " & ".join(f"{word}:*" for word in words) or None
+
+
+def search_providers_query(schema_name, text, limit=SEARCH_LIMIT):
+    """Build the query behind ``search_providers``; returns ``(query, params)``, or None for blank text."""
+    terms = search_terms(text)
+    if terms is None:
+        return None
+    params = {'query': terms, 'candidates': SEARCH_CANDIDATES, 'limit': min(limit, MAX_SEARCH_LIMIT)}
+    return sql.SQL(SEARCH_PROVIDERS).format(schema=sql.Identifier(schema_name)), params
+
+
+def search_providers(conn, schema_name, text, limit=SEARCH_LIMIT):
+    """Typeahead search over organization, signatory and vendor names.
+
+    Every word of ``text`` must prefix-match a word of one of the names.
+    Returns up to ``limit`` rows in ``SEARCH_COLUMNS`` order, best match
+    first; ``vendor_clearinghouse_name`` is set when the provider matched
+    through a vendor relationship. Served by the GIN full-text indexes.
+    """
+    built = search_providers_query(schema_name, text, limit)
+    if built is None:
+        return []
+    return conn.execute(*built).fetchall()
+
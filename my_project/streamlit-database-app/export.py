@@ -0,0 +1,193 @@
+import argparse
+import resource
+import sys
+import time
+
+from psycopg import sql
+
+# Format -> (MIME type, file extension)
+EXPORT_FORMATS = {
+    "csv": ("text/csv", ".csv"),
+    "parquet": ("application/vnd.apache.parquet", ".parquet"),
+}
+EXPORT_VIEW = "v_complete_enrollments"
+EXPORT_ORDER = "provider_id, relationship_id, attestation_id"
+# Size of the blocks handed to the caller (CSV) and rows per Parquet row group
+CHUNK_BYTES = 1024 * 1024
+BATCH_ROWS = 20000
+# Postgres type name -> pyarrow type factory; anything else is exported as a string
+ARROW_TYPES = {
+    "int2": "int16",
+    "int4": "int32",
+    "int8": "int64",
+    "bool": "bool_",
+    "float4": "float32",
+    "float8": "float64",
+    "date": "date32",
+    "timestamp": "timestamp",
+    "timestamptz": "timestamp",
+}
+
+
+def export_query(schema_name):
+    """The rows of ``v_complete_enrollments`` in a stable order."""
+    return sql.SQL("SELECT * FROM {}.{} ORDER BY " + EXPORT_ORDER).format(
+        sql.Identifier(schema_name), sql.Identifier(EXPORT_VIEW)
+    )
+
+
+def copy_csv_query(schema_name):
+    """``COPY ... TO STDOUT`` of ``export_query`` as CSV with a header line."""
+    return sql.SQL("COPY ({}) TO STDOUT WITH (FORMAT csv, HEADER)").format(export_query(schema_name))
+
+
+def coalesce(blocks, size=CHUNK_BYTES, stats=None):
+    """Join the small blocks ``COPY`` returns into chunks of ``size`` bytes.
+
+    The server sends one block per row after the header line, which is how
+    ``stats["rows"]`` is counted.
+    """
+    pending, pending_size = [], 0
+    for index, block in enumerate(blocks):
+        if stats is not None:
+            stats["rows"] = index
+        pending.append(bytes(block))
+        pending_size += len(block)
+        if pending_size >= size:
+            yield b"".join(pending)
+            pending, pending_size = [], 0
+    if pending:
+        yield b"".join(pending)
+
+
+class _ChunkSink:
+    """Write-only file object for pyarrow that keeps written bytes until drained."""
+
+    closed = False
+
+    def __init__(self):
+        self.parts = []
+        self.position = 0
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def writable(self):
+        return True
+
+    def drain(self):
+        data = b"".join(self.parts)
+        self.parts.clear()
+        return data
+
+
+class ParquetEncoder:
+    """Encode batches of result rows as row groups of one Parquet file.
+
+    Built from a cursor's ``description`` and ``adapters``; ``encode`` returns
+    the bytes of each row group as it is written and ``finish`` the footer,
+    so only one batch is ever held in memory.
+    """
+
+    def __init__(self, description, adapters):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        fields = []
+        for column in description:
+            info = adapters.types.get(column.type_code)
+            factory = ARROW_TYPES.get(info.name if info else None)
+            if factory == "timestamp":
+                arrow_type = pa.timestamp("us")
+            elif factory:
+                arrow_type = getattr(pa, factory)()
+            else:
+                arrow_type = pa.string()
+            fields.append(pa.field(column.name, arrow_type))
+        self.pa = pa
+        self.schema = pa.schema(fields)
+        self.stringify = [f.type == pa.string() for f in fields]
+        self.sink = _ChunkSink()
+        self.writer = pq.ParquetWriter(pa.PythonFile(self.sink, mode="w"), self.schema, compression="zstd")
+
+    def encode(self, rows):
+        columns = [
+            self.pa.array([None if v is None else str(v) for v in values] if stringify else values, type=field.type)
+            for values, stringify, field in zip(zip(*rows), self.stringify, self.schema)
+        ]
+        self.writer.write_batch(self.pa.record_batch(columns, schema=self.schema))
+        return self.sink.drain()
+
+    def finish(self):
+        self.writer.close()
+        return self.sink.drain()
+
+
+def export_enrollments(conn, schema_name, fmt="csv", batch_rows=BATCH_ROWS, stats=None):
+    """Yield a full export of ``v_complete_enrollments`` as chunks of bytes.
+
+    CSV is streamed by ``COPY TO STDOUT``; Parquet is read through a named
+    server-side cursor ``batch_rows`` at a time, one row group per batch.
+    Memory stays bounded by one chunk or batch whatever the table size.
+    If given, ``stats["rows"]`` counts the rows exported so far.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format {fmt!r}")
+    with conn.transaction():
+        if fmt == "csv":
+            with conn.cursor() as cur, cur.copy(copy_csv_query(schema_name)) as copy:
+                yield from coalesce(copy, stats=stats)
+            return
+        with conn.cursor(name="hets_enrollments_export") as cur:
+            cur.execute(export_query(schema_name))
+            encoder = ParquetEncoder(cur.description, conn.adapters)
+            while rows := cur.fetchmany(batch_rows):
+                if stats is not None:
+                    stats["rows"] = stats.get("rows", 0) + len(rows)
+                yield encoder.encode(rows)
+            yield encoder.finish()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export all HETS EDI enrollments as CSV or Parquet.")
+    parser.add_argument("output", help="Output file, or - for stdout")
+    parser.add_argument("--format", choices=EXPORT_FORMATS,
+                        help="Export format (default: from the output file extension, else csv)")
+    parser.add_argument("--batch-rows", type=int, default=BATCH_ROWS, help="Rows per Parquet row group")
+    args = parser.parse_args()
+    fmt = args.format or ("parquet" if args.output.endswith(".parquet") else "csv")
+
+    import db
+    from migrations import ensure_schema
+
+    ensure_schema()
+    start = time.perf_counter()
+    stats, written = {"rows": 0}, 0
+    out = sys.stdout.buffer if args.output == "-" else open(args.output, "wb")
+    try:
+        with db.get_connection() as conn:
+            for chunk in export_enrollments(conn, db.get_schema_name(), fmt, args.batch_rows, stats):
+                out.write(chunk)
+                written += len(chunk)
+    finally:
+        if out is not sys.stdout.buffer:
+            out.close()
+    elapsed = time.perf_counter() - start
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"Exported {stats['rows']} rows ({written / 1e6:,.1f} MB of {fmt}) in {elapsed:.2f}s "
+          f"({stats['rows'] / elapsed:,.0f} rows/s, peak RSS {peak_mb:,.0f} MB)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
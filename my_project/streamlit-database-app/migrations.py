@@ -0,0 +1,110 @@
+import os
+import re
+import threading
+
+from psycopg import sql
+
+import db
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+SCHEMA_FILE = os.path.join(BASE_DIR, "schema.sql")
+MIGRATIONS_DIR = os.path.join(BASE_DIR, "migrations")
+MIGRATION_FILE_PATTERN = re.compile(r"^(\d+)_(\w+)\.sql$")
+
+_lock = threading.Lock()
+_migrated_schemas = set()
+
+
+def load_migrations():
+    """Return all migrations as (version, name, sql_text), ordered by version.
+
+    ``schema.sql`` is version 1; later changes live in ``migrations/`` as
+    ``NNNN_description.sql`` files.
+    """
+    with open(SCHEMA_FILE) as f:
+        migrations = [(1, "schema", f.read())]
+    if os.path.isdir(MIGRATIONS_DIR):
+        for filename in sorted(os.listdir(MIGRATIONS_DIR)):
+            match = MIGRATION_FILE_PATTERN.match(filename)
+            if match:
+                with open(os.path.join(MIGRATIONS_DIR, filename)) as f:
+                    migrations.append((int(match.group(1)), match.group(2), f.read()))
+    migrations.sort(key=lambda m: m[0])
+    versions = [m[0] for m in migrations]
+    if len(versions) != len(set(versions)):
+        raise ValueError(f"Duplicate schema migration versions: {versions}")
+    return migrations
+
+
+def render(sql_text, schema_name, conn):
+    """Substitute the quoted schema name for the {schema_name} placeholder."""
+    # str.format() would trip over regex quantifiers such as {2,} in schema.sql.
+    return sql_text.replace("{schema_name}", sql.Identifier(schema_name).as_string(conn))
+
+
+def migrate(conn, schema_name):
+    """Apply pending migrations to ``schema_name`` and return the applied versions.
+
+    A session-level advisory lock serialises concurrent app processes; each
+    migration runs in its own transaction together with its version row.
+    """
+    schema = sql.Identifier(schema_name)
+    lock_key = f"hets_schema_migrations:{schema_name}"
+    applied = []
+    previous_autocommit = conn.autocommit
+    conn.autocommit = True
+    try:
+        conn.execute("SELECT pg_advisory_lock(hashtext(%s))", (lock_key,))
+        try:
+            conn.execute(sql.SQL("CREATE SCHEMA IF NOT EXISTS {}").format(schema))
+            conn.execute(sql.SQL("""
+                CREATE TABLE IF NOT EXISTS {}.hets_schema_version (
+                    version INTEGER PRIMARY KEY,
+                    name VARCHAR(255) NOT NULL,
+                    applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """).format(schema))
+            current = {
+                row[0] for row in conn.execute(
+                    sql.SQL("SELECT version FROM {}.hets_schema_version").format(schema)
+                )
+            }
+            for version, name, sql_text in load_migrations():
+                if version in current:
+                    continue
+                print(f"Applying schema migration {version:04d}_{name} to {schema_name}")
+                with conn.transaction():
+                    conn.execute(render(sql_text, schema_name, conn))
+                    conn.execute(
+                        sql.SQL("INSERT INTO {}.hets_schema_version (version, name) VALUES (%s, %s)").format(schema),
+                        (version, name)
+                    )
+                applied.append(version)
+        finally:
+            conn.execute("SELECT pg_advisory_unlock(hashtext(%s))", (lock_key,))
+    finally:
+        conn.autocommit = previous_autocommit
+    return applied
+
+
+def ensure_schema(schema_name=None):
+    """Bring the schema up to date once per process.
+
+    After the first successful call this returns without touching the
+    database, so Streamlit reruns pay nothing for schema checks.
+    """
+    schema_name = schema_name or db.get_schema_name()
+    if schema_name in _migrated_schemas:
+        return []
+    with _lock:
+        if schema_name in _migrated_schemas:
+            return []
+        with db.get_connection() as conn:
+            applied = migrate(conn, schema_name)
+        _migrated_schemas.add(schema_name)
+        return applied
+
+
+if __name__ == "__main__":
+    applied = ensure_schema()
+    print(f"Applied migrations: {applied}" if applied else "Schema is up to date")
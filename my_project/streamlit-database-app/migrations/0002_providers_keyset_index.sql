@@ -0,0 +1,6 @@
+-- Keyset pagination orders providers by (created_at DESC, provider_id DESC);
+-- extend idx_providers_created_at with the tie-breaker so a page is a
+-- single index range scan with no sort.
+DROP INDEX IF EXISTS {schema_name}.idx_providers_created_at;
+CREATE INDEX idx_providers_created_at
+    ON {schema_name}.hets_providers(created_at DESC, provider_id DESC);
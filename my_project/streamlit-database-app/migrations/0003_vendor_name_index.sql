@@ -0,0 +1,3 @@
+-- The enrollment grid filters vendors case-insensitively by name.
+CREATE INDEX IF NOT EXISTS idx_vendor_relationships_vendor_name
+    ON {schema_name}.hets_vendor_relationships(LOWER(vendor_clearinghouse_name));
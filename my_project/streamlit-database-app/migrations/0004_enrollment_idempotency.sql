@@ -0,0 +1,31 @@
+-- Replayed or double-clicked form submissions used to create duplicate
+-- provider rows. Fold existing duplicates into the earliest provider with
+-- the same NPI+PTAN (keeping all their vendor, attestation and history
+-- rows) so that NPI+PTAN can be unique and enrollments can be upserted.
+CREATE TEMP TABLE provider_duplicates ON COMMIT DROP AS
+SELECT provider_id, keep_id
+FROM (
+    SELECT provider_id,
+           MIN(provider_id) OVER (PARTITION BY npi, ptan) AS keep_id
+    FROM {schema_name}.hets_providers
+    WHERE npi IS NOT NULL AND ptan IS NOT NULL
+) d
+WHERE provider_id <> keep_id;
+
+UPDATE {schema_name}.hets_vendor_relationships t SET provider_id = d.keep_id
+FROM provider_duplicates d WHERE t.provider_id = d.provider_id;
+UPDATE {schema_name}.hets_attestations t SET provider_id = d.keep_id
+FROM provider_duplicates d WHERE t.provider_id = d.provider_id;
+UPDATE {schema_name}.hets_submission_history t SET provider_id = d.keep_id
+FROM provider_duplicates d WHERE t.provider_id = d.provider_id;
+DELETE FROM {schema_name}.hets_providers p
+USING provider_duplicates d WHERE p.provider_id = d.provider_id;
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_providers_npi_ptan
+    ON {schema_name}.hets_providers(npi, ptan);
+
+-- One key per form submission; replays of the same key are no-ops.
+ALTER TABLE {schema_name}.hets_submission_history
+    ADD COLUMN IF NOT EXISTS idempotency_key UUID;
+CREATE UNIQUE INDEX IF NOT EXISTS uq_submission_history_idempotency_key
+    ON {schema_name}.hets_submission_history(idempotency_key);
@@ -0,0 +1,19 @@
+-- Typeahead search over organizations, signatories and vendors.
+-- Full-text vectors use the 'simple' configuration (no stemming or stop
+-- words), so every word of a name can be matched by prefix. Organization
+-- names outrank signatories (weight A vs B), which outrank vendors (C).
+ALTER TABLE {schema_name}.hets_providers
+    ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', COALESCE(organization_name, '')), 'A') ||
+        setweight(to_tsvector('simple', COALESCE(authorized_signatory_name, '')), 'B')
+    ) STORED;
+
+ALTER TABLE {schema_name}.hets_vendor_relationships
+    ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', COALESCE(vendor_clearinghouse_name, '')), 'C')
+    ) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_providers_search
+    ON {schema_name}.hets_providers USING GIN (search_vector);
+CREATE INDEX IF NOT EXISTS idx_vendor_relationships_search
+    ON {schema_name}.hets_vendor_relationships USING GIN (search_vector);
@@ -0,0 +1,258 @@
+-- v_submission_summary and get_provider_summary() used to join each provider
+-- to its submissions, vendors and attestations at once (rows = submissions x
+-- vendors x attestations) and count DISTINCT on every read. The counts now
+-- live in hets_provider_summary, one row per provider, kept current by
+-- statement-level triggers on every write path (form, API, bulk import):
+-- inserts apply deltas, updates and deletes recompute the affected providers.
+CREATE TABLE IF NOT EXISTS {schema_name}.hets_provider_summary (
+    provider_id INTEGER PRIMARY KEY,
+    total_submissions BIGINT NOT NULL DEFAULT 0,
+    last_submission_date TIMESTAMP,
+    vendor_count BIGINT NOT NULL DEFAULT 0,
+    active_relationships BIGINT NOT NULL DEFAULT 0,
+    attestation_count BIGINT NOT NULL DEFAULT 0,
+
+    CONSTRAINT fk_provider_summary_provider
+        FOREIGN KEY (provider_id)
+        REFERENCES {schema_name}.hets_providers(provider_id)
+        ON DELETE CASCADE
+);
+
+COMMENT ON TABLE {schema_name}.hets_provider_summary IS 'Per-provider submission, vendor and attestation counts, maintained by triggers';
+
+-- Function: Recompute the summary of the given providers from the base tables
+CREATE OR REPLACE FUNCTION {schema_name}.refresh_provider_summary(p_provider_ids INTEGER[])
+RETURNS BIGINT AS $$
+DECLARE
+    refreshed BIGINT;
+BEGIN
+    DELETE FROM {schema_name}.hets_provider_summary WHERE provider_id = ANY(p_provider_ids);
+    INSERT INTO {schema_name}.hets_provider_summary
+    (provider_id, total_submissions, last_submission_date, vendor_count, active_relationships, attestation_count)
+    SELECT p.provider_id,
+           COALESCE(sh.total_submissions, 0), sh.last_submission_date,
+           COALESCE(v.vendor_count, 0), COALESCE(v.active_relationships, 0),
+           COALESCE(a.attestation_count, 0)
+    FROM {schema_name}.hets_providers p
+    LEFT JOIN (
+        SELECT provider_id, COUNT(*) AS total_submissions, MAX(submission_date) AS last_submission_date
+        FROM {schema_name}.hets_submission_history
+        WHERE provider_id = ANY(p_provider_ids)
+        GROUP BY provider_id
+    ) sh ON sh.provider_id = p.provider_id
+    LEFT JOIN (
+        SELECT provider_id, COUNT(*) AS vendor_count,
+               COUNT(*) FILTER (WHERE relationship_status = 'Active') AS active_relationships
+        FROM {schema_name}.hets_vendor_relationships
+        WHERE provider_id = ANY(p_provider_ids)
+        GROUP BY provider_id
+    ) v ON v.provider_id = p.provider_id
+    LEFT JOIN (
+        SELECT provider_id, COUNT(*) AS attestation_count
+        FROM {schema_name}.hets_attestations
+        WHERE provider_id = ANY(p_provider_ids)
+        GROUP BY provider_id
+    ) a ON a.provider_id = p.provider_id
+    WHERE p.provider_id = ANY(p_provider_ids);
+    GET DIAGNOSTICS refreshed = ROW_COUNT;
+    RETURN refreshed;
+END;
+$$ LANGUAGE plpgsql;
+
+COMMENT ON FUNCTION {schema_name}.refresh_provider_summary IS 'Recompute hets_provider_summary for the given providers';
+
+-- Function: Rebuild the whole summary, blocking writers meanwhile
+CREATE OR REPLACE FUNCTION {schema_name}.rebuild_provider_summary()
+RETURNS BIGINT AS $$
+DECLARE
+    rebuilt BIGINT;
+BEGIN
+    LOCK TABLE {schema_name}.hets_providers, {schema_name}.hets_submission_history,
+               {schema_name}.hets_vendor_relationships, {schema_name}.hets_attestations
+        IN SHARE MODE;
+    DELETE FROM {schema_name}.hets_provider_summary;
+    INSERT INTO {schema_name}.hets_provider_summary
+    (provider_id, total_submissions, last_submission_date, vendor_count, active_relationships, attestation_count)
+    SELECT p.provider_id,
+           COALESCE(sh.total_submissions, 0), sh.last_submission_date,
+           COALESCE(v.vendor_count, 0), COALESCE(v.active_relationships, 0),
+           COALESCE(a.attestation_count, 0)
+    FROM {schema_name}.hets_providers p
+    LEFT JOIN (
+        SELECT provider_id, COUNT(*) AS total_submissions, MAX(submission_date) AS last_submission_date
+        FROM {schema_name}.hets_submission_history
+        GROUP BY provider_id
+    ) sh ON sh.provider_id = p.provider_id
+    LEFT JOIN (
+        SELECT provider_id, COUNT(*) AS vendor_count,
+               COUNT(*) FILTER (WHERE relationship_status = 'Active') AS active_relationships
+        FROM {schema_name}.hets_vendor_relationships
+        GROUP BY provider_id
+    ) v ON v.provider_id = p.provider_id
+    LEFT JOIN (
+        SELECT provider_id, COUNT(*) AS attestation_count
+        FROM {schema_name}.hets_attestations
+        GROUP BY provider_id
+    ) a ON a.provider_id = p.provider_id;
+    GET DIAGNOSTICS rebuilt = ROW_COUNT;
+    RETURN rebuilt;
+END;
+$$ LANGUAGE plpgsql;
+
+COMMENT ON FUNCTION {schema_name}.rebuild_provider_summary IS 'Rebuild hets_provider_summary from the base tables';
+
+-- Trigger functions: apply inserted rows as deltas. Upserts keep them
+-- correct whichever order the triggers of one statement fire in (the
+-- enrollment write is a single CTE touching all four tables).
+CREATE OR REPLACE FUNCTION {schema_name}.summary_providers_inserted()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO {schema_name}.hets_provider_summary (provider_id)
+    SELECT provider_id FROM new_rows
+    ON CONFLICT (provider_id) DO NOTHING;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION {schema_name}.summary_submissions_inserted()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO {schema_name}.hets_provider_summary AS s (provider_id, total_submissions, last_submission_date)
+    SELECT provider_id, COUNT(*), MAX(submission_date) FROM new_rows GROUP BY provider_id
+    ON CONFLICT (provider_id) DO UPDATE SET
+        total_submissions = s.total_submissions + EXCLUDED.total_submissions,
+        last_submission_date = GREATEST(s.last_submission_date, EXCLUDED.last_submission_date);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION {schema_name}.summary_vendors_inserted()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO {schema_name}.hets_provider_summary AS s (provider_id, vendor_count, active_relationships)
+    SELECT provider_id, COUNT(*), COUNT(*) FILTER (WHERE relationship_status = 'Active')
+    FROM new_rows GROUP BY provider_id
+    ON CONFLICT (provider_id) DO UPDATE SET
+        vendor_count = s.vendor_count + EXCLUDED.vendor_count,
+        active_relationships = s.active_relationships + EXCLUDED.active_relationships;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION {schema_name}.summary_attestations_inserted()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO {schema_name}.hets_provider_summary AS s (provider_id, attestation_count)
+    SELECT provider_id, COUNT(*) FROM new_rows GROUP BY provider_id
+    ON CONFLICT (provider_id) DO UPDATE SET
+        attestation_count = s.attestation_count + EXCLUDED.attestation_count;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Trigger function: updates and deletes are rare, so recompute the providers they touch
+CREATE OR REPLACE FUNCTION {schema_name}.summary_rows_changed()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'UPDATE' THEN
+        PERFORM {schema_name}.refresh_provider_summary(ARRAY(
+            SELECT provider_id FROM old_rows UNION SELECT provider_id FROM new_rows
+        ));
+    ELSE
+        PERFORM {schema_name}.refresh_provider_summary(ARRAY(SELECT DISTINCT provider_id FROM old_rows));
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_providers_summary_insert ON {schema_name}.hets_providers;
+CREATE TRIGGER trg_providers_summary_insert
+    AFTER INSERT ON {schema_name}.hets_providers
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION {schema_name}.summary_providers_inserted();
+
+DROP TRIGGER IF EXISTS trg_submission_history_summary_insert ON {schema_name}.hets_submission_history;
+CREATE TRIGGER trg_submission_history_summary_insert
+    AFTER INSERT ON {schema_name}.hets_submission_history
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION {schema_name}.summary_submissions_inserted();
+DROP TRIGGER IF EXISTS trg_submission_history_summary_update ON {schema_name}.hets_submission_history;
+CREATE TRIGGER trg_submission_history_summary_update
+    AFTER UPDATE ON {schema_name}.hets_submission_history
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION {schema_name}.summary_rows_changed();
+DROP TRIGGER IF EXISTS trg_submission_history_summary_delete ON {schema_name}.hets_submission_history;
+CREATE TRIGGER trg_submission_history_summary_delete
+    AFTER DELETE ON {schema_name}.hets_submission_history
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION {schema_name}.summary_rows_changed();
+
+DROP TRIGGER IF EXISTS trg_vendor_relationships_summary_insert ON {schema_name}.hets_vendor_relationships;
+CREATE TRIGGER trg_vendor_relationships_summary_insert
+    AFTER INSERT ON {schema_name}.hets_vendor_relationships
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION {schema_name}.summary_vendors_inserted();
+DROP TRIGGER IF EXISTS trg_vendor_relationships_summary_update ON {schema_name}.hets_vendor_relationships;
+CREATE TRIGGER trg_vendor_relationships_summary_update
+    AFTER UPDATE ON {schema_name}.hets_vendor_relationships
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION {schema_name}.summary_rows_changed();
+DROP TRIGGER IF EXISTS trg_vendor_relationships_summary_delete ON {schema_name}.hets_vendor_relationships;
+CREATE TRIGGER trg_vendor_relationships_summary_delete
+    AFTER DELETE ON {schema_name}.hets_vendor_relationships
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION {schema_name}.summary_rows_changed();
+
+DROP TRIGGER IF EXISTS trg_attestations_summary_insert ON {schema_name}.hets_attestations;
+CREATE TRIGGER trg_attestations_summary_insert
+    AFTER INSERT ON {schema_name}.hets_attestations
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION {schema_name}.summary_attestations_inserted();
+DROP TRIGGER IF EXISTS trg_attestations_summary_update ON {schema_name}.hets_attestations;
+CREATE TRIGGER trg_attestations_summary_update
+    AFTER UPDATE ON {schema_name}.hets_attestations
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION {schema_name}.summary_rows_changed();
+DROP TRIGGER IF EXISTS trg_attestations_summary_delete ON {schema_name}.hets_attestations;
+CREATE TRIGGER trg_attestations_summary_delete
+    AFTER DELETE ON {schema_name}.hets_attestations
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION {schema_name}.summary_rows_changed();
+
+-- Backfill existing providers
+SELECT {schema_name}.rebuild_provider_summary();
+
+-- View: Submission summary, now a primary-key join per provider
+CREATE OR REPLACE VIEW {schema_name}.v_submission_summary AS
+SELECT
+    p.provider_id,
+    p.organization_name,
+    s.total_submissions,
+    s.last_submission_date,
+    s.vendor_count,
+    s.attestation_count
+FROM {schema_name}.hets_providers p
+JOIN {schema_name}.hets_provider_summary s ON s.provider_id = p.provider_id;
+
+-- Function: Get provider summary
+CREATE OR REPLACE FUNCTION {schema_name}.get_provider_summary(p_provider_id INTEGER)
+RETURNS TABLE (
+    provider_name VARCHAR,
+    email VARCHAR,
+    active_relationships BIGINT,
+    total_attestations BIGINT,
+    last_activity TIMESTAMP
+) AS $$
+BEGIN
+    RETURN QUERY
+    SELECT
+        p.organization_name,
+        p.email_address,
+        s.active_relationships,
+        s.attestation_count,
+        GREATEST(p.updated_at, s.last_submission_date)
+    FROM {schema_name}.hets_providers p
+    JOIN {schema_name}.hets_provider_summary s ON s.provider_id = p.provider_id
+    WHERE p.provider_id = p_provider_id;
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,93 @@
+-- Change capture for the lakehouse sync (my_project.hets_sync). Every
+-- insert, update and delete on the four hets_* tables records the changed
+-- primary keys with the writing transaction's id. A reader that stops at
+-- the xmin of its snapshot sees every change from every finished
+-- transaction exactly once, however long transactions overlap, which a
+-- watermark on updated_at cannot guarantee (and attestations and history
+-- have no updated_at at all).
+CREATE TABLE IF NOT EXISTS {schema_name}.hets_change_log (
+    change_id BIGSERIAL PRIMARY KEY,
+    txid XID8 NOT NULL DEFAULT pg_current_xact_id(),
+    table_name VARCHAR(64) NOT NULL,
+    row_key INTEGER NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_change_log_txid ON {schema_name}.hets_change_log(txid);
+
+COMMENT ON TABLE {schema_name}.hets_change_log IS 'Primary keys changed per transaction, consumed and pruned by the lakehouse sync';
+
+-- Function: Record the keys in a statement's transition table; TG_ARGV[0] is the key column
+CREATE OR REPLACE FUNCTION {schema_name}.log_changed_rows()
+RETURNS TRIGGER AS $$
+BEGIN
+    EXECUTE format(
+        'INSERT INTO %I.hets_change_log (table_name, row_key) SELECT %L, %I FROM changed_rows',
+        TG_TABLE_SCHEMA, TG_TABLE_NAME, TG_ARGV[0]
+    );
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_providers_log_insert ON {schema_name}.hets_providers;
+CREATE TRIGGER trg_providers_log_insert
+    AFTER INSERT ON {schema_name}.hets_providers
+    REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION {schema_name}.log_changed_rows('provider_id');
+DROP TRIGGER IF EXISTS trg_providers_log_update ON {schema_name}.hets_providers;
+CREATE TRIGGER trg_providers_log_update
+    AFTER UPDATE ON {schema_name}.hets_providers
+    REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION {schema_name}.log_changed_rows('provider_id');
+DROP TRIGGER IF EXISTS trg_providers_log_delete ON {schema_name}.hets_providers;
+CREATE TRIGGER trg_providers_log_delete
+    AFTER DELETE ON {schema_name}.hets_providers
+    REFERENCING OLD TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION {schema_name}.log_changed_rows('provider_id');
+
+DROP TRIGGER IF EXISTS trg_vendor_relationships_log_insert ON {schema_name}.hets_vendor_relationships;
+CREATE TRIGGER trg_vendor_relationships_log_insert
+    AFTER INSERT ON {schema_name}.hets_vendor_relationships
+    REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION {schema_name}.log_changed_rows('relationship_id');
+DROP TRIGGER IF EXISTS trg_vendor_relationships_log_update ON {schema_name}.hets_vendor_relationships;
+CREATE TRIGGER trg_vendor_relationships_log_update
+    AFTER UPDATE ON {schema_name}.hets_vendor_relationships
+    REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION {schema_name}.log_changed_rows('relationship_id');
+DROP TRIGGER IF EXISTS trg_vendor_relationships_log_delete ON {schema_name}.hets_vendor_relationships;
+CREATE TRIGGER trg_vendor_relationships_log_delete
+    AFTER DELETE ON {schema_name}.hets_vendor_relationships
+    REFERENCING OLD TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION {schema_name}.log_changed_rows('relationship_id');
+
+DROP TRIGGER IF EXISTS trg_attestations_log_insert ON {schema_name}.hets_attestations;
+CREATE TRIGGER trg_attestations_log_insert
+    AFTER INSERT ON {schema_name}.hets_attestations
+    REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION {schema_name}.log_changed_rows('attestation_id');
+DROP TRIGGER IF EXISTS trg_attestations_log_update ON {schema_name}.hets_attestations;
+CREATE TRIGGER trg_attestations_log_update
+    AFTER UPDATE ON {schema_name}.hets_attestations
+    REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION {schema_name}.log_changed_rows('attestation_id');
+DROP TRIGGER IF EXISTS trg_attestations_log_delete ON {schema_name}.hets_attestations;
+CREATE TRIGGER trg_attestations_log_delete
+    AFTER DELETE ON {schema_name}.hets_attestations
+    REFERENCING OLD TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION {schema_name}.log_changed_rows('attestation_id');
+
+DROP TRIGGER IF EXISTS trg_submission_history_log_insert ON {schema_name}.hets_submission_history;
+CREATE TRIGGER trg_submission_history_log_insert
+    AFTER INSERT ON {schema_name}.hets_submission_history
+    REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION {schema_name}.log_changed_rows('submission_id');
+DROP TRIGGER IF EXISTS trg_submission_history_log_update ON {schema_name}.hets_submission_history;
+CREATE TRIGGER trg_submission_history_log_update
+    AFTER UPDATE ON {schema_name}.hets_submission_history
+    REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION {schema_name}.log_changed_rows('submission_id');
+DROP TRIGGER IF EXISTS trg_submission_history_log_delete ON {schema_name}.hets_submission_history;
+CREATE TRIGGER trg_submission_history_log_delete
+    AFTER DELETE ON {schema_name}.hets_submission_history
+    REFERENCING OLD TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION {schema_name}.log_changed_rows('submission_id');
@@ -0,0 +1,349 @@
+-- hets_submission_history and hets_attestations only ever grow. Both become
+-- tables range-partitioned by month (see partitions.py), without copying
+-- existing rows or locking them for longer than a catalog change: each
+-- existing table is renamed to *_legacy and attached as the DEFAULT
+-- partition (with no other partitions yet, nothing is scanned), and its
+-- indexes and foreign keys are attached to the partitioned ones.
+--
+-- New rows keep landing in the legacy partition until the first monthly
+-- partition, which starts two months from now. The NOT VALID check that
+-- bounds the legacy partition is validated later by
+-- partitions.ensure_partitions, which only blocks schema changes while it
+-- scans, and which then creates the monthly partitions ahead of time.
+-- partitions.archive_partitions exports months older than the retention
+-- period to Parquet and drops them; their per-provider counts are kept in
+-- hets_archived_totals so the provider summary still covers them.
+
+-- A unique index on a partitioned table must include the partition key, so
+-- idempotency keys move to their own table. Existing keys are copied before
+-- the tables are renamed (writers are not blocked meanwhile); keys written
+-- during that copy are picked up again under the rename's lock.
+CREATE TABLE IF NOT EXISTS {schema_name}.hets_submission_keys (
+    idempotency_key UUID NOT NULL,
+    provider_id INTEGER NOT NULL,
+    submitted_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+
+    CONSTRAINT pk_submission_keys PRIMARY KEY (idempotency_key),
+    CONSTRAINT fk_submission_keys_provider
+        FOREIGN KEY (provider_id)
+        REFERENCES {schema_name}.hets_providers(provider_id)
+        ON DELETE CASCADE
+);
+
+COMMENT ON TABLE {schema_name}.hets_submission_keys IS 'One row per form submission; replays of the same key are no-ops';
+
+INSERT INTO {schema_name}.hets_submission_keys (idempotency_key, provider_id, submitted_at)
+SELECT idempotency_key, provider_id, COALESCE(submission_date, CURRENT_TIMESTAMP)
+FROM {schema_name}.hets_submission_history
+WHERE idempotency_key IS NOT NULL
+ON CONFLICT DO NOTHING;
+
+ALTER TABLE {schema_name}.hets_submission_history RENAME TO hets_submission_history_legacy;
+ALTER TABLE {schema_name}.hets_attestations RENAME TO hets_attestations_legacy;
+
+INSERT INTO {schema_name}.hets_submission_keys (idempotency_key, provider_id, submitted_at)
+SELECT idempotency_key, provider_id, submission_date
+FROM {schema_name}.hets_submission_history_legacy
+WHERE idempotency_key IS NOT NULL AND submission_date >= CURRENT_TIMESTAMP - INTERVAL '1 day'
+ON CONFLICT DO NOTHING;
+
+DROP INDEX IF EXISTS {schema_name}.uq_submission_history_idempotency_key;
+ALTER INDEX {schema_name}.idx_submission_history_provider RENAME TO idx_submission_history_legacy_provider;
+ALTER INDEX {schema_name}.idx_submission_history_date RENAME TO idx_submission_history_legacy_date;
+ALTER INDEX {schema_name}.idx_submission_history_status RENAME TO idx_submission_history_legacy_status;
+ALTER INDEX {schema_name}.idx_attestations_provider RENAME TO idx_attestations_legacy_provider;
+ALTER INDEX {schema_name}.idx_attestations_relationship RENAME TO idx_attestations_legacy_relationship;
+ALTER INDEX {schema_name}.idx_attestations_date RENAME TO idx_attestations_legacy_date;
+ALTER INDEX {schema_name}.idx_attestations_status RENAME TO idx_attestations_legacy_status;
+
+-- Statement-level triggers on a partition do not fire for statements on the
+-- parent; they are recreated on the partitioned tables below.
+DROP TRIGGER IF EXISTS trg_submission_history_summary_insert ON {schema_name}.hets_submission_history_legacy;
+DROP TRIGGER IF EXISTS trg_submission_history_summary_update ON {schema_name}.hets_submission_history_legacy;
+DROP TRIGGER IF EXISTS trg_submission_history_summary_delete ON {schema_name}.hets_submission_history_legacy;
+DROP TRIGGER IF EXISTS trg_submission_history_log_insert ON {schema_name}.hets_submission_history_legacy;
+DROP TRIGGER IF EXISTS trg_submission_history_log_update ON {schema_name}.hets_submission_history_legacy;
+DROP TRIGGER IF EXISTS trg_submission_history_log_delete ON {schema_name}.hets_submission_history_legacy;
+DROP TRIGGER IF EXISTS trg_attestations_summary_insert ON {schema_name}.hets_attestations_legacy;
+DROP TRIGGER IF EXISTS trg_attestations_summary_update ON {schema_name}.hets_attestations_legacy;
+DROP TRIGGER IF EXISTS trg_attestations_summary_delete ON {schema_name}.hets_attestations_legacy;
+DROP TRIGGER IF EXISTS trg_attestations_log_insert ON {schema_name}.hets_attestations_legacy;
+DROP TRIGGER IF EXISTS trg_attestations_log_update ON {schema_name}.hets_attestations_legacy;
+DROP TRIGGER IF EXISTS trg_attestations_log_delete ON {schema_name}.hets_attestations_legacy;
+
+CREATE TABLE {schema_name}.hets_submission_history (
+    LIKE {schema_name}.hets_submission_history_legacy INCLUDING DEFAULTS
+) PARTITION BY RANGE (submission_date);
+CREATE TABLE {schema_name}.hets_attestations (
+    LIKE {schema_name}.hets_attestations_legacy INCLUDING DEFAULTS
+) PARTITION BY RANGE (attestation_date);
+
+COMMENT ON TABLE {schema_name}.hets_submission_history IS 'Audit trail of all submissions and status changes, partitioned by month';
+COMMENT ON TABLE {schema_name}.hets_attestations IS 'Digital attestations and electronic signatures, partitioned by month';
+COMMENT ON COLUMN {schema_name}.hets_attestations.ip_address IS 'IP address of person submitting attestation';
+
+-- The ids keep coming from the original sequences, which must outlive the
+-- legacy partitions once those are archived.
+ALTER SEQUENCE {schema_name}.hets_submission_history_submission_id_seq
+    OWNED BY {schema_name}.hets_submission_history.submission_id;
+ALTER SEQUENCE {schema_name}.hets_attestations_attestation_id_seq
+    OWNED BY {schema_name}.hets_attestations.attestation_id;
+
+-- Partitions, monthly and legacy, and where archived ones were exported to
+CREATE TABLE IF NOT EXISTS {schema_name}.hets_partitions (
+    partition_name VARCHAR(128) PRIMARY KEY,
+    table_name VARCHAR(64) NOT NULL,
+    range_start TIMESTAMP,
+    range_end TIMESTAMP NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    archived_at TIMESTAMP,
+    archived_rows BIGINT,
+    archive_location TEXT
+);
+
+CREATE INDEX IF NOT EXISTS idx_partitions_table_end ON {schema_name}.hets_partitions(table_name, range_end);
+
+COMMENT ON TABLE {schema_name}.hets_partitions IS 'Partitions of the audit tables, maintained by partitions.py';
+
+DO $$
+DECLARE
+    legacy_end TIMESTAMP := date_trunc('month', LOCALTIMESTAMP) + INTERVAL '2 months';
+BEGIN
+    EXECUTE format(
+        'ALTER TABLE {schema_name}.hets_submission_history_legacy ADD CONSTRAINT chk_submission_history_legacy_range '
+        'CHECK (submission_date < %L) NOT VALID', legacy_end
+    );
+    EXECUTE format(
+        'ALTER TABLE {schema_name}.hets_attestations_legacy ADD CONSTRAINT chk_attestations_legacy_range '
+        'CHECK (attestation_date < %L) NOT VALID', legacy_end
+    );
+    INSERT INTO {schema_name}.hets_partitions (partition_name, table_name, range_end)
+    VALUES ('hets_submission_history_legacy', 'hets_submission_history', legacy_end),
+           ('hets_attestations_legacy', 'hets_attestations', legacy_end);
+END $$;
+
+ALTER TABLE {schema_name}.hets_submission_history
+    ATTACH PARTITION {schema_name}.hets_submission_history_legacy DEFAULT;
+ALTER TABLE {schema_name}.hets_attestations
+    ATTACH PARTITION {schema_name}.hets_attestations_legacy DEFAULT;
+
+CREATE INDEX idx_submission_history_provider ON ONLY {schema_name}.hets_submission_history(provider_id);
+CREATE INDEX idx_submission_history_date ON ONLY {schema_name}.hets_submission_history(submission_date DESC);
+CREATE INDEX idx_submission_history_status ON ONLY {schema_name}.hets_submission_history(status);
+ALTER INDEX {schema_name}.idx_submission_history_provider
+    ATTACH PARTITION {schema_name}.idx_submission_history_legacy_provider;
+ALTER INDEX {schema_name}.idx_submission_history_date
+    ATTACH PARTITION {schema_name}.idx_submission_history_legacy_date;
+ALTER INDEX {schema_name}.idx_submission_history_status
+    ATTACH PARTITION {schema_name}.idx_submission_history_legacy_status;
+
+CREATE INDEX idx_attestations_provider ON ONLY {schema_name}.hets_attestations(provider_id);
+CREATE INDEX idx_attestations_relationship ON ONLY {schema_name}.hets_attestations(relationship_id);
+CREATE INDEX idx_attestations_date ON ONLY {schema_name}.hets_attestations(attestation_date DESC);
+CREATE INDEX idx_attestations_status ON ONLY {schema_name}.hets_attestations(submission_status);
+ALTER INDEX {schema_name}.idx_attestations_provider
+    ATTACH PARTITION {schema_name}.idx_attestations_legacy_provider;
+ALTER INDEX {schema_name}.idx_attestations_relationship
+    ATTACH PARTITION {schema_name}.idx_attestations_legacy_relationship;
+ALTER INDEX {schema_name}.idx_attestations_date
+    ATTACH PARTITION {schema_name}.idx_attestations_legacy_date;
+ALTER INDEX {schema_name}.idx_attestations_status
+    ATTACH PARTITION {schema_name}.idx_attestations_legacy_status;
+
+-- The legacy partitions' identical constraints are attached, not revalidated
+ALTER TABLE {schema_name}.hets_submission_history
+    ADD CONSTRAINT fk_submission_provider
+        FOREIGN KEY (provider_id)
+        REFERENCES {schema_name}.hets_providers(provider_id)
+        ON DELETE CASCADE;
+ALTER TABLE {schema_name}.hets_attestations
+    ADD CONSTRAINT fk_attestation_provider
+        FOREIGN KEY (provider_id)
+        REFERENCES {schema_name}.hets_providers(provider_id)
+        ON DELETE CASCADE,
+    ADD CONSTRAINT fk_attestation_relationship
+        FOREIGN KEY (relationship_id)
+        REFERENCES {schema_name}.hets_vendor_relationships(relationship_id)
+        ON DELETE CASCADE,
+    ADD CONSTRAINT chk_submission_status
+        CHECK (submission_status IN ('Submitted', 'Approved', 'Rejected', 'Pending Review'));
+
+CREATE TRIGGER trg_submission_history_summary_insert
+    AFTER INSERT ON {schema_name}.hets_submission_history
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION {schema_name}.summary_submissions_inserted();
+CREATE TRIGGER trg_submission_history_summary_update
+    AFTER UPDATE ON {schema_name}.hets_submission_history
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION {schema_name}.summary_rows_changed();
+CREATE TRIGGER trg_submission_history_summary_delete
+    AFTER DELETE ON {schema_name}.hets_submission_history
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION {schema_name}.summary_rows_changed();
+CREATE TRIGGER trg_submission_history_log_insert
+    AFTER INSERT ON {schema_name}.hets_submission_history
+    REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION {schema_name}.log_changed_rows('submission_id');
+CREATE TRIGGER trg_submission_history_log_update
+    AFTER UPDATE ON {schema_name}.hets_submission_history
+    REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION {schema_name}.log_changed_rows('submission_id');
+CREATE TRIGGER trg_submission_history_log_delete
+    AFTER DELETE ON {schema_name}.hets_submission_history
+    REFERENCING OLD TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION {schema_name}.log_changed_rows('submission_id');
+
+CREATE TRIGGER trg_attestations_summary_insert
+    AFTER INSERT ON {schema_name}.hets_attestations
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION {schema_name}.summary_attestations_inserted();
+CREATE TRIGGER trg_attestations_summary_update
+    AFTER UPDATE ON {schema_name}.hets_attestations
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION {schema_name}.summary_rows_changed();
+CREATE TRIGGER trg_attestations_summary_delete
+    AFTER DELETE ON {schema_name}.hets_attestations
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION {schema_name}.summary_rows_changed();
+CREATE TRIGGER trg_attestations_log_insert
+    AFTER INSERT ON {schema_name}.hets_attestations
+    REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION {schema_name}.log_changed_rows('attestation_id');
+CREATE TRIGGER trg_attestations_log_update
+    AFTER UPDATE ON {schema_name}.hets_attestations
+    REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION {schema_name}.log_changed_rows('attestation_id');
+CREATE TRIGGER trg_attestations_log_delete
+    AFTER DELETE ON {schema_name}.hets_attestations
+    REFERENCING OLD TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION {schema_name}.log_changed_rows('attestation_id');
+
+-- The view was bound to the renamed table; point it at the partitioned one
+CREATE OR REPLACE VIEW {schema_name}.v_complete_enrollments AS
+SELECT
+    p.provider_id,
+    p.authorized_signatory_name,
+    p.title,
+    p.organization_name,
+    p.email_address,
+    p.alternate_email_address,
+    p.phone_number,
+    p.ptan,
+    p.npi,
+    p.tax_id,
+    p.organization_type,
+    v.relationship_id,
+    v.vendor_clearinghouse_name,
+    v.vendor_contact_name,
+    v.vendor_contact_email,
+    v.vendor_contact_phone,
+    v.effective_date,
+    v.termination_date,
+    v.offshore_data_sharing_consent,
+    v.relationship_status,
+    a.attestation_id,
+    a.attested_by,
+    a.attestation_date,
+    a.submission_status,
+    p.created_at,
+    p.updated_at
+FROM {schema_name}.hets_providers p
+LEFT JOIN {schema_name}.hets_vendor_relationships v ON p.provider_id = v.provider_id
+LEFT JOIN {schema_name}.hets_attestations a ON p.provider_id = a.provider_id AND v.relationship_id = a.relationship_id;
+
+-- Per-provider counts of archived partitions, added to the live counts
+CREATE TABLE IF NOT EXISTS {schema_name}.hets_archived_totals (
+    provider_id INTEGER PRIMARY KEY,
+    total_submissions BIGINT NOT NULL DEFAULT 0,
+    last_submission_date TIMESTAMP,
+    attestation_count BIGINT NOT NULL DEFAULT 0,
+
+    CONSTRAINT fk_archived_totals_provider
+        FOREIGN KEY (provider_id)
+        REFERENCES {schema_name}.hets_providers(provider_id)
+        ON DELETE CASCADE
+);
+
+COMMENT ON TABLE {schema_name}.hets_archived_totals IS 'Submission and attestation counts of archived partitions, per provider';
+
+-- Function: Recompute the summary of the given providers from the base tables and archived totals
+CREATE OR REPLACE FUNCTION {schema_name}.refresh_provider_summary(p_provider_ids INTEGER[])
+RETURNS BIGINT AS $$
+DECLARE
+    refreshed BIGINT;
+BEGIN
+    DELETE FROM {schema_name}.hets_provider_summary WHERE provider_id = ANY(p_provider_ids);
+    INSERT INTO {schema_name}.hets_provider_summary
+    (provider_id, total_submissions, last_submission_date, vendor_count, active_relationships, attestation_count)
+    SELECT p.provider_id,
+           COALESCE(sh.total_submissions, 0) + COALESCE(t.total_submissions, 0),
+           GREATEST(sh.last_submission_date, t.last_submission_date),
+           COALESCE(v.vendor_count, 0), COALESCE(v.active_relationships, 0),
+           COALESCE(a.attestation_count, 0) + COALESCE(t.attestation_count, 0)
+    FROM {schema_name}.hets_providers p
+    LEFT JOIN (
+        SELECT provider_id, COUNT(*) AS total_submissions, MAX(submission_date) AS last_submission_date
+        FROM {schema_name}.hets_submission_history
+        WHERE provider_id = ANY(p_provider_ids)
+        GROUP BY provider_id
+    ) sh ON sh.provider_id = p.provider_id
+    LEFT JOIN (
+        SELECT provider_id, COUNT(*) AS vendor_count,
+               COUNT(*) FILTER (WHERE relationship_status = 'Active') AS active_relationships
+        FROM {schema_name}.hets_vendor_relationships
+        WHERE provider_id = ANY(p_provider_ids)
+        GROUP BY provider_id
+    ) v ON v.provider_id = p.provider_id
+    LEFT JOIN (
+        SELECT provider_id, COUNT(*) AS attestation_count
+        FROM {schema_name}.hets_attestations
+        WHERE provider_id = ANY(p_provider_ids)
+        GROUP BY provider_id
+    ) a ON a.provider_id = p.provider_id
+    LEFT JOIN {schema_name}.hets_archived_totals t ON t.provider_id = p.provider_id
+    WHERE p.provider_id = ANY(p_provider_ids);
+    GET DIAGNOSTICS refreshed = ROW_COUNT;
+    RETURN refreshed;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Function: Rebuild the whole summary, blocking writers meanwhile
+CREATE OR REPLACE FUNCTION {schema_name}.rebuild_provider_summary()
+RETURNS BIGINT AS $$
+DECLARE
+    rebuilt BIGINT;
+BEGIN
+    LOCK TABLE {schema_name}.hets_providers, {schema_name}.hets_submission_history,
+               {schema_name}.hets_vendor_relationships, {schema_name}.hets_attestations,
+               {schema_name}.hets_archived_totals
+        IN SHARE MODE;
+    DELETE FROM {schema_name}.hets_provider_summary;
+    INSERT INTO {schema_name}.hets_provider_summary
+    (provider_id, total_submissions, last_submission_date, vendor_count, active_relationships, attestation_count)
+    SELECT p.provider_id,
+           COALESCE(sh.total_submissions, 0) + COALESCE(t.total_submissions, 0),
+           GREATEST(sh.last_submission_date, t.last_submission_date),
+           COALESCE(v.vendor_count, 0), COALESCE(v.active_relationships, 0),
+           COALESCE(a.attestation_count, 0) + COALESCE(t.attestation_count, 0)
+    FROM {schema_name}.hets_providers p
+    LEFT JOIN (
+        SELECT provider_id, COUNT(*) AS total_submissions, MAX(submission_date) AS last_submission_date
+        FROM {schema_name}.hets_submission_history
+        GROUP BY provider_id
+    ) sh ON sh.provider_id = p.provider_id
+    LEFT JOIN (
+        SELECT provider_id, COUNT(*) AS vendor_count,
+               COUNT(*) FILTER (WHERE relationship_status = 'Active') AS active_relationships
+        FROM {schema_name}.hets_vendor_relationships
+        GROUP BY provider_id
+    ) v ON v.provider_id = p.provider_id
+    LEFT JOIN (
+        SELECT provider_id, COUNT(*) AS attestation_count
+        FROM {schema_name}.hets_attestations
+        GROUP BY provider_id
+    ) a ON a.provider_id = p.provider_id
+    LEFT JOIN {schema_name}.hets_archived_totals t ON t.provider_id = p.provider_id;
+    GET DIAGNOSTICS rebuilt = ROW_COUNT;
+    RETURN rebuilt;
+END;
+$$ LANGUAGE plpgsql;
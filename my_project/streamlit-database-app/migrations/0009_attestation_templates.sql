@@ -0,0 +1,96 @@
+-- Every attestation used to carry the full attestation statement (about
+-- 700 bytes, below the TOAST threshold, so stored inline), repeating the
+-- same text on every row. Statements are now stored once per version in
+-- hets_attestation_templates, keyed by the SHA-256 of their text, and
+-- attestations reference the version that was signed. Rows written before
+-- this migration keep their inline text until attestation_templates.py
+-- moves it to a template; new rows leave attestation_text NULL.
+CREATE TABLE IF NOT EXISTS {schema_name}.hets_attestation_templates (
+    template_id SERIAL PRIMARY KEY,
+    content_hash BYTEA NOT NULL,
+    attestation_text TEXT NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+
+    CONSTRAINT uq_attestation_templates_hash UNIQUE (content_hash),
+    CONSTRAINT chk_attestation_templates_hash
+        CHECK (content_hash = sha256(convert_to(attestation_text, 'UTF8')))
+);
+
+COMMENT ON TABLE {schema_name}.hets_attestation_templates IS 'Attestation statement versions, one row per distinct text';
+COMMENT ON COLUMN {schema_name}.hets_attestation_templates.content_hash IS 'SHA-256 of the UTF-8 statement text';
+
+-- Function: Template id of an attestation statement, adding it as a new version if unseen
+CREATE OR REPLACE FUNCTION {schema_name}.attestation_template_id(p_text TEXT)
+RETURNS INTEGER AS $$
+DECLARE
+    v_hash BYTEA := sha256(convert_to(p_text, 'UTF8'));
+    v_template_id INTEGER;
+BEGIN
+    SELECT template_id INTO v_template_id
+    FROM {schema_name}.hets_attestation_templates WHERE content_hash = v_hash;
+    IF v_template_id IS NULL THEN
+        INSERT INTO {schema_name}.hets_attestation_templates (content_hash, attestation_text)
+        VALUES (v_hash, p_text)
+        ON CONFLICT (content_hash) DO NOTHING
+        RETURNING template_id INTO v_template_id;
+    END IF;
+    IF v_template_id IS NULL THEN
+        -- Added by a concurrent transaction since the first lookup
+        SELECT template_id INTO v_template_id
+        FROM {schema_name}.hets_attestation_templates WHERE content_hash = v_hash;
+    END IF;
+    RETURN v_template_id;
+END;
+$$ LANGUAGE plpgsql STRICT;
+
+ALTER TABLE {schema_name}.hets_attestations
+    ADD COLUMN IF NOT EXISTS template_id INTEGER,
+    ALTER COLUMN attestation_text DROP NOT NULL;
+
+-- The new column is NULL everywhere, so checking it finds nothing, but it
+-- still reads every partition while writes wait (partitioned tables cannot
+-- take a NOT VALID foreign key).
+ALTER TABLE {schema_name}.hets_attestations
+    ADD CONSTRAINT fk_attestation_template
+        FOREIGN KEY (template_id)
+        REFERENCES {schema_name}.hets_attestation_templates(template_id);
+
+-- Validated by attestation_templates.py once the inline texts are moved
+ALTER TABLE {schema_name}.hets_attestations
+    ADD CONSTRAINT chk_attestation_statement
+        CHECK (template_id IS NOT NULL OR attestation_text IS NOT NULL) NOT VALID;
+
+COMMENT ON COLUMN {schema_name}.hets_attestations.attestation_text IS 'Statement text of rows not yet moved to hets_attestation_templates';
+COMMENT ON COLUMN {schema_name}.hets_attestations.template_id IS 'Attestation statement version that was signed';
+
+-- Templates are synced to the lakehouse like the other hets_* tables
+DROP TRIGGER IF EXISTS trg_attestation_templates_log_insert ON {schema_name}.hets_attestation_templates;
+CREATE TRIGGER trg_attestation_templates_log_insert
+    AFTER INSERT ON {schema_name}.hets_attestation_templates
+    REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION {schema_name}.log_changed_rows('template_id');
+DROP TRIGGER IF EXISTS trg_attestation_templates_log_update ON {schema_name}.hets_attestation_templates;
+CREATE TRIGGER trg_attestation_templates_log_update
+    AFTER UPDATE ON {schema_name}.hets_attestation_templates
+    REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION {schema_name}.log_changed_rows('template_id');
+DROP TRIGGER IF EXISTS trg_attestation_templates_log_delete ON {schema_name}.hets_attestation_templates;
+CREATE TRIGGER trg_attestation_templates_log_delete
+    AFTER DELETE ON {schema_name}.hets_attestation_templates
+    REFERENCING OLD TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION {schema_name}.log_changed_rows('template_id');
+
+-- View: Attestations with their statement text, wherever it is stored
+CREATE OR REPLACE VIEW {schema_name}.v_attestations AS
+SELECT
+    a.attestation_id,
+    a.provider_id,
+    a.relationship_id,
+    a.template_id,
+    COALESCE(t.attestation_text, a.attestation_text) AS attestation_text,
+    a.attested_by,
+    a.attestation_date,
+    a.ip_address,
+    a.submission_status
+FROM {schema_name}.hets_attestations a
+LEFT JOIN {schema_name}.hets_attestation_templates t ON t.template_id = a.template_id;
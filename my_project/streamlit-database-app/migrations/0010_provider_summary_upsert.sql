@@ -0,0 +1,52 @@
+-- refresh_provider_summary used to delete the providers' summary rows and
+-- insert them again. Two transactions refreshing the same provider at once
+-- (say, two updates of its vendor relationships) could both find the row
+-- deleted and both insert it, and the second failed with a unique violation
+-- that aborted its write. The refresh now upserts each row instead; summary
+-- rows of deleted providers go with them through the foreign key cascade.
+
+-- Function: Recompute the summary of the given providers from the base tables and archived totals
+CREATE OR REPLACE FUNCTION {schema_name}.refresh_provider_summary(p_provider_ids INTEGER[])
+RETURNS BIGINT AS $$
+DECLARE
+    refreshed BIGINT;
+BEGIN
+    INSERT INTO {schema_name}.hets_provider_summary
+    (provider_id, total_submissions, last_submission_date, vendor_count, active_relationships, attestation_count)
+    SELECT p.provider_id,
+           COALESCE(sh.total_submissions, 0) + COALESCE(t.total_submissions, 0),
+           GREATEST(sh.last_submission_date, t.last_submission_date),
+           COALESCE(v.vendor_count, 0), COALESCE(v.active_relationships, 0),
+           COALESCE(a.attestation_count, 0) + COALESCE(t.attestation_count, 0)
+    FROM {schema_name}.hets_providers p
+    LEFT JOIN (
+        SELECT provider_id, COUNT(*) AS total_submissions, MAX(submission_date) AS last_submission_date
+        FROM {schema_name}.hets_submission_history
+        WHERE provider_id = ANY(p_provider_ids)
+        GROUP BY provider_id
+    ) sh ON sh.provider_id = p.provider_id
+    LEFT JOIN (
+        SELECT provider_id, COUNT(*) AS vendor_count,
+               COUNT(*) FILTER (WHERE relationship_status = 'Active') AS active_relationships
+        FROM {schema_name}.hets_vendor_relationships
+        WHERE provider_id = ANY(p_provider_ids)
+        GROUP BY provider_id
+    ) v ON v.provider_id = p.provider_id
+    LEFT JOIN (
+        SELECT provider_id, COUNT(*) AS attestation_count
+        FROM {schema_name}.hets_attestations
+        WHERE provider_id = ANY(p_provider_ids)
+        GROUP BY provider_id
+    ) a ON a.provider_id = p.provider_id
+    LEFT JOIN {schema_name}.hets_archived_totals t ON t.provider_id = p.provider_id
+    WHERE p.provider_id = ANY(p_provider_ids)
+    ON CONFLICT (provider_id) DO UPDATE SET
+        total_submissions = EXCLUDED.total_submissions,
+        last_submission_date = EXCLUDED.last_submission_date,
+        vendor_count = EXCLUDED.vendor_count,
+        active_relationships = EXCLUDED.active_relationships,
+        attestation_count = EXCLUDED.attestation_count;
+    GET DIAGNOSTICS refreshed = ROW_COUNT;
+    RETURN refreshed;
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,298 @@
+"""Monthly partitions of the HETS audit tables, and archival of old months.
+
+``hets_submission_history`` and ``hets_attestations`` are range-partitioned
+by month (migration ``0008_partitioned_audit_tables.sql``).
+``ensure_partitions`` creates the partitions for the coming months; the app
+runs it on a ``PartitionMaintainer`` thread, at startup and then every few
+hours, so a month never starts without its partition however long the
+process runs. ``archive_partitions`` writes each partition whose
+month ended more than the retention period ago to a Parquet file, then
+detaches and drops it, keeping the working set of the audit tables to
+recent months. The archived rows stay queryable from the Parquet files
+(listed in ``hets_partitions``) and from the lakehouse copy made by the
+sync job, since detaching a partition records no deletes.
+
+    python partitions.py                                   # create upcoming partitions
+    python partitions.py --archive --archive-dir /mnt/hets_archive
+"""
+import argparse
+import os
+import threading
+from datetime import datetime
+
+from psycopg import sql
+
+from db_metrics import db_metrics
+from export import ParquetEncoder
+
+# Partitioned table -> (partition key, primary key)
+PARTITIONED_TABLES = {
+    "hets_submission_history": ("submission_date", "submission_id"),
+    "hets_attestations": ("attestation_date", "attestation_id"),
+}
+MONTHS_AHEAD = 3
+# Seconds between the app's partition checks
+MAINTENANCE_INTERVAL = 6 * 3600
+RETENTION_MONTHS = int(os.getenv("HETS_RETENTION_MONTHS", "24"))
+ARCHIVE_DIR = os.getenv("HETS_ARCHIVE_DIR", "hets_archive")
+BATCH_ROWS = 20000
+# DDL gives up rather than queue writers behind it for longer than this
+LOCK_TIMEOUT = "5s"
+
+# Per-provider counts of a partition about to be archived, folded into hets_archived_totals
+ARCHIVED_TOTALS = {
+    "hets_submission_history": """
+        INSERT INTO {schema}.hets_archived_totals AS t (provider_id, total_submissions, last_submission_date)
+        SELECT provider_id, COUNT(*), MAX(submission_date) FROM {schema}.{partition} GROUP BY provider_id
+        ON CONFLICT (provider_id) DO UPDATE SET
+            total_submissions = t.total_submissions + EXCLUDED.total_submissions,
+            last_submission_date = GREATEST(t.last_submission_date, EXCLUDED.last_submission_date)
+    """,
+    "hets_attestations": """
+        INSERT INTO {schema}.hets_archived_totals AS t (provider_id, attestation_count)
+        SELECT provider_id, COUNT(*) FROM {schema}.{partition} GROUP BY provider_id
+        ON CONFLICT (provider_id) DO UPDATE SET
+            attestation_count = t.attestation_count + EXCLUDED.attestation_count
+    """,
+}
+
+
+def add_months(month, months):
+    """The first day of the month ``months`` after ``month``."""
+    index = month.year * 12 + month.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+def current_month(conn):
+    """The first day of the database's current month."""
+    return conn.execute("SELECT date_trunc('month', LOCALTIMESTAMP)").fetchone()[0]
+
+
+def partition_name(table, month):
+    return f"{table}_{month:%Y_%m}"
+
+
+def validate_legacy_partition(conn, schema_name, table):
+    """Validate the check that bounds ``table``'s legacy partition, if it is still NOT VALID.
+
+    Scans the legacy partition, but only blocks schema changes meanwhile;
+    afterwards, attaching a monthly partition needs no scan of it.
+    """
+    row = conn.execute("""
+        SELECT c.conname FROM pg_constraint c
+        JOIN pg_class r ON r.oid = c.conrelid
+        JOIN pg_namespace n ON n.oid = r.relnamespace
+        WHERE n.nspname = %s AND r.relname = %s AND c.contype = 'c' AND NOT c.convalidated
+    """, (schema_name, f"{table}_legacy")).fetchone()
+    if row is not None:
+        print(f"Validating {schema_name}.{table}_legacy")
+        conn.execute(sql.SQL("ALTER TABLE {}.{} VALIDATE CONSTRAINT {}").format(
+            sql.Identifier(schema_name), sql.Identifier(f"{table}_legacy"), sql.Identifier(row[0])
+        ))
+
+
+def create_partition(conn, schema_name, table, month):
+    """Create and attach the partition of ``table`` for ``month``.
+
+    The partition is created standalone and then attached. The attach lets
+    reads and writes of the other partitions continue, but while ``table``
+    still has its DEFAULT (legacy) partition it locks that one ACCESS
+    EXCLUSIVE, so reads and writes of legacy rows wait until it commits;
+    ``LOCK_TIMEOUT`` bounds how long it queues for that lock.
+    """
+    schema = sql.Identifier(schema_name)
+    name = partition_name(table, month)
+    partition_key, primary_key = PARTITIONED_TABLES[table]
+    end = add_months(month, 1)
+    conn.execute(sql.SQL("CREATE TABLE {schema}.{partition} (LIKE {schema}.{table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)").format(
+        schema=schema, partition=sql.Identifier(name), table=sql.Identifier(table)
+    ))
+    conn.execute(sql.SQL("ALTER TABLE {}.{} ADD PRIMARY KEY ({})").format(
+        schema, sql.Identifier(name), sql.Identifier(primary_key)
+    ))
+    conn.execute(sql.SQL("ALTER TABLE {schema}.{table} ATTACH PARTITION {schema}.{partition} "
+                         "FOR VALUES FROM ({start}) TO ({end})").format(
+        schema=schema, table=sql.Identifier(table), partition=sql.Identifier(name),
+        start=sql.Literal(month), end=sql.Literal(end)
+    ))
+    conn.execute(sql.SQL(
+        "INSERT INTO {}.hets_partitions (partition_name, table_name, range_start, range_end) VALUES (%s, %s, %s, %s)"
+    ).format(schema), (name, table, month, end))
+    print(f"Created partition {schema_name}.{name} ({partition_key} in [{month:%Y-%m-%d}, {end:%Y-%m-%d}))")
+    return name
+
+
+def ensure_partitions(conn, schema_name, months_ahead=MONTHS_AHEAD, month=None):
+    """Create the missing monthly partitions up to ``months_ahead`` after ``month``; returns their names.
+
+    ``month`` defaults to the database's current month. Safe to run from
+    several processes at once.
+    """
+    schema = sql.Identifier(schema_name)
+    created = []
+    previous_autocommit = conn.autocommit
+    conn.autocommit = True
+    try:
+        last = add_months(month or current_month(conn), months_ahead + 1)
+        for table in PARTITIONED_TABLES:
+            validate_legacy_partition(conn, schema_name, table)
+            while True:
+                with conn.transaction():
+                    conn.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", (f"hets_partitions:{schema_name}",))
+                    conn.execute(sql.SQL("SET LOCAL lock_timeout = {}").format(sql.Literal(LOCK_TIMEOUT)))
+                    end = conn.execute(
+                        sql.SQL("SELECT MAX(range_end) FROM {}.hets_partitions WHERE table_name = %s").format(schema),
+                        (table,)
+                    ).fetchone()[0]
+                    if end >= last:
+                        break
+                    created.append(create_partition(conn, schema_name, table, end))
+    finally:
+        conn.autocommit = previous_autocommit
+    return created
+
+
+class PartitionMaintainer:
+    """Run ``ensure_partitions`` now and then every ``interval`` seconds until ``stop()``.
+
+    Runs on a daemon thread; ``connection()`` returns a connection context
+    manager, as ``db.get_connection`` does. Failures are logged and the
+    partitions checked again at the next interval: partitions are created
+    months ahead, so a failed check leaves plenty of time.
+    """
+
+    def __init__(self, connection, schema_name, interval=MAINTENANCE_INTERVAL, months_ahead=MONTHS_AHEAD):
+        self.connection = connection
+        self.schema_name = schema_name
+        self.interval = interval
+        self.months_ahead = months_ahead
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="partition-maintainer", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        """Stop checking; returns once the thread has exited (or ``timeout`` passed)."""
+        self._stopped.set()
+        self._thread.join(timeout)
+
+    def is_alive(self):
+        return self._thread.is_alive()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            try:
+                with db_metrics.track("ensure_partitions"), self.connection() as conn:
+                    ensure_partitions(conn, self.schema_name, self.months_ahead)
+            except Exception as e:
+                print(f"Partition maintenance failed, retrying in {self.interval} s: {e}")
+            self._stopped.wait(self.interval)
+
+
+_maintainers = {}
+_maintainers_lock = threading.Lock()
+
+
+def maintain_partitions(connection, schema_name, interval=MAINTENANCE_INTERVAL, months_ahead=MONTHS_AHEAD):
+    """Start a ``PartitionMaintainer`` for ``schema_name``, unless one is already running; returns it."""
+    with _maintainers_lock:
+        maintainer = _maintainers.get(schema_name)
+        if maintainer is None or not maintainer.is_alive():
+            maintainer = _maintainers[schema_name] = PartitionMaintainer(
+                connection, schema_name, interval, months_ahead
+            ).start()
+        return maintainer
+
+
+def export_partition(conn, schema_name, table, name, archive_dir, batch_rows=BATCH_ROWS):
+    """Write every row of partition ``name`` to ``archive_dir/table/name.parquet``; returns ``(path, rows)``."""
+    _, primary_key = PARTITIONED_TABLES[table]
+    directory = os.path.join(archive_dir, table)
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{name}.parquet")
+    rows = 0
+    with conn.transaction(), conn.cursor(name=f"hets_archive_{name}") as cur, open(path + ".tmp", "wb") as f:
+        cur.execute(sql.SQL("SELECT * FROM {}.{} ORDER BY {}").format(
+            sql.Identifier(schema_name), sql.Identifier(name), sql.Identifier(primary_key)
+        ))
+        encoder = None
+        while batch := cur.fetchmany(batch_rows):
+            encoder = encoder or ParquetEncoder(cur.description, conn.adapters)
+            f.write(encoder.encode(batch))
+            rows += len(batch)
+        if encoder is None:
+            encoder = ParquetEncoder(cur.description, conn.adapters)
+        f.write(encoder.finish())
+    os.replace(path + ".tmp", path)
+    return path, rows
+
+
+def archive_partitions(conn, schema_name, archive_dir=ARCHIVE_DIR, retention_months=RETENTION_MONTHS, month=None):
+    """Archive the partitions whose month ended more than ``retention_months`` before ``month``.
+
+    Each one is exported to Parquet, then, in one transaction, its counts
+    are added to ``hets_archived_totals`` (so provider summaries and
+    ``rebuild_provider_summary`` still include them), it is detached and
+    dropped, and ``hets_partitions`` records where it went. Returns
+    ``(partition, rows, path)`` per archived partition.
+    """
+    schema = sql.Identifier(schema_name)
+    archived = []
+    previous_autocommit = conn.autocommit
+    conn.autocommit = True
+    try:
+        cutoff = add_months(month or current_month(conn), -retention_months)
+        due = conn.execute(sql.SQL("""
+            SELECT table_name, partition_name FROM {}.hets_partitions
+            WHERE archived_at IS NULL AND range_end <= %s
+            ORDER BY range_end, table_name
+        """).format(schema), (cutoff,)).fetchall()
+        for table, name in due:
+            path, rows = export_partition(conn, schema_name, table, name, archive_dir)
+            with conn.transaction():
+                conn.execute(sql.SQL("SET LOCAL lock_timeout = {}").format(sql.Literal(LOCK_TIMEOUT)))
+                conn.execute(sql.SQL(ARCHIVED_TOTALS[table]).format(schema=schema, partition=sql.Identifier(name)))
+                conn.execute(sql.SQL("ALTER TABLE {schema}.{table} DETACH PARTITION {schema}.{partition}").format(
+                    schema=schema, table=sql.Identifier(table), partition=sql.Identifier(name)
+                ))
+                conn.execute(sql.SQL("DROP TABLE {}.{}").format(schema, sql.Identifier(name)))
+                conn.execute(sql.SQL("""
+                    UPDATE {}.hets_partitions
+                    SET archived_at = CURRENT_TIMESTAMP, archived_rows = %s, archive_location = %s
+                    WHERE partition_name = %s
+                """).format(schema), (rows, os.path.abspath(path), name))
+            print(f"Archived {schema_name}.{name}: {rows} rows to {path}")
+            archived.append((name, rows, path))
+    finally:
+        conn.autocommit = previous_autocommit
+    return archived
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Create upcoming HETS audit table partitions and archive old ones.")
+    parser.add_argument("--months-ahead", type=int, default=MONTHS_AHEAD,
+                        help="Months after the current one to create partitions for")
+    parser.add_argument("--archive", action="store_true",
+                        help="Also archive partitions older than the retention period")
+    parser.add_argument("--retention-months", type=int, default=RETENTION_MONTHS,
+                        help="Months of history to keep in Postgres (HETS_RETENTION_MONTHS)")
+    parser.add_argument("--archive-dir", default=ARCHIVE_DIR,
+                        help="Directory for the archived Parquet files (HETS_ARCHIVE_DIR)")
+    args = parser.parse_args()
+
+    import db
+    from migrations import ensure_schema
+
+    ensure_schema()
+    with db.get_connection() as conn:
+        created = ensure_partitions(conn, db.get_schema_name(), args.months_ahead)
+        print(f"{len(created)} partitions created")
+        if args.archive:
+            archived = archive_partitions(conn, db.get_schema_name(), args.archive_dir, args.retention_months)
+            print(f"{len(archived)} partitions archived ({sum(rows for _, rows, _ in archived)} rows)")
+
+
+if __name__ == "__main__":
+    main()
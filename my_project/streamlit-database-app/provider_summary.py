@@ -0,0 +1,85 @@
+import argparse
+
+from psycopg import sql
+
+SUMMARY_COLUMNS = [
+    "provider_id",
+    "total_submissions",
+    "last_submission_date",
+    "vendor_count",
+    "active_relationships",
+    "attestation_count",
+]
+
+
+def get_provider_summary(conn, schema_name, provider_id):
+    """Return ``(provider_name, email, active_relationships, total_attestations, last_activity)``, or None.
+
+    Reads one row of ``hets_provider_summary`` through the
+    ``get_provider_summary()`` SQL function, whatever the provider's history size.
+    """
+    return conn.execute(
+        sql.SQL("SELECT * FROM {}.get_provider_summary(%s)").format(sql.Identifier(schema_name)),
+        (provider_id,)
+    ).fetchone()
+
+
+def rebuild(conn, schema_name):
+    """Recompute ``hets_provider_summary`` from the base tables and return the number of providers.
+
+    Writers are blocked for the duration (the tables are locked in SHARE mode).
+    """
+    with conn.transaction():
+        return conn.execute(
+            sql.SQL("SELECT {}.rebuild_provider_summary()").format(sql.Identifier(schema_name))
+        ).fetchone()[0]
+
+
+def find_drift(conn, schema_name):
+    """Return the summary rows that differ from a fresh rebuild, as ``(current, rebuilt)`` pairs.
+
+    The rebuild runs in a transaction that is rolled back, so nothing changes.
+    """
+    schema = sql.Identifier(schema_name)
+    columns = sql.SQL(", ").join(map(sql.Identifier, SUMMARY_COLUMNS))
+    tx = conn.transaction(force_rollback=True)
+    with tx:
+        conn.execute(sql.SQL(
+            "CREATE TEMP TABLE provider_summary_before ON COMMIT DROP AS SELECT {} FROM {}.hets_provider_summary"
+        ).format(columns, schema))
+        conn.execute(sql.SQL("SELECT {}.rebuild_provider_summary()").format(schema))
+        rows = conn.execute(sql.SQL("""
+            SELECT b.*, s.*
+            FROM provider_summary_before b
+            FULL JOIN (SELECT {columns} FROM {schema}.hets_provider_summary) s
+                ON s.provider_id = b.provider_id
+            WHERE b IS DISTINCT FROM s
+            ORDER BY COALESCE(b.provider_id, s.provider_id)
+        """).format(columns=columns, schema=schema)).fetchall()
+    width = len(SUMMARY_COLUMNS)
+    return [(row[:width], row[width:]) for row in rows]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild the HETS provider summary table.")
+    parser.add_argument("--check", action="store_true",
+                        help="Only report providers whose summary differs from a rebuild")
+    args = parser.parse_args()
+
+    import db
+    from migrations import ensure_schema
+
+    ensure_schema()
+    with db.get_connection() as conn:
+        if args.check:
+            drift = find_drift(conn, db.get_schema_name())
+            for current, rebuilt in drift:
+                print(f"  summary {current} should be {rebuilt}")
+            print(f"{len(drift)} provider summaries out of date")
+            raise SystemExit(1 if drift else 0)
+        count = rebuild(conn, db.get_schema_name())
+        print(f"Rebuilt the summary of {count} providers")
+
+
+if __name__ == "__main__":
+    main()
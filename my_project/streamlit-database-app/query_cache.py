@@ -0,0 +1,179 @@
+import threading
+import time
+from collections import OrderedDict
+
+# Writers NOTIFY this channel with the schema name as payload; every app
+# replica LISTENs on it and drops its cached reads for that schema.
+CHANGE_CHANNEL = "hets_enrollments_changed"
+DEFAULT_MAX_ENTRIES = 256
+DEFAULT_TTL = 60
+# Seconds a listener may take to notice stop()
+STOP_CHECK_INTERVAL = 1
+
+
+class _Load:
+    def __init__(self, generation):
+        self.generation = generation
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class QueryCache:
+    """Process-wide, size-bounded TTL cache for read queries.
+
+    Concurrent misses on the same key are coalesced: one caller runs the
+    loader and the others wait for its result, so a burst of viewers costs
+    a single query. ``invalidate()`` drops every entry; loads that started
+    before an invalidation are not stored.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, ttl=DEFAULT_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._loads = {}
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get_or_load(self, key, loader):
+        """Return the cached value for ``key``, calling ``loader()`` on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            load = self._loads.get(key)
+            leader = load is None
+            if leader:
+                load = self._loads[key] = _Load(self._generation)
+                self.misses += 1
+            else:
+                self.hits += 1
+
+        if not leader:
+            load.done.wait()
+            if load.error is not None:
+                raise load.error
+            return load.value
+
+        try:
+            load.value = loader()
+        except Exception as e:
+            load.error = e
+            raise
+        finally:
+            with self._lock:
+                if self._loads.get(key) is load:
+                    del self._loads[key]
+                if load.error is None and load.generation == self._generation:
+                    self._entries[key] = (time.monotonic() + self.ttl, load.value)
+                    self._entries.move_to_end(key)
+                    while len(self._entries) > self.max_entries:
+                        self._entries.popitem(last=False)
+            load.done.set()
+        return load.value
+
+    def invalidate(self):
+        """Drop all cached entries."""
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._loads.clear()
+            self.invalidations += 1
+
+    def stats(self):
+        """Return hit/miss counters and the current size."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "entries": len(self._entries),
+            }
+
+
+class ChangeListener:
+    """LISTEN for changes from any replica and invalidate ``cache`` until ``stop()``.
+
+    Runs on a daemon thread and reconnects after failures; the cache is
+    invalidated on every reconnect since notifications may have been missed
+    meanwhile. ``on_change(conn)``, if given, is called with the listening
+    connection before each invalidation; its errors are logged and the
+    listener carries on.
+    """
+
+    def __init__(self, connect, schema_name, cache, retry_interval=5, on_change=None):
+        self.connect = connect
+        self.schema_name = schema_name
+        self.cache = cache
+        self.retry_interval = retry_interval
+        self.on_change = on_change
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="query-cache-listener", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        """Stop listening; returns once the thread has exited (or ``timeout`` passed)."""
+        self._stopped.set()
+        self._thread.join(timeout)
+
+    def is_alive(self):
+        return self._thread.is_alive()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            try:
+                with self.connect() as conn:
+                    conn.execute(f"LISTEN {CHANGE_CHANNEL}")
+                    changed = True
+                    while not self._stopped.is_set():
+                        if changed:
+                            self._changed(conn)
+                        # The connection can only run queries between batches of
+                        # notifications; the timeout lets stop() be noticed
+                        notifies = list(conn.notifies(timeout=STOP_CHECK_INTERVAL, stop_after=1))
+                        changed = any(notify.payload == self.schema_name for notify in notifies)
+            except Exception as e:
+                print(f"Cache invalidation listener disconnected, retrying: {e}")
+            self._stopped.wait(self.retry_interval)
+
+    def _changed(self, conn):
+        if self.on_change is not None:
+            try:
+                self.on_change(conn)
+            except Exception as e:
+                print(f"Cache invalidation callback failed: {e}")
+        self.cache.invalidate()
+
+
+# Shared by every session in this process
+enrollment_cache = QueryCache()
+_listeners = {}
+_listeners_lock = threading.Lock()
+
+
+def notify_change(cur, schema_name):
+    """Queue a change notification; Postgres delivers it when the transaction commits."""
+    cur.execute("SELECT pg_notify(%s, %s)", (CHANGE_CHANNEL, schema_name))
+
+
+def listen_for_changes(connect, schema_name, cache=enrollment_cache, retry_interval=5, on_change=None):
+    """Start a ``ChangeListener`` for ``cache``, unless one is already running; returns it.
+
+    ``connect`` returns a new autocommit connection.
+    """
+    with _listeners_lock:
+        listener = _listeners.get(id(cache))
+        if listener is None or not listener.is_alive() or listener.cache is not cache:
+            listener = _listeners[id(cache)] = ChangeListener(
+                connect, schema_name, cache, retry_interval, on_change
+            ).start()
+        return listener
@@ -7,6 +7,13 @@
 
 -- Note: Replace {schema_name} with your actual schema name
 -- Format: {PGAPPNAME}_schema_{PGUSER}
+--
+-- migrations.py applies this file as schema version 1 (with
+-- {schema_name} substituted) and then any later migrations/*.sql.
+-- Statements must stay re-runnable against databases that were
+-- created by the app's earlier inline DDL.
+
+CREATE SCHEMA IF NOT EXISTS {schema_name};
 
 -- =====================================================
 -- TABLE: hets_providers
@@ -35,10 +42,10 @@ CREATE TABLE IF NOT EXISTS {schema_name}.hets_providers (
 );
 
 -- Indexes for performance
-CREATE INDEX idx_providers_npi ON {schema_name}.hets_providers(npi);
-CREATE INDEX idx_providers_ptan ON {schema_name}.hets_providers(ptan);
-CREATE INDEX idx_providers_email ON {schema_name}.hets_providers(email_address);
-CREATE INDEX idx_providers_created_at ON {schema_name}.hets_providers(created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_providers_npi ON {schema_name}.hets_providers(npi);
+CREATE INDEX IF NOT EXISTS idx_providers_ptan ON {schema_name}.hets_providers(ptan);
+CREATE INDEX IF NOT EXISTS idx_providers_email ON {schema_name}.hets_providers(email_address);
+CREATE INDEX IF NOT EXISTS idx_providers_created_at ON {schema_name}.hets_providers(created_at DESC);
 
 -- Comments
 COMMENT ON TABLE {schema_name}.hets_providers IS 'Healthcare provider information for HETS EDI enrollment';
@@ -78,9 +85,9 @@ CREATE TABLE IF NOT EXISTS {schema_name}.hets_vendor_relationships (
 );
 
 -- Indexes for performance
-CREATE INDEX idx_vendor_relationships_provider ON {schema_name}.hets_vendor_relationships(provider_id);
-CREATE INDEX idx_vendor_relationships_status ON {schema_name}.hets_vendor_relationships(relationship_status);
-CREATE INDEX idx_vendor_relationships_effective_date ON {schema_name}.hets_vendor_relationships(effective_date);
+CREATE INDEX IF NOT EXISTS idx_vendor_relationships_provider ON {schema_name}.hets_vendor_relationships(provider_id);
+CREATE INDEX IF NOT EXISTS idx_vendor_relationships_status ON {schema_name}.hets_vendor_relationships(relationship_status);
+CREATE INDEX IF NOT EXISTS idx_vendor_relationships_effective_date ON {schema_name}.hets_vendor_relationships(effective_date);
 
 -- Comments
 COMMENT ON TABLE {schema_name}.hets_vendor_relationships IS 'Vendor and clearinghouse relationships for EDI transactions';
@@ -116,10 +123,10 @@ CREATE TABLE IF NOT EXISTS {schema_name}.hets_attestations (
 );
 
 -- Indexes for performance
-CREATE INDEX idx_attestations_provider ON {schema_name}.hets_attestations(provider_id);
-CREATE INDEX idx_attestations_relationship ON {schema_name}.hets_attestations(relationship_id);
-CREATE INDEX idx_attestations_date ON {schema_name}.hets_attestations(attestation_date DESC);
-CREATE INDEX idx_attestations_status ON {schema_name}.hets_attestations(submission_status);
+CREATE INDEX IF NOT EXISTS idx_attestations_provider ON {schema_name}.hets_attestations(provider_id);
+CREATE INDEX IF NOT EXISTS idx_attestations_relationship ON {schema_name}.hets_attestations(relationship_id);
+CREATE INDEX IF NOT EXISTS idx_attestations_date ON {schema_name}.hets_attestations(attestation_date DESC);
+CREATE INDEX IF NOT EXISTS idx_attestations_status ON {schema_name}.hets_attestations(submission_status);
 
 -- Comments
 COMMENT ON TABLE {schema_name}.hets_attestations IS 'Digital attestations and electronic signatures';
@@ -147,9 +154,9 @@ CREATE TABLE IF NOT EXISTS {schema_name}.hets_submission_history (
 );
 
 -- Indexes for performance
-CREATE INDEX idx_submission_history_provider ON {schema_name}.hets_submission_history(provider_id);
-CREATE INDEX idx_submission_history_date ON {schema_name}.hets_submission_history(submission_date DESC);
-CREATE INDEX idx_submission_history_status ON {schema_name}.hets_submission_history(status);
+CREATE INDEX IF NOT EXISTS idx_submission_history_provider ON {schema_name}.hets_submission_history(provider_id);
+CREATE INDEX IF NOT EXISTS idx_submission_history_date ON {schema_name}.hets_submission_history(submission_date DESC);
+CREATE INDEX IF NOT EXISTS idx_submission_history_status ON {schema_name}.hets_submission_history(status);
 
 -- Comments
 COMMENT ON TABLE {schema_name}.hets_submission_history IS 'Audit trail of all submissions and status changes';
@@ -245,12 +252,14 @@ END;
 $$ LANGUAGE plpgsql;
 
 -- Trigger: Auto-update timestamp on providers table
+DROP TRIGGER IF EXISTS trg_providers_updated_at ON {schema_name}.hets_providers;
 CREATE TRIGGER trg_providers_updated_at
     BEFORE UPDATE ON {schema_name}.hets_providers
     FOR EACH ROW
     EXECUTE FUNCTION {schema_name}.update_timestamp();
 
 -- Trigger: Auto-update timestamp on vendor relationships table
+DROP TRIGGER IF EXISTS trg_vendor_relationships_updated_at ON {schema_name}.hets_vendor_relationships;
 CREATE TRIGGER trg_vendor_relationships_updated_at
     BEFORE UPDATE ON {schema_name}.hets_vendor_relationships
     FOR EACH ROW
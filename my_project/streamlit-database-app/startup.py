@@ -0,0 +1,141 @@
+"""Cold start: render the page first, connect to the database in the background.
+
+After a scale-to-zero restart, the first request used to pay in sequence for
+importing the Databricks SDK, fetching an OAuth token, opening the pool and
+applying migrations before anything rendered. ``warm_up(phases)`` runs those
+phases once per process on a background thread, timing each one; the page
+renders straight away and only the parts that read from the database wait
+for it (``WarmUp.wait``).
+
+To see where startup milliseconds go:
+
+    python startup.py               # module import times, by package
+    python startup.py --connect     # ...and the warm-up phases (needs PG* variables)
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+import threading
+import time
+
+_lock = threading.Lock()
+_warm_up = None
+
+IMPORT_TIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)")
+
+
+class WarmUp:
+    """Run ``phases``, a list of ``(name, callable)``, in order on a background thread.
+
+    ``timings`` maps each finished phase to its duration in seconds. The
+    first exception stops the warm-up and is kept in ``error``.
+    """
+
+    def __init__(self, phases):
+        self.phases = phases
+        self.timings = {}
+        self.error = None
+        self.phase = None
+        self._done = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="startup-warm-up", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _run(self):
+        try:
+            for name, phase in self.phases:
+                self.phase = name
+                start = time.perf_counter()
+                phase()
+                self.timings[name] = time.perf_counter() - start
+            self.phase = None
+            print("Startup warm-up finished: " + ", ".join(
+                f"{name} {seconds * 1000:.0f} ms" for name, seconds in self.timings.items()
+            ))
+        except Exception as e:
+            self.error = e
+            print(f"Startup warm-up failed during {self.phase}: {e}")
+        finally:
+            self._done.set()
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+    @property
+    def ready(self):
+        return self.done and self.error is None
+
+    def wait(self, timeout=None):
+        """Block until the warm-up finishes; re-raises its error."""
+        if not self._done.wait(timeout):
+            raise TimeoutError(f"Still starting up after {timeout} s ({self.phase})")
+        if self.error is not None:
+            raise self.error
+        return self
+
+
+def warm_up(phases):
+    """Start the process-wide warm-up, or start it again if the last one failed."""
+    global _warm_up
+    with _lock:
+        if _warm_up is None or (_warm_up.done and _warm_up.error is not None):
+            _warm_up = WarmUp(phases).start()
+    return _warm_up
+
+
+def import_profile(module="app"):
+    """Import ``module`` in a fresh interpreter under ``-X importtime``.
+
+    Returns ``(total_seconds, packages)``, where ``packages`` maps each
+    top-level package to the seconds spent importing its modules, largest
+    first.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True, check=True,
+    )
+    # Lines are printed as each import finishes, so ``module``'s imports are
+    # the lines between the previous top-level import and its own line
+    packages, total = {}, 0
+    for match in IMPORT_TIME_LINE.finditer(result.stderr):
+        self_us, cumulative_us, indent, name = match.groups()
+        package = name.split(".")[0]
+        packages[package] = packages.get(package, 0) + int(self_us) / 1e6
+        if not indent:
+            if name == module:
+                total = int(cumulative_us) / 1e6
+                break
+            packages = {}
+    return total, dict(sorted(packages.items(), key=lambda item: item[1], reverse=True))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--module", default="app", help="Module to profile the import of")
+    parser.add_argument("--top", type=int, default=15, help="Packages to list")
+    parser.add_argument("--connect", action="store_true", help="Also time the app's warm-up phases")
+    args = parser.parse_args()
+
+    total, packages = import_profile(args.module)
+    print(f"import {args.module}: {total * 1000:.0f} ms")
+    for package, seconds in list(packages.items())[:args.top]:
+        print(f"  {package:<28} {seconds * 1000:8.1f} ms  {seconds / total:6.1%}")
+
+    if args.connect:
+        sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+        import app
+
+        started = time.perf_counter()
+        warm_up(app.WARM_UP_PHASES).wait()
+        print(f"warm-up: {(time.perf_counter() - started) * 1000:.0f} ms")
+        for name, seconds in _warm_up.timings.items():
+            print(f"  {name:<28} {seconds * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,319 @@
+"""Durable write-behind queue for enrollment submissions.
+
+``save_enrollment`` appends each submission to a local SQLite database (WAL
+journal, one short transaction) and returns at once; a background worker
+drains the queue into Postgres in batches, retrying with exponential
+back-off while the database is slow or unreachable. A submission Postgres
+rejects outright (a constraint or data error) is marked failed instead, and
+never retried. The submission id is the form's idempotency key, so a batch
+that is written to Postgres but not yet marked as flushed when the app stops
+is replayed as a no-op after restart: every submission is recorded exactly
+once.
+
+The queue is only as durable as the disk under it, so the app only queues
+submissions when ``HETS_QUEUE_PATH`` is set, and it must point at storage
+that outlives the app process; otherwise submissions are written straight to
+Postgres.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+from datetime import date
+
+import psycopg
+
+from db_metrics import db_metrics
+from enrollments import insert_enrollment
+
+BATCH_SIZE = 50
+POLL_INTERVAL = 5
+RETRY_INTERVAL = 1
+MAX_RETRY_INTERVAL = 300
+# Flushed submissions are kept this long for status lookups
+RETENTION_SECONDS = 7 * 86400
+DATE_FIELDS = ("effective_date", "termination_date")
+# Data exceptions and integrity constraint violations: the submission itself is
+# at fault, so retrying it cannot succeed
+REJECTED_SQLSTATE_CLASSES = ("22", "23")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS submissions (
+    submission_id TEXT PRIMARY KEY,
+    schema_name TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    enqueued_at REAL NOT NULL,
+    next_attempt_at REAL NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    flushed_at REAL,
+    provider_id INTEGER,
+    outcome TEXT,
+    failed_at REAL
+);
+"""
+
+INDEXES = """
+DROP INDEX IF EXISTS idx_submissions_pending;
+CREATE INDEX IF NOT EXISTS idx_submissions_due ON submissions(next_attempt_at)
+    WHERE flushed_at IS NULL AND failed_at IS NULL;
+CREATE INDEX IF NOT EXISTS idx_submissions_flushed ON submissions(flushed_at) WHERE flushed_at IS NOT NULL;
+"""
+
+Submission = namedtuple(
+    "Submission", "submission_id schema_name provider_data vendor_data attestation_data attempts"
+)
+
+
+class RejectedSubmission(Exception):
+    """A submission Postgres refused for good; ``flush`` marks it failed instead of retrying it."""
+
+    def __init__(self, error):
+        super().__init__(f"{type(error).__name__}: {error}")
+        self.error = error
+
+
+def _describe(error):
+    if isinstance(error, RejectedSubmission):
+        return str(error)
+    return f"{type(error).__name__}: {error}"
+
+
+def _encode(value):
+    if isinstance(value, date):
+        return value.isoformat()
+    raise TypeError(f"Cannot queue {type(value).__name__} values")
+
+
+def _decode(payload):
+    data = json.loads(payload)
+    for field in DATE_FIELDS:
+        if data["vendor_data"].get(field):
+            data["vendor_data"][field] = date.fromisoformat(data["vendor_data"][field])
+    return data
+
+
+class SubmissionQueue:
+    """SQLite-backed queue of submissions waiting to be written to Postgres.
+
+    ``write_batch(submissions)`` writes a list of ``Submission`` and returns,
+    in order, ``(provider_id, outcome)`` or the exception for each one (see
+    ``postgres_writer``). An exception raised by ``write_batch`` itself
+    fails the whole batch. Failed submissions are retried after
+    ``retry_interval`` seconds, doubling up to ``max_retry_interval``, except
+    those whose result is a ``RejectedSubmission``: they stay in the queue,
+    marked failed, until someone deals with them.
+    """
+
+    def __init__(self, path, batch_size=BATCH_SIZE, retry_interval=RETRY_INTERVAL,
+                 max_retry_interval=MAX_RETRY_INTERVAL, poll_interval=POLL_INTERVAL):
+        self.path = path
+        self.batch_size = batch_size
+        self.retry_interval = retry_interval
+        self.max_retry_interval = max_retry_interval
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        # Autocommit; multi-statement writes use explicit transactions
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        # A commit survives the app process crashing; it is not fsynced
+        # until the next checkpoint, which only matters if the host fails.
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+        # Queues created before submissions could fail for good
+        if "failed_at" not in {row[1] for row in self._db.execute("PRAGMA table_info(submissions)")}:
+            self._db.execute("ALTER TABLE submissions ADD COLUMN failed_at REAL")
+        self._db.executescript(INDEXES)
+
+    def enqueue(self, schema_name, submission_id, provider_data, vendor_data, attestation_data):
+        """Queue a submission; returns False if ``submission_id`` was already queued."""
+        payload = json.dumps(
+            {"provider_data": provider_data, "vendor_data": vendor_data, "attestation_data": attestation_data},
+            default=_encode,
+        )
+        now = time.time()
+        with self._lock:
+            added = self._db.execute(
+                "INSERT OR IGNORE INTO submissions (submission_id, schema_name, payload, enqueued_at, next_attempt_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (submission_id, schema_name, payload, now, now),
+            ).rowcount == 1
+        self._wake.set()
+        return added
+
+    def status(self, submission_id):
+        """``{"state": "pending" | "flushed" | "failed", ...}`` for a submission, or None if unknown."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT flushed_at, failed_at, provider_id, outcome, attempts, last_error FROM submissions "
+                "WHERE submission_id = ?", (submission_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        flushed_at, failed_at, provider_id, outcome, attempts, last_error = row
+        return {
+            "state": "flushed" if flushed_at is not None else "failed" if failed_at is not None else "pending",
+            "provider_id": provider_id,
+            "outcome": outcome,
+            "attempts": attempts,
+            "last_error": last_error,
+        }
+
+    def stats(self):
+        """Pending, retrying and failed submission counts and the age of the oldest pending one."""
+        with self._lock:
+            pending, failing, oldest, failed = self._db.execute(
+                "SELECT COUNT(*) FILTER (WHERE failed_at IS NULL), COUNT(last_error) FILTER (WHERE failed_at IS NULL), "
+                "MIN(enqueued_at) FILTER (WHERE failed_at IS NULL), COUNT(failed_at) "
+                "FROM submissions WHERE flushed_at IS NULL"
+            ).fetchone()
+        return {
+            "pending": pending,
+            "failing": failing,
+            "failed": failed,
+            "oldest_pending_seconds": time.time() - oldest if oldest else 0,
+        }
+
+    def _due(self):
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT submission_id, schema_name, payload, attempts FROM submissions "
+                "WHERE flushed_at IS NULL AND failed_at IS NULL AND next_attempt_at <= ? ORDER BY enqueued_at LIMIT ?",
+                (time.time(), self.batch_size),
+            ).fetchall()
+        return [Submission(submission_id, schema_name, attempts=attempts, **_decode(payload))
+                for submission_id, schema_name, payload, attempts in rows]
+
+    def _retry_at(self, attempts):
+        return time.time() + min(self.retry_interval * 2 ** attempts, self.max_retry_interval)
+
+    def flush(self, write_batch):
+        """Write one batch of due submissions; returns how many were flushed."""
+        batch = self._due()
+        if not batch:
+            return 0
+        try:
+            results = write_batch(batch)
+        except Exception as e:
+            results = [e] * len(batch)
+        now = time.time()
+        flushed, rejected = 0, []
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                for submission, result in zip(batch, results):
+                    if isinstance(result, RejectedSubmission):
+                        self._db.execute(
+                            "UPDATE submissions SET attempts = attempts + 1, last_error = ?, failed_at = ? "
+                            "WHERE submission_id = ?",
+                            (_describe(result), now, submission.submission_id),
+                        )
+                        rejected.append((submission.submission_id, result))
+                        continue
+                    if isinstance(result, Exception):
+                        self._db.execute(
+                            "UPDATE submissions SET attempts = attempts + 1, last_error = ?, next_attempt_at = ? "
+                            "WHERE submission_id = ?",
+                            (_describe(result), self._retry_at(submission.attempts), submission.submission_id),
+                        )
+                        continue
+                    provider_id, outcome = result
+                    self._db.execute(
+                        "UPDATE submissions SET attempts = attempts + 1, last_error = NULL, flushed_at = ?, "
+                        "provider_id = ?, outcome = ? WHERE submission_id = ?",
+                        (now, provider_id, outcome, submission.submission_id),
+                    )
+                    flushed += 1
+                self._db.execute("DELETE FROM submissions WHERE flushed_at < ?", (now - RETENTION_SECONDS,))
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        for submission_id, result in rejected:
+            print(f"Queued submission {submission_id} was rejected by the database and will not be retried: {result}")
+        if flushed + len(rejected) < len(batch):
+            error = next(r for r in results if isinstance(r, Exception) and not isinstance(r, RejectedSubmission))
+            print(f"Queued submissions failed to flush ({len(batch) - flushed - len(rejected)} of {len(batch)}), "
+                  f"retrying: {error}")
+        return flushed
+
+    def start(self, write_batch):
+        """Start the background flush worker (idempotent)."""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._run, args=(write_batch,), name="submission-queue", daemon=True
+            )
+            self._thread.start()
+        return self
+
+    def stop(self, timeout=5):
+        """Stop the worker after its current batch."""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+
+    def _run(self, write_batch):
+        while not self._stop.is_set():
+            try:
+                if self.flush(write_batch) == self.batch_size:
+                    continue
+            except Exception as e:
+                print(f"Submission queue worker error, retrying: {e}")
+            # Sleep until the next enqueue, or poll for submissions due for a retry
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+
+
+def postgres_writer(connection, on_flushed=None):
+    """A ``write_batch`` that writes each submission with ``insert_enrollment``.
+
+    A batch uses one connection from ``connection()``. A submission that
+    Postgres rejects for its data (SQLSTATE classes 22 and 23) fails for good
+    on its own; any other error, such as a lost connection or a database that
+    is read-only during a failover, fails the rest of the batch so it is
+    retried. ``on_flushed(conn)`` runs after a batch with any writes.
+    """
+    def write_batch(submissions):
+        results = []
+        with db_metrics.track("flush_submissions") as timer, connection() as conn:
+            for submission in submissions:
+                try:
+                    results.append(insert_enrollment(
+                        conn, submission.schema_name, submission.provider_data, submission.vendor_data,
+                        submission.attestation_data, submission.submission_id
+                    ))
+                except psycopg.Error as e:
+                    if (e.sqlstate or "")[:2] in REJECTED_SQLSTATE_CLASSES:
+                        results.append(RejectedSubmission(e))
+                        continue
+                    results.extend([e] * (len(submissions) - len(results)))
+                    break
+            timer.rows = sum(not isinstance(r, Exception) for r in results)
+            if on_flushed is not None and timer.rows:
+                on_flushed(conn)
+        return results
+
+    return write_batch
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_queue():
+    """The process-wide queue at ``HETS_QUEUE_PATH``, or None when it is not set."""
+    global _queue
+    path = os.getenv("HETS_QUEUE_PATH")
+    if _queue is None and path:
+        with _queue_lock:
+            if _queue is None:
+                _queue = SubmissionQueue(path)
+    return _queue
@@ -0,0 +1,62 @@
+import uuid
+
+import pytest
+
+pytest.importorskip("psycopg")
+
+from attestation_templates import backfill, inline_attestations
+from enrollments import ATTESTATION_TEXT, insert_enrollment
+from enrollments_test import sample_enrollment
+from provider_summary import find_drift
+
+
+def statements(conn, schema_name):
+    return conn.execute(
+        f'SELECT a.template_id, a.attestation_text, v.attestation_text FROM "{schema_name}".hets_attestations a '
+        f'JOIN "{schema_name}".v_attestations v USING (attestation_id) ORDER BY attestation_id'
+    ).fetchall()
+
+
+def test_enrollments_reference_one_template_per_statement_version(hets_schema):
+    conn, schema_name = hets_schema
+    insert_enrollment(conn, schema_name, *sample_enrollment(), str(uuid.uuid4()))
+    insert_enrollment(conn, schema_name, *sample_enrollment(npi="1234567801"), str(uuid.uuid4()))
+    provider_data, vendor_data, attestation_data = sample_enrollment(npi="1234567802")
+    revised = dict(attestation_data, attestation_text=ATTESTATION_TEXT + "7. I agree to the revised terms.\n")
+    insert_enrollment(conn, schema_name, provider_data, vendor_data, revised, str(uuid.uuid4()))
+
+    rows = statements(conn, schema_name)
+    assert [inline for _, inline, _ in rows] == [None, None, None]
+    assert [text for _, _, text in rows] == [ATTESTATION_TEXT, ATTESTATION_TEXT, revised["attestation_text"]]
+    assert rows[0][0] == rows[1][0] != rows[2][0]
+    assert conn.execute(f'SELECT COUNT(*) FROM "{schema_name}".hets_attestation_templates').fetchone()[0] == 2
+    conn.commit()
+
+
+def test_backfill_moves_inline_statements_to_templates(hets_schema):
+    conn, schema_name = hets_schema
+    provider_id, _ = insert_enrollment(conn, schema_name, *sample_enrollment(), str(uuid.uuid4()))
+    relationship_id = conn.execute(
+        f'SELECT relationship_id FROM "{schema_name}".hets_vendor_relationships WHERE provider_id = %s', (provider_id,)
+    ).fetchone()[0]
+    # Written the way attestations were before migration 0009
+    for text in [ATTESTATION_TEXT, "I attest.", ATTESTATION_TEXT, "I attest.", ATTESTATION_TEXT]:
+        conn.execute(
+            f'INSERT INTO "{schema_name}".hets_attestations (provider_id, relationship_id, attestation_text, attested_by) '
+            "VALUES (%s, %s, %s, %s)", (provider_id, relationship_id, text, "Jane Doe")
+        )
+    conn.commit()
+    before = [text for _, _, text in statements(conn, schema_name)]
+    assert inline_attestations(conn, schema_name) == 5
+    conn.commit()
+
+    assert backfill(conn, schema_name, batch_rows=2) == 5
+    rows = statements(conn, schema_name)
+    assert [text for _, _, text in rows] == before
+    assert all(inline is None for _, inline, _ in rows)
+    assert len({template_id for template_id, _, _ in rows}) == 2
+    assert inline_attestations(conn, schema_name) == 0
+    assert find_drift(conn, schema_name) == []
+    conn.commit()
+    assert backfill(conn, schema_name, compact=True) == 0
+    assert [text for _, _, text in statements(conn, schema_name)] == before
@@ -0,0 +1,105 @@
+import pytest
+
+pd = pytest.importorskip("pandas")
+pytest.importorskip("psycopg")
+
+from bulk_import import IMPORT_COLUMNS, load_enrollments, validate_rows
+
+
+def roster(*overrides):
+    base = {c: "" for c in IMPORT_COLUMNS}
+    base.update({
+        "authorized_signatory_name": "Jane Doe",
+        "title": "CEO",
+        "organization_name": "Doe Clinic",
+        "email_address": "jane@example.com",
+        "phone_number": "555-0100",
+        "ptan": "PTAN12345",
+        "npi": "1234567893",
+        "tax_id": "12-3456789",
+        "organization_type": "Clinic",
+        "vendor_clearinghouse_name": "Clearinghouse",
+        "effective_date": "2025-01-01",
+        "attested_by": "jane doe",
+    })
+    return pd.DataFrame([{**base, **o} for o in overrides], columns=IMPORT_COLUMNS)
+
+
+def test_validate_rows_reports_per_row_errors():
+    rows, errors = validate_rows(roster(
+        {},
+        {"npi": "123", "email_address": "not-an-email"},
+        {"attested_by": "Someone Else", "effective_date": "01/02/2025", "ptan": "PTAN99999"},
+    ))
+    assert len(rows) == 1
+    assert rows[0][IMPORT_COLUMNS.index("relationship_status")] == "Active"
+    assert sorted(errors) == [
+        (3, "email_address", "invalid_email", "Invalid email format"),
+        (3, "npi", "invalid_npi_format", "NPI must be exactly 10 digits"),
+        (4, "attested_by", "attestation_name_mismatch", "Attested name must match Authorized Signatory Name"),
+        (4, "effective_date", "invalid_date", "Date must be in YYYY-MM-DD format"),
+    ]
+
+
+def test_missing_columns_are_reported():
+    rows, errors = validate_rows(pd.DataFrame({"npi": ["1234567893"]}))
+    assert rows == [] and errors[0][:3] == (1, None, "missing_columns")
+
+
+def test_load_enrollments_writes_all_four_tables(hets_schema):
+    conn, schema_name = hets_schema
+    rows, _ = validate_rows(roster({}, {"npi": "1234567901", "ptan": "PTAN54321"}))
+    assert load_enrollments(conn, schema_name, rows) == (2, [])
+
+    for table in ("hets_providers", "hets_vendor_relationships", "hets_attestations", "hets_submission_history"):
+        assert conn.execute(f'SELECT COUNT(*) FROM "{schema_name}".{table}').fetchone()[0] == 2
+    assert conn.execute(f'''
+        SELECT COUNT(*) FROM "{schema_name}".hets_attestations a
+        JOIN "{schema_name}".hets_vendor_relationships v USING (relationship_id)
+        WHERE a.provider_id = v.provider_id
+    ''').fetchone()[0] == 2
+
+
+def test_existing_and_repeated_npi_ptan_are_not_duplicated(hets_schema):
+    conn, schema_name = hets_schema
+    rows, errors = validate_rows(roster({}, {}))
+    assert errors == [(3, "ptan", "duplicate_npi_ptan", "Duplicate NPI/PTAN (first seen on row 2)")]
+
+    assert load_enrollments(conn, schema_name, rows) == (1, [])
+    assert load_enrollments(conn, schema_name, rows) == (0, [("1234567893", "PTAN12345")])
+
+
+def test_npi_ptan_enrolled_during_the_import_is_skipped(hets_schema, pg_conninfo):
+    import threading
+
+    import psycopg
+
+    conn, schema_name = hets_schema
+    rows, _ = validate_rows(roster({}, {"npi": "1234567901", "ptan": "PTAN54321"}))
+    conn.execute(
+        f'INSERT INTO "{schema_name}".hets_providers (authorized_signatory_name, organization_name, '
+        "email_address, ptan, npi) VALUES ('Jane Doe', 'Doe Clinic', 'jane@example.com', 'PTAN12345', '1234567893')"
+    )
+
+    results = []
+
+    def importer():
+        with psycopg.connect(pg_conninfo) as other:
+            results.append(load_enrollments(other, schema_name, rows))
+
+    thread = threading.Thread(target=importer)
+    thread.start()
+    for _ in range(100):
+        if conn.execute(
+            "SELECT COUNT(*) FROM pg_locks l JOIN pg_stat_activity a USING (pid) "
+            "WHERE NOT l.granted AND a.query LIKE %s", (f"%{schema_name}%",)
+        ).fetchone()[0] or not thread.is_alive():
+            break
+        thread.join(0.05)
+    conn.commit()
+    thread.join()
+
+    assert results == [(1, [("1234567893", "PTAN12345")])]
+    for table in ("hets_providers", "hets_vendor_relationships", "hets_attestations", "hets_submission_history"):
+        expected = 2 if table == "hets_providers" else 1
+        assert conn.execute(f'SELECT COUNT(*) FROM "{schema_name}".{table}').fetchone()[0] == expected
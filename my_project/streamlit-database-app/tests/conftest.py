@@ -0,0 +1,34 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def pg_conninfo():
+    """Connection string for a disposable local Postgres (HETS_TEST_PG_CONNINFO)."""
+    conninfo = os.getenv("HETS_TEST_PG_CONNINFO")
+    if not conninfo:
+        pytest.skip("HETS_TEST_PG_CONNINFO is not set")
+    return conninfo
+
+
+@pytest.fixture
+def hets_schema(pg_conninfo):
+    """A freshly migrated, uniquely named HETS schema; yields (conn, schema_name)."""
+    import uuid
+
+    psycopg = pytest.importorskip("psycopg")
+    from migrations import migrate
+
+    schema_name = f"hets_test_{uuid.uuid4().hex[:8]}"
+    with psycopg.connect(pg_conninfo) as conn:
+        migrate(conn, schema_name)
+        try:
+            yield conn, schema_name
+        finally:
+            conn.rollback()
+            conn.execute(f'DROP SCHEMA IF EXISTS "{schema_name}" CASCADE')
+            conn.commit()
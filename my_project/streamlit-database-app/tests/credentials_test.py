@@ -0,0 +1,76 @@
+import statistics
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("psycopg_pool")
+
+from credentials import OAuthCredentialProvider
+from db import create_pool
+
+
+class FakeTokenSource:
+    def __init__(self, lifetime):
+        self.lifetime = lifetime
+        self.issued = 0
+
+    def __call__(self):
+        self.issued += 1
+        return f"token-{self.issued}", time.time() + self.lifetime
+
+
+def p99(samples):
+    return statistics.quantiles(samples, n=100)[98]
+
+
+def measure_checkouts(pool, duration, workers=8):
+    samples = []
+    deadline = time.time() + duration
+
+    def worker():
+        while time.time() < deadline:
+            start = time.perf_counter()
+            with pool.connection() as conn:
+                samples.append(time.perf_counter() - start)
+                conn.execute("SELECT 1")
+
+    threads = [threading.Thread(target=worker) for _ in range(workers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return samples
+
+
+def test_refresh_ahead_of_expiry():
+    source = FakeTokenSource(lifetime=10)
+    provider = OAuthCredentialProvider(source, refresh_interval=900, refresh_margin=3)
+    assert provider.get_password() == "token-1"
+    assert 6 <= provider.seconds_until_refresh() <= 7
+
+
+def test_token_already_inside_the_margin_is_refetched_after_a_back_off():
+    source = FakeTokenSource(lifetime=60)
+    provider = OAuthCredentialProvider(source, refresh_interval=900, refresh_margin=300, retry_interval=10)
+    provider.get_password()
+    assert 9 <= provider.seconds_until_refresh() <= 10
+
+
+def test_p99_checkout_latency_flat_across_rotation(pg_conninfo):
+    source = FakeTokenSource(lifetime=3600)
+    provider = OAuthCredentialProvider(source, refresh_interval=1).start()
+    pool = create_pool(pg_conninfo, provider, min_size=4, max_size=8, max_lifetime=2)
+    try:
+        pool.wait()
+        before = measure_checkouts(pool, duration=0.8)
+        during = measure_checkouts(pool, duration=3)
+        assert provider.refresh_count >= 2
+
+        with pool.connection() as conn:
+            assert conn.info.password != "token-1"
+
+        assert p99(during) <= max(5 * p99(before), 0.05)
+    finally:
+        pool.close()
+        provider.stop()
@@ -0,0 +1,64 @@
+import pytest
+
+pytest.importorskip("psycopg_pool")
+
+import db_metrics
+from db import create_pool
+from db_metrics import DbMetrics, render_prometheus
+
+
+class StaticPassword:
+    refresh_count = 1
+    refresh_failures = 0
+    last_refresh = 0
+    last_refresh_seconds = 0.05
+
+    def get_password(self):
+        return None
+
+
+@pytest.fixture
+def metrics(monkeypatch):
+    metrics = DbMetrics(slow_query_ms=50)
+    monkeypatch.setattr(db_metrics, "db_metrics", metrics)
+    return metrics
+
+
+def test_statements_are_timed_per_operation_and_slow_ones_logged(pg_conninfo, metrics):
+    with create_pool(pg_conninfo, StaticPassword(), min_size=1, max_size=1) as pool:
+        with metrics.track("list_enrollments") as timer, pool.connection() as conn:
+            timer.rows = len(conn.execute("SELECT generate_series(1, 3)").fetchall())
+            conn.execute("SELECT pg_sleep(0.1)")
+        with pytest.raises(ZeroDivisionError), metrics.track("save_enrollment"), pool.connection() as conn:
+            conn.execute("SELECT 1")
+            1 / 0
+
+    operations = metrics.operations()
+    assert operations["list_enrollments"]["calls"] == 1 and operations["list_enrollments"]["rows"] == 3
+    assert operations["save_enrollment"]["errors"] == 1
+    statements = metrics.statements()
+    assert statements["list_enrollments"]["statements"] == 2 and statements["list_enrollments"]["slow"] == 1
+    assert statements["save_enrollment"]["statements"] == 1
+    (slow,) = metrics.slow_queries()
+    assert slow["operation"] == "list_enrollments" and slow["sql"] == "SELECT pg_sleep(0.1)"
+
+
+def test_render_prometheus(pg_conninfo, metrics):
+    metrics.observe("list_enrollments", 0.02, rows=25)
+    metrics.observe("list_enrollments", 3.0, error=True)
+    with create_pool(pg_conninfo, StaticPassword(), min_size=2, max_size=4) as pool:
+        pool.wait()
+        with pool.connection():
+            text = render_prometheus(metrics, pools={"app": pool}, pools_created=1,
+                                     credential_provider=StaticPassword())
+
+    lines = text.splitlines()
+    assert 'hets_db_operation_seconds_bucket{operation="list_enrollments",le="0.025"} 1' in lines
+    assert 'hets_db_operation_seconds_bucket{operation="list_enrollments",le="+Inf"} 2' in lines
+    assert 'hets_db_operation_seconds_count{operation="list_enrollments"} 2' in lines
+    assert 'hets_db_operation_errors_total{operation="list_enrollments"} 1' in lines
+    assert 'hets_db_operation_rows_total{operation="list_enrollments"} 25' in lines
+    assert 'hets_db_pool_connections{pool="app",state="active"} 1' in lines
+    assert 'hets_db_pool_connections{pool="app",state="idle"} 1' in lines
+    assert 'hets_db_pool_max_size{pool="app"} 4' in lines
+    assert "hets_db_token_refresh_seconds 0.05" in lines
@@ -0,0 +1,156 @@
+import uuid
+from datetime import date
+
+import pytest
+
+pytest.importorskip("psycopg")
+
+from enrollments import (
+    ATTESTATION_TEXT, find_enrollment, insert_enrollment, list_enrollments, search_providers,
+    search_terms
+)
+
+
+def key():
+    return str(uuid.uuid4())
+
+
+def seed_providers(conn, schema_name, count):
+    with conn.cursor() as cur:
+        for i in range(count):
+            cur.execute(
+                f'INSERT INTO "{schema_name}".hets_providers '
+                "(authorized_signatory_name, organization_name, email_address, ptan, npi, created_at) "
+                "VALUES (%s, %s, %s, %s, %s, TIMESTAMP '2025-01-01' + %s * INTERVAL '1 minute') "
+                "RETURNING provider_id",
+                (f"Signatory {i}", f"Org {i}", f"org{i}@example.com", f"PTAN{i:05d}", f"{i:010d}", i // 3),
+            )
+            provider_id = cur.fetchone()[0]
+            cur.execute(
+                f'INSERT INTO "{schema_name}".hets_vendor_relationships '
+                "(provider_id, vendor_clearinghouse_name, effective_date) VALUES (%s, %s, %s)",
+                (provider_id, "Clearinghouse", date(2025, 1, 1)),
+            )
+    conn.commit()
+
+
+def test_keyset_pages_cover_every_provider_once(hets_schema):
+    conn, schema_name = hets_schema
+    seed_providers(conn, schema_name, 23)
+
+    seen, after, pages = [], None, 0
+    while True:
+        rows, after = list_enrollments(conn, schema_name, page_size=5, after=after)
+        seen.extend(row[0] for row in rows)
+        pages += 1
+        if after is None:
+            break
+
+    assert pages == 5
+    assert len(seen) == len(set(seen)) == 23
+    assert seen == [row[0] for row in conn.execute(
+        f'SELECT provider_id FROM "{schema_name}".hets_providers ORDER BY created_at DESC, provider_id DESC'
+    )]
+
+
+def test_filters_are_applied_in_sql(hets_schema):
+    conn, schema_name = hets_schema
+    seed_providers(conn, schema_name, 6)
+
+    rows, after = list_enrollments(conn, schema_name, filters={"npi": "0000000004"})
+    assert [row[5] for row in rows] == ["0000000004"]
+    assert after is None
+
+    rows, _ = list_enrollments(conn, schema_name, filters={"vendor": "clearinghouse", "statuses": ["Active"]})
+    assert len(rows) == 6
+
+    rows, _ = list_enrollments(conn, schema_name, filters={"statuses": ["Terminated"]})
+    assert rows == []
+
+
+def sample_enrollment(**provider_overrides):
+    provider_data = {
+        'authorized_signatory_name': 'Jane Doe', 'title': 'CEO', 'organization_name': 'Doe Clinic',
+        'email_address': 'jane@example.com', 'alternate_email_address': None, 'phone_number': '555-0100',
+        'ptan': 'PTAN12345', 'npi': '1234567893', 'tax_id': '12-3456789', 'organization_type': 'Clinic',
+        **provider_overrides
+    }
+    vendor_data = {
+        'vendor_clearinghouse_name': 'Clearinghouse', 'vendor_contact_name': None,
+        'vendor_contact_email': None, 'vendor_contact_phone': None, 'effective_date': date(2025, 1, 1),
+        'termination_date': None, 'offshore_data_sharing_consent': True, 'relationship_status': 'Active'
+    }
+    attestation_data = {'attestation_text': ATTESTATION_TEXT, 'attested_by': 'Jane Doe', 'ip_address': 'system'}
+    return provider_data, vendor_data, attestation_data
+
+
+def test_insert_enrollment_writes_all_four_tables(hets_schema):
+    conn, schema_name = hets_schema
+    provider_id, outcome = insert_enrollment(conn, schema_name, *sample_enrollment(), key())
+
+    assert outcome == "created"
+    assert not conn.autocommit
+    for table in ("hets_vendor_relationships", "hets_attestations", "hets_submission_history"):
+        assert conn.execute(
+            f'SELECT COUNT(*) FROM "{schema_name}".{table} WHERE provider_id = %s', (provider_id,)
+        ).fetchone()[0] == 1
+
+
+def test_replayed_submission_is_a_no_op_and_npi_ptan_is_upserted(hets_schema):
+    conn, schema_name = hets_schema
+    provider_id, _ = insert_enrollment(conn, schema_name, *sample_enrollment(), key())
+
+    submission = key()
+    args = (conn, schema_name, *sample_enrollment(title='Director'), submission)
+    assert insert_enrollment(*args) == (provider_id, "updated")
+    assert insert_enrollment(*args) == (provider_id, "replayed")
+
+    assert conn.execute(f'SELECT COUNT(*), MAX(title) FROM "{schema_name}".hets_providers').fetchone() == (1, "Director")
+    assert conn.execute(
+        f'SELECT COUNT(*) FROM "{schema_name}".hets_submission_history WHERE provider_id = %s', (provider_id,)
+    ).fetchone()[0] == 2
+    assert find_enrollment(conn, schema_name, "1234567893", "PTAN12345")[0] == provider_id
+
+
+def test_search_terms():
+    assert search_terms("  Acme  cli") == "acme:* & cli:*"
+    assert search_terms("O'Brien & Co") == "o:* & brien:* & co:*"
+    assert search_terms(" - ") is None
+
+
+def test_search_ranks_organizations_over_signatories_and_vendors(hets_schema):
+    conn, schema_name = hets_schema
+    insert_enrollment(conn, schema_name, *sample_enrollment(organization_name="Summit Health Partners"), key())
+    insert_enrollment(conn, schema_name, *sample_enrollment(
+        organization_name="Lakeside Clinic", authorized_signatory_name="Ann Summers",
+        ptan="PTAN54321", npi="1234567901"), key())
+    provider_data, vendor_data, attestation_data = sample_enrollment(
+        organization_name="Riverside Clinic", ptan="PTAN99999", npi="1245319599")
+    vendor_data["vendor_clearinghouse_name"] = "Summa Claims Exchange"
+    insert_enrollment(conn, schema_name, provider_data, vendor_data, attestation_data, key())
+
+    results = search_providers(conn, schema_name, "sum")
+    assert [row[1] for row in results] == ["Summit Health Partners", "Lakeside Clinic", "Riverside Clinic"]
+    assert results[2][5] == "Summa Claims Exchange"
+
+    assert [row[1] for row in search_providers(conn, schema_name, "summit hea")] == ["Summit Health Partners"]
+    assert len(search_providers(conn, schema_name, "clinic", limit=1)) == 1
+    assert search_providers(conn, schema_name, "nothing here") == []
+    assert search_providers(conn, schema_name, "") == []
+
+
+def test_search_ranks_beyond_the_candidate_cap(hets_schema, monkeypatch):
+    import enrollments
+
+    conn, schema_name = hets_schema
+    monkeypatch.setattr(enrollments, "SEARCH_CANDIDATES", 3)
+    # Signatory matches (weight B) stored ahead of the one organization match (weight A)
+    for i, npi in enumerate(["1234567901", "1245319599", "1234567893", "1234567802", "1234567810"]):
+        insert_enrollment(conn, schema_name, *sample_enrollment(
+            organization_name=f"Clinic {i}", authorized_signatory_name="Ann Summers", ptan=f"PTAN0000{i}", npi=npi
+        ), key())
+    insert_enrollment(conn, schema_name, *sample_enrollment(
+        organization_name="Summit Health Partners", ptan="PTAN99999", npi="1234567828"), key())
+
+    results = search_providers(conn, schema_name, "sum")
+    assert [row[1] for row in results] == ["Summit Health Partners", "Clinic 0", "Clinic 1"]
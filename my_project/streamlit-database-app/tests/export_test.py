@@ -0,0 +1,50 @@
+import csv
+import io
+import uuid
+
+import pytest
+
+pytest.importorskip("psycopg")
+
+from enrollments import insert_enrollment
+from enrollments_test import sample_enrollment, seed_providers
+from export import coalesce, export_enrollments
+
+
+def test_coalesce_joins_blocks_into_bounded_chunks():
+    stats = {}
+    chunks = list(coalesce([b"header\n"] + [b"row\n"] * 10, size=12, stats=stats))
+    assert b"".join(chunks) == b"header\n" + b"row\n" * 10
+    assert all(len(chunk) < 12 + 4 for chunk in chunks) and len(chunks) == 4
+    assert stats["rows"] == 10
+
+
+def test_csv_export_round_trips_quoted_and_multiline_text(hets_schema):
+    conn, schema_name = hets_schema
+    seed_providers(conn, schema_name, 5)
+    insert_enrollment(conn, schema_name, *sample_enrollment(
+        organization_name='Doe, "Family" Clinic', title="Chief\nExecutive"), str(uuid.uuid4()))
+
+    stats = {}
+    data = b"".join(export_enrollments(conn, schema_name, "csv", stats=stats))
+    rows = list(csv.DictReader(io.StringIO(data.decode())))
+    assert stats["rows"] == len(rows) == 6
+    assert [int(row["provider_id"]) for row in rows] == sorted(int(row["provider_id"]) for row in rows)
+    assert rows[-1]["organization_name"] == 'Doe, "Family" Clinic'
+    assert rows[-1]["title"] == "Chief\nExecutive"
+
+
+def test_parquet_export_writes_one_row_group_per_batch(hets_schema):
+    pq = pytest.importorskip("pyarrow.parquet")
+    conn, schema_name = hets_schema
+    seed_providers(conn, schema_name, 7)
+
+    stats = {}
+    chunks = list(export_enrollments(conn, schema_name, "parquet", batch_rows=3, stats=stats))
+    parquet = pq.ParquetFile(io.BytesIO(b"".join(chunks)))
+    assert len(chunks) == 4 and parquet.metadata.num_row_groups == 3
+    table = parquet.read()
+    assert stats["rows"] == table.num_rows == 7
+    assert str(table.schema.field("provider_id").type) == "int32"
+    assert str(table.schema.field("effective_date").type) == "date32[day]"
+    assert table.column("organization_name").to_pylist() == [f"Org {i}" for i in range(7)]
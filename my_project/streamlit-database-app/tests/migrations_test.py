@@ -0,0 +1,27 @@
+import uuid
+
+import pytest
+
+psycopg = pytest.importorskip("psycopg")
+
+from migrations import load_migrations, migrate
+
+
+def test_schema_sql_is_version_one():
+    migrations = load_migrations()
+    assert migrations[0][:2] == (1, "schema")
+    assert [m[0] for m in migrations] == sorted(m[0] for m in migrations)
+
+
+def test_migrate_applies_each_version_once(pg_conninfo):
+    schema_name = f"hets_test_{uuid.uuid4().hex[:8]}"
+    with psycopg.connect(pg_conninfo, autocommit=True) as conn:
+        try:
+            applied = migrate(conn, schema_name)
+            assert applied == [m[0] for m in load_migrations()]
+            assert migrate(conn, schema_name) == []
+            assert conn.execute(
+                "SELECT to_regclass(%s)", (f"{schema_name}.v_submission_summary",)
+            ).fetchone()[0] is not None
+        finally:
+            conn.execute(f'DROP SCHEMA IF EXISTS "{schema_name}" CASCADE')
@@ -0,0 +1,94 @@
+import time
+import uuid
+
+import pytest
+
+pytest.importorskip("psycopg")
+
+from enrollments import insert_enrollment
+from enrollments_test import sample_enrollment
+from partitions import PartitionMaintainer, add_months, archive_partitions, current_month, ensure_partitions
+from provider_summary import find_drift
+
+
+def test_rows_route_to_monthly_partitions_created_ahead(hets_schema):
+    conn, schema_name = hets_schema
+    month = current_month(conn)
+    conn.commit()
+    created = ensure_partitions(conn, schema_name, months_ahead=3)
+    # The legacy partition takes rows until two months from now
+    assert created == [
+        f"{table}_{add_months(month, n):%Y_%m}"
+        for table in ("hets_submission_history", "hets_attestations") for n in (2, 3)
+    ]
+    assert ensure_partitions(conn, schema_name, months_ahead=3) == []
+
+    provider_id, _ = insert_enrollment(conn, schema_name, *sample_enrollment(), str(uuid.uuid4()))
+    conn.execute(
+        f'UPDATE "{schema_name}".hets_submission_history SET submission_date = %s WHERE provider_id = %s',
+        (add_months(month, 3), provider_id)
+    )
+    partition = conn.execute(
+        f'SELECT tableoid::regclass::text FROM "{schema_name}".hets_submission_history WHERE provider_id = %s',
+        (provider_id,)
+    ).fetchone()[0]
+    assert partition.endswith(f"hets_submission_history_{add_months(month, 3):%Y_%m}")
+    conn.commit()
+
+
+def test_archived_partitions_are_exported_and_still_counted(hets_schema, tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    conn, schema_name = hets_schema
+    key = str(uuid.uuid4())
+    provider_id, _ = insert_enrollment(conn, schema_name, *sample_enrollment(), key)
+    insert_enrollment(conn, schema_name, *sample_enrollment(title="Director"), str(uuid.uuid4()))
+    ensure_partitions(conn, schema_name, months_ahead=2)
+    summary_sql = (f'SELECT total_submissions, attestation_count, last_submission_date '
+                   f'FROM "{schema_name}".hets_provider_summary WHERE provider_id = %s')
+    before = conn.execute(summary_sql, (provider_id,)).fetchone()
+    first_month = add_months(current_month(conn), 2)
+    conn.commit()
+
+    archived = archive_partitions(conn, schema_name, str(tmp_path), retention_months=0,
+                                  month=add_months(first_month, 1))
+    assert {name: rows for name, rows, _ in archived} == {
+        "hets_submission_history_legacy": 2, "hets_attestations_legacy": 2,
+        f"hets_submission_history_{first_month:%Y_%m}": 0, f"hets_attestations_{first_month:%Y_%m}": 0,
+    }
+    table = pq.read_table(tmp_path / "hets_attestations" / "hets_attestations_legacy.parquet")
+    assert table.num_rows == 2 and "attestation_text" in table.column_names
+    assert conn.execute(f'SELECT COUNT(*) FROM "{schema_name}".hets_attestations').fetchone()[0] == 0
+
+    assert conn.execute(summary_sql, (provider_id,)).fetchone() == before
+    assert find_drift(conn, schema_name) == []
+    conn.commit()
+    # Idempotency keys outlive the archived history
+    assert insert_enrollment(conn, schema_name, *sample_enrollment(), key) == (provider_id, "replayed")
+
+
+def test_maintainer_keeps_creating_partitions_until_stopped(hets_schema, pg_conninfo):
+    import psycopg
+
+    conn, schema_name = hets_schema
+    month = current_month(conn)
+    conn.commit()
+    attempts = []
+
+    def connection():
+        # The first check fails, as when the database is briefly unreachable
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise psycopg.OperationalError("connection refused")
+        return psycopg.connect(pg_conninfo)
+
+    maintainer = PartitionMaintainer(connection, schema_name, interval=0.05, months_ahead=4).start()
+    try:
+        for _ in range(100):
+            if len(attempts) > 2:
+                break
+            time.sleep(0.05)
+    finally:
+        maintainer.stop(timeout=5)
+    assert not maintainer.is_alive()
+    names = {row[0] for row in conn.execute(f'SELECT partition_name FROM "{schema_name}".hets_partitions')}
+    assert f"hets_attestations_{add_months(month, 4):%Y_%m}" in names
@@ -0,0 +1,124 @@
+import uuid
+
+import pytest
+
+pytest.importorskip("psycopg")
+
+from enrollments import insert_enrollment
+from enrollments_test import sample_enrollment
+from provider_summary import find_drift, get_provider_summary, rebuild
+
+
+def summary(conn, schema_name, provider_id):
+    row = conn.execute(
+        f'SELECT total_submissions, vendor_count, active_relationships, attestation_count '
+        f'FROM "{schema_name}".hets_provider_summary WHERE provider_id = %s', (provider_id,)
+    ).fetchone()
+    conn.commit()
+    return row
+
+
+def test_summary_follows_inserts_upserts_updates_and_deletes(hets_schema):
+    conn, schema_name = hets_schema
+    provider_id, _ = insert_enrollment(conn, schema_name, *sample_enrollment(), str(uuid.uuid4()))
+    assert summary(conn, schema_name, provider_id) == (1, 1, 1, 1)
+
+    insert_enrollment(conn, schema_name, *sample_enrollment(title="Director"), str(uuid.uuid4()))
+    assert summary(conn, schema_name, provider_id) == (2, 2, 2, 2)
+
+    conn.execute(
+        f'UPDATE "{schema_name}".hets_vendor_relationships SET relationship_status = %s '
+        "WHERE relationship_id = (SELECT MIN(relationship_id) FROM "
+        f'"{schema_name}".hets_vendor_relationships WHERE provider_id = %s)',
+        ("Terminated", provider_id)
+    )
+    conn.execute(f'DELETE FROM "{schema_name}".hets_attestations WHERE provider_id = %s', (provider_id,))
+    conn.commit()
+    assert summary(conn, schema_name, provider_id) == (2, 2, 1, 0)
+
+    name, email, active, attestations, last_activity = get_provider_summary(conn, schema_name, provider_id)
+    assert (name, email, active, attestations) == ("Doe Clinic", "jane@example.com", 1, 0)
+    assert last_activity is not None
+    assert conn.execute(
+        f'SELECT total_submissions, vendor_count FROM "{schema_name}".v_submission_summary'
+    ).fetchall() == [(2, 2)]
+    assert find_drift(conn, schema_name) == []
+
+
+def test_rebuild_repairs_drift(hets_schema):
+    conn, schema_name = hets_schema
+    provider_id, _ = insert_enrollment(conn, schema_name, *sample_enrollment(), str(uuid.uuid4()))
+    conn.execute(f'UPDATE "{schema_name}".hets_provider_summary SET vendor_count = 7')
+    conn.commit()
+
+    drift = find_drift(conn, schema_name)
+    assert [(current[0], current[3], rebuilt[3]) for current, rebuilt in drift] == [(provider_id, 7, 1)]
+    assert summary(conn, schema_name, provider_id)[1] == 7
+
+    assert rebuild(conn, schema_name) == 1
+    assert summary(conn, schema_name, provider_id) == (1, 1, 1, 1)
+    assert find_drift(conn, schema_name) == []
+
+
+def run_while_waiting(conn, pg_conninfo, schema_name, statement, params):
+    """Run ``statement`` on another connection until it waits for a lock ``conn``'s open
+    transaction holds; commit ``conn``, let the other one finish and return its errors."""
+    import threading
+
+    import psycopg
+
+    errors = []
+
+    def other_writer():
+        try:
+            with psycopg.connect(pg_conninfo) as other:
+                other.execute(statement, params)
+        except psycopg.Error as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=other_writer)
+    thread.start()
+    for _ in range(100):
+        waiting = conn.execute(
+            "SELECT COUNT(*) FROM pg_locks l JOIN pg_stat_activity a USING (pid) "
+            "WHERE NOT l.granted AND a.query LIKE %s", (f"%{schema_name}%",)
+        ).fetchone()[0]
+        if waiting or not thread.is_alive():
+            break
+        thread.join(0.05)
+    conn.commit()
+    thread.join()
+    return errors
+
+
+def test_overlapping_refreshes_of_one_provider_both_commit(hets_schema, pg_conninfo):
+    conn, schema_name = hets_schema
+    provider_id, _ = insert_enrollment(conn, schema_name, *sample_enrollment(), str(uuid.uuid4()))
+    conn.commit()
+    refresh = f'SELECT "{schema_name}".refresh_provider_summary(ARRAY[%s])'
+
+    conn.execute(refresh, (provider_id,))
+    assert run_while_waiting(conn, pg_conninfo, schema_name, refresh, (provider_id,)) == []
+    assert summary(conn, schema_name, provider_id) == (1, 1, 1, 1)
+
+
+def test_refresh_keeps_a_concurrent_insert(hets_schema, pg_conninfo):
+    conn, schema_name = hets_schema
+    provider_id, _ = insert_enrollment(conn, schema_name, *sample_enrollment(), str(uuid.uuid4()))
+    conn.commit()
+
+    # Applied to the summary as a delta, not yet committed
+    conn.execute(
+        f'INSERT INTO "{schema_name}".hets_submission_history (provider_id, submission_type, status) '
+        "VALUES (%s, %s, %s)", (provider_id, "Update", "Submitted")
+    )
+    # Recomputes the provider's summary meanwhile
+    errors = run_while_waiting(
+        conn, pg_conninfo, schema_name,
+        f'UPDATE "{schema_name}".hets_vendor_relationships SET relationship_status = %s WHERE provider_id = %s',
+        ("Terminated", provider_id)
+    )
+
+    assert errors == []
+    assert summary(conn, schema_name, provider_id) == (2, 1, 0, 1)
+    assert find_drift(conn, schema_name) == []
@@ -0,0 +1,111 @@
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("psycopg")
+
+from query_cache import QueryCache, listen_for_changes, notify_change
+
+
+def run_viewers(cache, viewers, loader):
+    barrier = threading.Barrier(viewers)
+    results = []
+
+    def viewer():
+        barrier.wait()
+        results.append(cache.get_or_load(("list_enrollments", "page-1"), loader))
+
+    threads = [threading.Thread(target=viewer) for _ in range(viewers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
+
+def test_concurrent_viewers_cost_one_query_per_write():
+    cache = QueryCache(ttl=60)
+    queries = []
+
+    def loader():
+        queries.append(1)
+        time.sleep(0.05)
+        return len(queries)
+
+    for write in range(3):
+        for rerun in range(5):
+            results = run_viewers(cache, 20, loader)
+            assert results == [write + 1] * 20
+        cache.invalidate()
+
+    assert len(queries) == 3
+    stats = cache.stats()
+    assert stats["misses"] == 3
+    assert stats["hits"] == 3 * 5 * 20 - 3
+
+
+def test_entries_expire_and_are_bounded():
+    cache = QueryCache(max_entries=2, ttl=0.05)
+    for key in "abc":
+        cache.get_or_load(key, lambda: key)
+    assert cache.stats()["entries"] == 2
+    time.sleep(0.06)
+    cache.get_or_load("c", lambda: "reloaded")
+    assert cache.stats()["misses"] == 4
+
+
+def test_load_started_before_invalidation_is_not_stored():
+    cache = QueryCache()
+    started = threading.Event()
+
+    def slow_loader():
+        started.set()
+        time.sleep(0.05)
+        return "stale"
+
+    t = threading.Thread(target=cache.get_or_load, args=("k", slow_loader))
+    t.start()
+    started.wait()
+    cache.invalidate()
+    t.join()
+    assert cache.get_or_load("k", lambda: "fresh") == "fresh"
+
+
+def test_notify_invalidates_other_replicas(pg_conninfo):
+    psycopg = pytest.importorskip("psycopg")
+    cache = QueryCache()
+    failures = []
+
+    def on_change(conn):
+        failures.append(1)
+        raise RuntimeError("metrics backend unavailable")
+
+    listener = listen_for_changes(lambda: psycopg.connect(pg_conninfo, autocommit=True), "hets_test",
+                                  cache=cache, on_change=on_change)
+    assert listen_for_changes(None, "hets_test", cache=cache) is listener
+    # Each cache gets its own listener
+    other = listen_for_changes(lambda: psycopg.connect(pg_conninfo, autocommit=True), "hets_test",
+                               cache=QueryCache())
+    assert other is not listener
+    other.stop()
+
+    deadline = time.time() + 5
+    while cache.invalidations == 0 and time.time() < deadline:
+        time.sleep(0.01)
+    cache.get_or_load("k", lambda: "cached")
+    invalidations = cache.invalidations
+
+    with psycopg.connect(pg_conninfo) as conn:
+        with conn.cursor() as cur:
+            notify_change(cur, "hets_test")
+        conn.commit()
+
+    while cache.invalidations == invalidations and time.time() < deadline:
+        time.sleep(0.01)
+    # Invalidation carries on although the callback keeps failing
+    assert cache.get_or_load("k", lambda: "fresh") == "fresh"
+    assert len(failures) == 2
+
+    listener.stop(timeout=5)
+    assert not listener.is_alive()
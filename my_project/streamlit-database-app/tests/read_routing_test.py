@@ -0,0 +1,76 @@
+import os
+import time
+
+import pytest
+
+psycopg = pytest.importorskip("psycopg")
+pytest.importorskip("psycopg_pool")
+
+import db
+
+
+class StaticPassword:
+    def get_password(self):
+        return None
+
+
+@pytest.fixture
+def replica_conninfo():
+    """A streaming standby of HETS_TEST_PG_CONNINFO (HETS_TEST_PG_REPLICA_CONNINFO)."""
+    conninfo = os.getenv("HETS_TEST_PG_REPLICA_CONNINFO")
+    if not conninfo:
+        pytest.skip("HETS_TEST_PG_REPLICA_CONNINFO is not set")
+    return conninfo
+
+
+@pytest.fixture
+def pools(monkeypatch, pg_conninfo, replica_conninfo):
+    primary = db.create_pool(pg_conninfo, StaticPassword(), min_size=1, max_size=2)
+    replica = db.create_pool(replica_conninfo, StaticPassword(), min_size=1, max_size=2)
+    for name, value in (("connection_pool", primary), ("read_pool", replica), ("_required_lsn", 0),
+                        ("_replayed_lsn", 0), ("read_fallbacks", 0)):
+        monkeypatch.setattr(db, name, value)
+    yield primary, replica
+    primary.close()
+    replica.close()
+
+
+def wait_for_row(conninfo, query, timeout=10):
+    deadline = time.monotonic() + timeout
+    with psycopg.connect(conninfo, autocommit=True) as conn:
+        while conn.execute(query).fetchone() is None:
+            assert time.monotonic() < deadline, "replica did not catch up"
+            time.sleep(0.05)
+
+
+def test_reads_see_own_writes_while_the_replica_lags(hets_schema, replica_conninfo, pools):
+    conn, schema_name = hets_schema
+    primary, _ = pools
+    wait_for_row(replica_conninfo, f"SELECT 1 FROM pg_namespace WHERE nspname = '{schema_name}'")
+
+    with db.get_read_connection() as read:
+        assert read.execute("SELECT pg_is_in_recovery()").fetchone()[0]
+
+    with psycopg.connect(replica_conninfo, autocommit=True) as standby:
+        standby.execute("SELECT pg_wal_replay_pause()")
+        try:
+            with primary.connection() as write:
+                write.execute(
+                    f'INSERT INTO "{schema_name}".hets_providers (authorized_signatory_name, email_address, ptan, npi) '
+                    "VALUES ('Jane Doe', 'jane@example.com', 'PTAN1', '1234567893')"
+                )
+                write.commit()
+                db.record_write(write)
+
+            with db.get_read_connection() as read:
+                assert not read.execute("SELECT pg_is_in_recovery()").fetchone()[0]
+                assert read.execute(f'SELECT COUNT(*) FROM "{schema_name}".hets_providers').fetchone()[0] == 1
+            assert db.read_fallbacks == 1
+        finally:
+            standby.execute("SELECT pg_wal_replay_resume()")
+
+    wait_for_row(replica_conninfo, f'SELECT 1 FROM "{schema_name}".hets_providers')
+    with db.get_read_connection() as read:
+        assert read.execute("SELECT pg_is_in_recovery()").fetchone()[0]
+        assert read.execute(f'SELECT COUNT(*) FROM "{schema_name}".hets_providers').fetchone()[0] == 1
+    assert db.read_fallbacks == 1
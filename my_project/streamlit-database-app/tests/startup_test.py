@@ -0,0 +1,43 @@
+import threading
+
+import pytest
+
+import startup
+
+
+@pytest.fixture(autouse=True)
+def fresh_process(monkeypatch):
+    monkeypatch.setattr(startup, "_warm_up", None)
+
+
+def test_warm_up_runs_phases_in_the_background_and_retries_after_a_failure():
+    release = threading.Event()
+    attempts = []
+
+    def connect():
+        attempts.append(len(attempts))
+        if len(attempts) == 1:
+            raise ConnectionError("token endpoint unavailable")
+
+    phases = [("pools", connect), ("migrations", release.wait)]
+    warm_up = startup.warm_up(phases)
+    with pytest.raises(ConnectionError):
+        warm_up.wait(5)
+    assert warm_up.phase == "pools" and warm_up.timings == {}
+
+    warm_up = startup.warm_up(phases)
+    with pytest.raises(TimeoutError):
+        warm_up.wait(0.05)
+    assert not warm_up.ready and startup.warm_up(phases) is warm_up
+    release.set()
+    assert warm_up.wait(5).ready
+    assert list(warm_up.timings) == ["pools", "migrations"]
+    assert startup.warm_up(phases) is warm_up and len(attempts) == 2
+
+
+def test_import_profile_attributes_time_to_packages():
+    total, packages = startup.import_profile("sqlite3")
+    assert {"sqlite3", "_sqlite3"} <= set(packages)
+    # Imported by the interpreter itself, before -c runs
+    assert "encodings" not in packages
+    assert sum(packages.values()) == pytest.approx(total, rel=0.01)
@@ -0,0 +1,130 @@
+import uuid
+from contextlib import contextmanager
+from datetime import date
+
+import pytest
+
+pytest.importorskip("psycopg")
+
+from enrollments_test import sample_enrollment
+from submission_queue import SubmissionQueue, postgres_writer
+
+
+def test_failed_flushes_are_retried_and_survive_a_restart(tmp_path):
+    path = str(tmp_path / "queue.db")
+    queue = SubmissionQueue(path, retry_interval=0)
+    assert queue.enqueue("hets", "first", *sample_enrollment())
+    assert not queue.enqueue("hets", "first", *sample_enrollment())
+    assert queue.enqueue("hets", "second", *sample_enrollment(npi="1234567801"))
+
+    def unreachable(submissions):
+        raise ConnectionError("database is starting up")
+
+    assert queue.flush(unreachable) == 0
+    status = queue.status("first")
+    assert status["state"] == "pending" and status["attempts"] == 1
+    assert status["last_error"] == "ConnectionError: database is starting up"
+    assert queue.stats()["pending"] == queue.stats()["failing"] == 2
+
+    # A new process picks up where the last one stopped
+    queue = SubmissionQueue(path, retry_interval=0)
+    written = []
+
+    def write_batch(submissions):
+        written.extend(submissions)
+        return [(i, "created") for i, _ in enumerate(submissions, 1)]
+
+    assert queue.flush(write_batch) == 2
+    assert [s.submission_id for s in written] == ["first", "second"]
+    assert written[1].provider_data["npi"] == "1234567801"
+    assert written[0].vendor_data["effective_date"] == date(2025, 1, 1)
+    assert queue.status("second") == {
+        "state": "flushed", "provider_id": 2, "outcome": "created", "attempts": 2, "last_error": None
+    }
+    assert queue.stats()["pending"] == 0
+    assert queue.flush(write_batch) == 0
+
+
+def test_a_batch_replayed_after_a_crash_is_recorded_once(tmp_path, hets_schema):
+    conn, schema_name = hets_schema
+
+    @contextmanager
+    def connection():
+        yield conn
+
+    queue = SubmissionQueue(str(tmp_path / "queue.db"))
+    submission_id = str(uuid.uuid4())
+    queue.enqueue(schema_name, submission_id, *sample_enrollment())
+    queue.enqueue(schema_name, str(uuid.uuid4()), *sample_enrollment(npi="12345678", ptan=None))
+    write_batch = postgres_writer(connection)
+
+    # Written to Postgres, but the app stopped before the queue marked it flushed
+    ((provider_id, outcome), rejected) = write_batch(queue._due())
+    assert outcome == "created" and isinstance(rejected, Exception)
+
+    assert queue.flush(write_batch) == 1
+    assert queue.status(submission_id)["provider_id"] == provider_id
+    assert queue.status(submission_id)["outcome"] == "replayed"
+    assert queue.stats() == {"pending": 0, "failing": 0, "failed": 1, "oldest_pending_seconds": 0}
+    assert conn.execute(f'SELECT COUNT(*) FROM "{schema_name}".hets_providers').fetchone()[0] == 1
+
+
+def test_rejected_submissions_fail_for_good(tmp_path, hets_schema):
+    conn, schema_name = hets_schema
+
+    @contextmanager
+    def connection():
+        yield conn
+
+    queue = SubmissionQueue(str(tmp_path / "queue.db"), retry_interval=0)
+    # Longer than hets_providers.phone_number, VARCHAR(20)
+    provider_data, vendor_data, attestation_data = sample_enrollment()
+    too_long = str(uuid.uuid4())
+    queue.enqueue(schema_name, too_long, dict(provider_data, phone_number="5" * 21), vendor_data, attestation_data)
+    queue.enqueue(schema_name, str(uuid.uuid4()), *sample_enrollment(npi="1234567801"))
+
+    assert queue.flush(postgres_writer(connection)) == 1
+    status = queue.status(too_long)
+    assert status["state"] == "failed" and status["attempts"] == 1
+    assert status["last_error"].startswith("StringDataRightTruncation: ")
+    assert queue.stats()["failed"] == 1 and queue.stats()["pending"] == 0
+    assert queue.flush(postgres_writer(connection)) == 0
+    assert queue.status(too_long)["attempts"] == 1
+
+
+def test_read_only_database_leaves_submissions_pending(tmp_path, hets_schema):
+    conn, schema_name = hets_schema
+
+    @contextmanager
+    def connection():
+        yield conn
+
+    queue = SubmissionQueue(str(tmp_path / "queue.db"), retry_interval=0)
+    submission_id = str(uuid.uuid4())
+    queue.enqueue(schema_name, submission_id, *sample_enrollment())
+    queue.enqueue(schema_name, str(uuid.uuid4()), *sample_enrollment(npi="1234567801"))
+
+    # As during a failover, when the old primary only accepts reads
+    conn.execute("SET default_transaction_read_only = on")
+    conn.commit()
+    try:
+        assert queue.flush(postgres_writer(connection)) == 0
+    finally:
+        conn.rollback()
+        conn.execute("SET default_transaction_read_only = off")
+        conn.commit()
+    status = queue.status(submission_id)
+    assert status["state"] == "pending" and status["last_error"].startswith("ReadOnlySqlTransaction: ")
+    assert queue.stats()["pending"] == 2 and queue.stats()["failed"] == 0
+
+    assert queue.flush(postgres_writer(connection)) == 2
+
+
+def test_queue_needs_a_configured_path(monkeypatch, tmp_path):
+    import submission_queue
+
+    monkeypatch.setattr(submission_queue, "_queue", None)
+    monkeypatch.delenv("HETS_QUEUE_PATH", raising=False)
+    assert submission_queue.get_queue() is None
+    monkeypatch.setenv("HETS_QUEUE_PATH", str(tmp_path / "queue.db"))
+    assert submission_queue.get_queue().path == str(tmp_path / "queue.db")
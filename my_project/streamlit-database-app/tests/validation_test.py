@@ -0,0 +1,78 @@
+from datetime import date
+
+import pytest
+
+pd = pytest.importorskip("pandas")
+
+from validation import npi_check_digit, validate_batch, validate_enrollment, validate_npi
+
+VALID = {
+    'authorized_signatory_name': 'Jane Doe',
+    'title': 'CEO',
+    'organization_name': 'Doe Clinic',
+    'email_address': 'jane@example.com',
+    'alternate_email_address': '',
+    'phone_number': '555-0100',
+    'ptan': 'PTAN12345',
+    'npi': '1234567893',
+    'tax_id': '12-3456789',
+    'organization_type': 'Clinic',
+    'vendor_clearinghouse_name': 'Clearinghouse',
+    'effective_date': '2025-01-01',
+    'termination_date': '',
+    'relationship_status': 'Active',
+    'attested_by': 'jane doe',
+}
+
+CASES = [
+    {},
+    {'npi': '1234567890'},
+    {'npi': '12345'},
+    {'email_address': 'jane@', 'alternate_email_address': 'also bad'},
+    {'ptan': 'P1'},
+    {'organization_type': 'Spaceport', 'relationship_status': 'Dormant'},
+    {'attested_by': 'John Roe'},
+    {'effective_date': '2025-02-01', 'termination_date': '2025-01-01'},
+    {'effective_date': 'yesterday'},
+    {'title': '', 'tax_id': '', 'effective_date': ''},
+    {'phone_number': '(555) 555-0100 ext. 12345', 'vendor_contact_name': 'x' * 256, 'title': 'x' * 100},
+]
+
+
+def test_npi_luhn_check_digit():
+    assert npi_check_digit('123456789') == 3
+    assert validate_npi('1234567893')
+    assert not validate_npi('1234567890')
+    assert not validate_npi('123456789X')
+
+
+def test_single_record_errors_are_structured():
+    assert validate_enrollment({**VALID, 'effective_date': date(2025, 1, 1)}) == []
+    codes = {(e.field, e.code) for e in validate_enrollment({**VALID, 'npi': '1234567890', 'title': ''})}
+    assert codes == {('npi', 'invalid_npi_check_digit'), ('title', 'required')}
+    (error,) = validate_enrollment({**VALID, 'phone_number': '5' * 21})
+    assert error == ('phone_number', 'too_long', "Phone Number must be at most 20 characters")
+
+
+def test_batch_matches_single_record_rules():
+    records = [{**VALID, **case} for case in CASES]
+    batch = validate_batch(pd.DataFrame(records))
+    for row, record in enumerate(records):
+        expected = sorted((e.field, e.code) for e in validate_enrollment(record))
+        found = sorted(zip(batch.loc[batch['row'] == row, 'field'], batch.loc[batch['row'] == row, 'code']))
+        assert found == expected, record
+
+
+def test_both_paths_accept_only_yyyy_mm_dd_dates():
+    inputs = ['2025-01-01', '2025-01-01 00:00:00', '20250101', '2025-1-1', '2025/01/01', '2025-13-01', '2025-02-30']
+    records = [{**VALID, 'effective_date': value} for value in inputs]
+    single = [[e.code for e in validate_enrollment(record)] for record in records]
+    batch = validate_batch(pd.DataFrame(records))
+    assert single == [list(batch.loc[batch['row'] == row, 'code']) for row in range(len(records))]
+    assert single == [[], []] + [['invalid_date']] * 5
+
+
+def test_batch_accepts_arrow_tables():
+    pa = pytest.importorskip("pyarrow")
+    table = pa.Table.from_pylist([VALID, {**VALID, 'npi': '1234567890'}])
+    assert validate_batch(table)[['row', 'code']].values.tolist() == [[1, 'invalid_npi_check_digit']]
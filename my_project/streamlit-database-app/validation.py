@@ -0,0 +1,268 @@
+import re
+from collections import namedtuple
+from datetime import date
+
+ORGANIZATION_TYPES = [
+    "Hospital", "Clinic", "Physician Practice", "DME Supplier",
+    "Home Health Agency", "Nursing Facility", "Other"
+]
+RELATIONSHIP_STATUSES = ["Active", "Pending", "Terminated", "Suspended"]
+
+EMAIL_REGEX = r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}'
+EMAIL_PATTERN = re.compile(EMAIL_REGEX)
+NPI_PATTERN = re.compile(r'[0-9]{10}')
+# Dates must be YYYY-MM-DD; date.fromisoformat alone would also take "20250101"
+DATE_REGEX = r'[0-9]{4}-[0-9]{2}-[0-9]{2}'
+DATE_PATTERN = re.compile(DATE_REGEX)
+# NPIs use the ISO 7812 Luhn check digit with the card-issuer prefix 80840,
+# whose doubled-digit contribution to the Luhn sum is always 24.
+NPI_LUHN_PREFIX_SUM = 24
+
+REQUIRED_FIELDS = {
+    'authorized_signatory_name': "Authorized Signatory Name",
+    'title': "Title",
+    'organization_name': "Organization Name",
+    'email_address': "Email Address",
+    'phone_number': "Phone Number",
+    'ptan': "PTAN",
+    'npi': "NPI",
+    'tax_id': "Tax ID",
+    'organization_type': "Organization Type",
+    'vendor_clearinghouse_name': "Vendor/Clearinghouse Name",
+    'effective_date': "Relationship Effective Date",
+    'attested_by': "Attested By",
+}
+
+# Column widths of the free-text fields (schema.sql); the PTAN, NPI and the
+# fixed choices have their own rules
+MAX_LENGTHS = {
+    'authorized_signatory_name': 255,
+    'title': 100,
+    'organization_name': 255,
+    'email_address': 255,
+    'alternate_email_address': 255,
+    'phone_number': 20,
+    'tax_id': 20,
+    'vendor_clearinghouse_name': 255,
+    'vendor_contact_name': 255,
+    'vendor_contact_email': 255,
+    'vendor_contact_phone': 20,
+    'attested_by': 255,
+}
+FIELD_LABELS = {
+    **REQUIRED_FIELDS,
+    'alternate_email_address': "Alternate Email Address",
+    'vendor_contact_name': "Vendor Contact Name",
+    'vendor_contact_email': "Vendor Contact Email",
+    'vendor_contact_phone': "Vendor Contact Phone",
+}
+
+ValidationError = namedtuple("ValidationError", ["field", "code", "message"])
+
+# Error codes and their messages, shared by the single-record and batch APIs
+MESSAGES = {
+    'invalid_email': "Invalid email format",
+    'invalid_alternate_email': "Invalid alternate email format",
+    'invalid_ptan': "Invalid PTAN format",
+    'invalid_npi_format': "NPI must be exactly 10 digits",
+    'invalid_npi_check_digit': "NPI check digit is invalid",
+    'unknown_organization_type': "Unknown organization type",
+    'unknown_relationship_status': "Unknown relationship status",
+    'attestation_name_mismatch': "Attested name must match Authorized Signatory Name",
+    'invalid_date': "Date must be in YYYY-MM-DD format",
+    'termination_before_effective': "Termination date must not be before effective date",
+}
+
+
+def validate_email(email):
+    """Validate email format."""
+    return EMAIL_PATTERN.fullmatch(email) is not None
+
+
+def npi_check_digit(first_nine):
+    """Return the Luhn check digit for the first nine digits of an NPI."""
+    total = NPI_LUHN_PREFIX_SUM
+    for i, ch in enumerate(first_nine):
+        digit = int(ch)
+        if i % 2 == 0:
+            digit *= 2
+            if digit > 9:
+                digit -= 9
+        total += digit
+    return (10 - total % 10) % 10
+
+
+def validate_npi(npi):
+    """Validate NPI format (10 digits) and its check digit."""
+    return NPI_PATTERN.fullmatch(npi) is not None and npi_check_digit(npi[:9]) == int(npi[9])
+
+
+def validate_ptan(ptan):
+    """Validate PTAN format."""
+    return len(ptan) >= 5 and len(ptan) <= 50
+
+
+def _parse_date(value):
+    if isinstance(value, date):
+        return value
+    # Excel dates arrive as "YYYY-MM-DD 00:00:00" when read as strings
+    if DATE_PATTERN.fullmatch(value[:10]) is None:
+        raise ValueError(f"Not a YYYY-MM-DD date: {value!r}")
+    return date.fromisoformat(value[:10])
+
+
+def _required_message(field):
+    return f"{REQUIRED_FIELDS[field]} is required"
+
+
+def _too_long_message(field):
+    return f"{FIELD_LABELS[field]} must be at most {MAX_LENGTHS[field]} characters"
+
+
+def validate_enrollment(record):
+    """Validate one enrollment record and return a list of ``ValidationError``.
+
+    ``record`` maps column names (as in ``hets_providers`` and
+    ``hets_vendor_relationships``, plus ``attested_by``) to values; strings
+    are expected to be stripped and missing values may be None or "".
+    """
+    errors = [
+        ValidationError(field, 'required', _required_message(field))
+        for field in REQUIRED_FIELDS if not record.get(field)
+    ]
+    errors.extend(
+        ValidationError(field, 'too_long', _too_long_message(field))
+        for field, limit in MAX_LENGTHS.items() if len(record.get(field) or "") > limit
+    )
+    email = record.get('email_address')
+    if email and not validate_email(email):
+        errors.append(ValidationError('email_address', 'invalid_email', MESSAGES['invalid_email']))
+    alternate_email = record.get('alternate_email_address')
+    if alternate_email and not validate_email(alternate_email):
+        errors.append(ValidationError('alternate_email_address', 'invalid_alternate_email',
+                                      MESSAGES['invalid_alternate_email']))
+    ptan = record.get('ptan')
+    if ptan and not validate_ptan(ptan):
+        errors.append(ValidationError('ptan', 'invalid_ptan', MESSAGES['invalid_ptan']))
+    npi = record.get('npi')
+    if npi:
+        if NPI_PATTERN.fullmatch(npi) is None:
+            errors.append(ValidationError('npi', 'invalid_npi_format', MESSAGES['invalid_npi_format']))
+        elif not validate_npi(npi):
+            errors.append(ValidationError('npi', 'invalid_npi_check_digit', MESSAGES['invalid_npi_check_digit']))
+    organization_type = record.get('organization_type')
+    if organization_type and organization_type not in ORGANIZATION_TYPES:
+        errors.append(ValidationError('organization_type', 'unknown_organization_type',
+                                      MESSAGES['unknown_organization_type']))
+    status = record.get('relationship_status')
+    if status and status not in RELATIONSHIP_STATUSES:
+        errors.append(ValidationError('relationship_status', 'unknown_relationship_status',
+                                      MESSAGES['unknown_relationship_status']))
+    signatory, attested_by = record.get('authorized_signatory_name'), record.get('attested_by')
+    if signatory and attested_by and signatory.strip().lower() != attested_by.strip().lower():
+        errors.append(ValidationError('attested_by', 'attestation_name_mismatch',
+                                      MESSAGES['attestation_name_mismatch']))
+
+    dates = {}
+    for field in ('effective_date', 'termination_date'):
+        if record.get(field):
+            try:
+                dates[field] = _parse_date(record[field])
+            except ValueError:
+                errors.append(ValidationError(field, 'invalid_date', MESSAGES['invalid_date']))
+    if len(dates) == 2 and dates['termination_date'] < dates['effective_date']:
+        errors.append(ValidationError('termination_date', 'termination_before_effective',
+                                      MESSAGES['termination_before_effective']))
+    return errors
+
+
+def _npi_check_digits_valid(npis):
+    """Vectorized Luhn check over an array of 10-digit NPI strings."""
+    import numpy as np
+
+    raw = np.frombuffer("".join(npis).encode("ascii"), dtype=np.uint8).reshape(-1, 10)
+    digits = raw.astype(np.int64) - ord("0")
+    doubled = digits[:, 0:9:2] * 2
+    doubled -= 9 * (doubled > 9)
+    total = NPI_LUHN_PREFIX_SUM + doubled.sum(axis=1) + digits[:, 1:9:2].sum(axis=1)
+    return (10 - total % 10) % 10 == digits[:, 9]
+
+
+def validate_batch(data):
+    """Validate a whole column set at once and return the errors as a DataFrame.
+
+    ``data`` is a pandas DataFrame or a pyarrow Table with the same columns as
+    ``validate_enrollment`` records (as strings, dates or empty values). Every
+    rule runs as one vectorized operation per column. The result has one row
+    per error with columns ``row`` (0-based position), ``field``, ``code`` and
+    ``message``, ordered by row.
+    """
+    # Imported here so single-record callers (the form, the REST API) do not
+    # pay for numpy and pandas at startup
+    import numpy as np
+    import pandas as pd
+
+    if hasattr(data, "to_pandas"):
+        data = data.to_pandas()
+    n = len(data)
+    empty = pd.Series([""] * n, index=data.index, dtype="string")
+
+    def text(field):
+        if field not in data.columns:
+            return empty
+        return data[field].astype("string").fillna("").str.strip()
+
+    found = []
+
+    def flag(mask, field, code, message=None):
+        rows = np.flatnonzero(np.asarray(mask, dtype=bool))
+        if len(rows):
+            found.append(pd.DataFrame({
+                'row': rows, 'field': field, 'code': code,
+                'message': message or MESSAGES[code],
+            }))
+
+    present = {field: text(field) != "" for field in REQUIRED_FIELDS}
+    for field in REQUIRED_FIELDS:
+        flag(~present[field], field, 'required', _required_message(field))
+    for field, limit in MAX_LENGTHS.items():
+        flag(text(field).str.len() > limit, field, 'too_long', _too_long_message(field))
+
+    email = text('email_address')
+    flag((email != "") & ~email.str.fullmatch(EMAIL_REGEX), 'email_address', 'invalid_email')
+    alternate_email = text('alternate_email_address')
+    flag((alternate_email != "") & ~alternate_email.str.fullmatch(EMAIL_REGEX),
+         'alternate_email_address', 'invalid_alternate_email')
+
+    ptan_length = text('ptan').str.len()
+    flag((ptan_length > 0) & ((ptan_length < 5) | (ptan_length > 50)), 'ptan', 'invalid_ptan')
+
+    npi = text('npi')
+    npi_format = npi.str.fullmatch(r'[0-9]{10}').to_numpy(dtype=bool, na_value=False)
+    flag((npi != "").to_numpy() & ~npi_format, 'npi', 'invalid_npi_format')
+    check_digit_ok = np.ones(n, dtype=bool)
+    if npi_format.any():
+        check_digit_ok[npi_format] = _npi_check_digits_valid(npi[npi_format].tolist())
+    flag(~check_digit_ok, 'npi', 'invalid_npi_check_digit')
+
+    organization_type = text('organization_type')
+    flag((organization_type != "") & ~organization_type.isin(ORGANIZATION_TYPES),
+         'organization_type', 'unknown_organization_type')
+    status = text('relationship_status')
+    flag((status != "") & ~status.isin(RELATIONSHIP_STATUSES), 'relationship_status', 'unknown_relationship_status')
+
+    signatory, attested_by = text('authorized_signatory_name').str.lower(), text('attested_by').str.lower()
+    flag((signatory != "") & (attested_by != "") & (signatory != attested_by), 'attested_by', 'attestation_name_mismatch')
+
+    dates = {}
+    for field in ('effective_date', 'termination_date'):
+        raw = text(field)
+        day = raw.str.slice(0, 10).where(raw.str.slice(0, 10).str.fullmatch(DATE_REGEX), "")
+        dates[field] = pd.to_datetime(day, format="%Y-%m-%d", errors="coerce")
+        flag((raw != "") & dates[field].isna(), field, 'invalid_date')
+    flag(dates['termination_date'] < dates['effective_date'], 'termination_date', 'termination_before_effective')
+
+    if not found:
+        return pd.DataFrame({'row': pd.Series(dtype="int64"), 'field': pd.Series(dtype="string"),
+                             'code': pd.Series(dtype="string"), 'message': pd.Series(dtype="string")})
+    return pd.concat(found, ignore_index=True).sort_values('row', kind='stable', ignore_index=True)
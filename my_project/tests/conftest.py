@@ -0,0 +1,26 @@
+import os
+
+import pytest
+
+SYNTHETIC_TABLE = "synthetic_taxis"
+
+
+@pytest.fixture(scope="session", autouse=True)
+def synthetic_taxis(tmp_path_factory):
+    """Without Databricks Connect, read a small synthetic taxi table from a local SparkSession."""
+    try:
+        import databricks.connect  # noqa: F401
+        return
+    except ImportError:
+        pass
+    try:
+        from my_project.main import get_spark
+        from my_project.synthetic import generate_taxis, write_taxis
+    except ImportError:
+        return
+
+    os.environ.setdefault("MY_PROJECT_WAREHOUSE_DIR", str(tmp_path_factory.mktemp("warehouse")))
+    spark = get_spark()
+    fmt = "delta" if "DeltaSparkSessionExtension" in spark.conf.get("spark.sql.extensions", "") else "parquet"
+    write_taxis(generate_taxis(spark, 10000), table=SYNTHETIC_TABLE, fmt=fmt)
+    os.environ["MY_PROJECT_TAXIS_TABLE"] = SYNTHETIC_TABLE
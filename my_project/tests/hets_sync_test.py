@@ -0,0 +1,115 @@
+import os
+import sys
+import uuid
+from datetime import date
+
+import pytest
+
+pytest.importorskip("pyspark")
+delta = pytest.importorskip("delta")
+psycopg = pytest.importorskip("psycopg")
+
+from pyspark.sql import SparkSession
+
+from my_project.hets_sync import sync_hets
+
+SHARED_DIR = os.path.join(os.path.dirname(__file__), "..", "streamlit-database-app")
+
+
+@pytest.fixture(scope="module")
+def spark(tmp_path_factory):
+    """A local SparkSession with Delta Lake and a throwaway warehouse."""
+    builder = (
+        SparkSession.builder.master("local[1]")
+        .config("spark.sql.extensions", "io.delta.sql.DeltaSparkSessionExtension")
+        .config("spark.sql.catalog.spark_catalog", "org.apache.spark.sql.delta.catalog.DeltaCatalog")
+        .config("spark.sql.warehouse.dir", str(tmp_path_factory.mktemp("warehouse")))
+    )
+    return delta.configure_spark_with_delta_pip(builder).getOrCreate()
+
+
+@pytest.fixture
+def hets_source():
+    """A freshly migrated HETS schema in HETS_TEST_PG_CONNINFO; yields (conninfo, schema_name)."""
+    conninfo = os.getenv("HETS_TEST_PG_CONNINFO")
+    if not conninfo:
+        pytest.skip("HETS_TEST_PG_CONNINFO is not set")
+    sys.path.insert(0, SHARED_DIR)
+    from migrations import migrate
+
+    schema_name = f"hets_sync_{uuid.uuid4().hex[:8]}"
+    with psycopg.connect(conninfo) as conn:
+        migrate(conn, schema_name)
+    yield conninfo, schema_name
+    with psycopg.connect(conninfo, autocommit=True) as conn:
+        conn.execute(f'DROP SCHEMA "{schema_name}" CASCADE')
+
+
+def add_provider(conn, schema_name, i):
+    provider_id = conn.execute(
+        f'INSERT INTO "{schema_name}".hets_providers (authorized_signatory_name, email_address, ptan, npi) '
+        "VALUES (%s, %s, %s, %s) RETURNING provider_id",
+        (f"Signatory {i}", f"org{i}@example.com", f"PTAN{i:05d}", f"{i:010d}")
+    ).fetchone()[0]
+    conn.execute(
+        f'INSERT INTO "{schema_name}".hets_vendor_relationships (provider_id, vendor_clearinghouse_name, effective_date) '
+        "VALUES (%s, %s, %s)", (provider_id, "Clearinghouse", date(2025, 1, 1))
+    )
+    return provider_id
+
+
+def add_enrollment(conn, schema_name, npi, idempotency_key):
+    """An enrollment written the way the app writes one, submission history (with its UUID key) included."""
+    from enrollments import ATTESTATION_TEXT, insert_enrollment
+
+    provider_data = {
+        "authorized_signatory_name": "Jane Doe", "title": "CEO", "organization_name": "Doe Clinic",
+        "email_address": "jane@example.com", "alternate_email_address": None, "phone_number": "555-0100",
+        "ptan": "PTAN12345", "npi": npi, "tax_id": "12-3456789", "organization_type": "Clinic",
+    }
+    vendor_data = {
+        "vendor_clearinghouse_name": "Clearinghouse", "vendor_contact_name": None, "vendor_contact_email": None,
+        "vendor_contact_phone": None, "effective_date": date(2025, 1, 1), "termination_date": None,
+        "offshore_data_sharing_consent": True, "relationship_status": "Active",
+    }
+    attestation_data = {"attestation_text": ATTESTATION_TEXT, "attested_by": "Jane Doe", "ip_address": "system"}
+    provider_id, _ = insert_enrollment(conn, schema_name, provider_data, vendor_data, attestation_data, idempotency_key)
+    return provider_id
+
+
+def test_incremental_sync_merges_inserts_updates_and_deletes(spark, hets_source):
+    conninfo, schema_name = hets_source
+    target = f"sync_{uuid.uuid4().hex[:8]}"
+    with psycopg.connect(conninfo) as conn:
+        first, second = add_provider(conn, schema_name, 1), add_provider(conn, schema_name, 2)
+        submitted_key = str(uuid.uuid4())
+        enrolled = add_enrollment(conn, schema_name, "1234567893", submitted_key)
+        conn.commit()
+
+        counts = sync_hets(spark, conninfo, schema_name, target)
+        assert counts["hets_providers"] == 3 and counts["hets_submission_history"] == 1
+
+        third = add_provider(conn, schema_name, 3)
+        resubmitted_key = str(uuid.uuid4())
+        add_enrollment(conn, schema_name, "1234567893", resubmitted_key)
+        conn.execute(f'UPDATE "{schema_name}".hets_vendor_relationships SET relationship_status = %s '
+                     "WHERE provider_id = %s", ("Terminated", second))
+        conn.execute(f'DELETE FROM "{schema_name}".hets_providers WHERE provider_id = %s', (first,))
+        conn.commit()
+
+        counts = sync_hets(spark, conninfo, schema_name, target)
+        assert counts["hets_providers"] == 3 and counts["hets_vendor_relationships"] == 4
+        assert counts["hets_submission_history"] == 1
+        assert conn.execute(f'SELECT COUNT(*) FROM "{schema_name}".hets_change_log').fetchone()[0] == 0
+
+    providers = spark.table(f"{target}.hets_providers")
+    assert sorted(row.provider_id for row in providers.collect()) == [second, enrolled, third]
+    statuses = {row.relationship_id: (row.provider_id, row.relationship_status)
+                for row in spark.table(f"{target}.hets_vendor_relationships").collect()}
+    assert sorted(statuses.values()) == sorted([
+        (second, "Terminated"), (enrolled, "Active"), (enrolled, "Active"), (third, "Active")
+    ])
+    # uuid columns arrive as their text form
+    keys = {row.idempotency_key for row in spark.table(f"{target}.hets_submission_history").collect()}
+    assert keys == {submitted_key, resubmitted_key}
+    assert sync_hets(spark, conninfo, schema_name, target) == dict.fromkeys(counts, 0)
@@ -1,6 +1,30 @@
-from my_project.main import get_taxis, get_spark
+import re
+
+from my_project.main import get_taxis, get_spark, main, read_taxis, scan_plan
 
 
 def test_main():
     taxis = get_taxis(get_spark())
     assert taxis.count() > 5
+
+
+def test_read_taxis_prunes_columns_and_pushes_filters():
+    taxis = read_taxis(get_spark(), columns=["trip_distance", "fare_amount"], max_fare=30, min_distance=1)
+    assert taxis.columns == ["trip_distance", "fare_amount"]
+    assert taxis.filter("fare_amount >= 30 OR trip_distance < 1").count() == 0
+    plan = scan_plan(taxis)
+    pushed = re.search(r"PushedFilters: \[(.*)\]", plan).group(1)
+    assert "LessThan(fare_amount,30.0)" in pushed
+    assert "GreaterThanOrEqual(trip_distance,1.0)" in pushed
+    read_schema = re.search(r"ReadSchema: struct<(.*)>", plan).group(1)
+    assert [field.split(":")[0] for field in read_schema.split(",")] == ["trip_distance", "fare_amount"]
+
+
+def test_read_taxis_streaming():
+    taxis = read_taxis(get_spark(), columns=["fare_amount"], max_fare=30, streaming=True)
+    assert taxis.isStreaming
+
+
+def test_sync_hets_skips_when_not_configured(capsys):
+    main(["sync-hets", "--conninfo", "", "--source-schema", "", "--target", "main.hets"])
+    assert "skipping" in capsys.readouterr().out
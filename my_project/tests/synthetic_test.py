@@ -0,0 +1,16 @@
+import pytest
+
+pytest.importorskip("pyspark")
+
+from my_project.main import get_spark
+from my_project.synthetic import generate_taxis
+
+
+def test_generate_taxis_is_seeded_and_matches_the_trips_schema():
+    spark = get_spark()
+    taxis = generate_taxis(spark, 1000, seed=7, partitions=4)
+    assert taxis.columns == ["tpep_pickup_datetime", "tpep_dropoff_datetime", "trip_distance",
+                             "fare_amount", "pickup_zip", "dropoff_zip"]
+    assert taxis.collect() == generate_taxis(spark, 1000, seed=7, partitions=1).collect()
+    assert taxis.collect() != generate_taxis(spark, 1000, seed=8).collect()
+    assert taxis.filter("tpep_dropoff_datetime <= tpep_pickup_datetime OR fare_amount < 2.5").count() == 0